@@ -17,11 +17,12 @@ const DesignExplorer = () => {
     setResults([]);
 
     try {
+      // Searches go through the backend's caching Unsplash proxy
       const response = await fetch(
-  `https://api.unsplash.com/search/photos?query=${encodeURIComponent(
-    searchTerm
-  )}&per_page=12&client_id=${import.meta.env.VITE_UNSPLASH_ACCESS_KEY}`
-);
+        `http://localhost:5000/api/inspiration/search?query=${encodeURIComponent(
+          searchTerm
+        )}&count=12`
+      );
 
 
       if (!response.ok) {
@@ -29,7 +30,7 @@ const DesignExplorer = () => {
       }
 
       const data = await response.json();
-      setResults(data.results);
+      setResults(data.images);
     } catch (err) {
       setError("Error fetching data. Try again.");
     } finally {
@@ -88,7 +88,8 @@ const handleGenerateInspiration = async () => {
 
   setLoading(true);
   try {
-    const res = await fetch("http://127.0.0.1:5000/api/generate-room-image", {
+    // Queue the generation job, then poll until it finishes
+    const res = await fetch("http://127.0.0.1:5000/api/jobs/generate-room-image", {
       method: "POST",
       headers: { "Content-Type": "application/json" },
       body: JSON.stringify({
@@ -101,7 +102,22 @@ const handleGenerateInspiration = async () => {
       throw new Error(`Generation failed with status: ${res.status}`);
     }
 
-    const data = await res.json();
+    const { job_id } = await res.json();
+    let job = null;
+    do {
+      await new Promise((resolve) => setTimeout(resolve, 2000));
+      const jobRes = await fetch(`http://127.0.0.1:5000/api/jobs/${job_id}`);
+      if (!jobRes.ok) {
+        throw new Error(`Job status failed with status: ${jobRes.status}`);
+      }
+      job = await jobRes.json();
+    } while (job.status === "queued" || job.status === "running");
+
+    if (job.status !== "succeeded") {
+      throw new Error(job.error || `Job ${job.status}`);
+    }
+
+    const data = job.result || {};
     console.log("Generation response:", data);
 
     
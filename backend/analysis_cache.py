@@ -0,0 +1,151 @@
+import hashlib
+import json
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from singleflight import SingleFlight
+
+
+class AnalysisCache:
+    """
+    Persistent, content-addressed cache of Gemini room analyses.
+
+    Entries are keyed by sha256(image bytes + prompt version) and stored in the
+    same SQLite database as RoomAnalysis. Expired entries (TTL) and the least
+    recently used entries beyond ``max_entries`` are evicted on write.
+    Concurrent misses for the same key in this process run the analysis once.
+    """
+
+    def __init__(self, db, model, max_entries=1000, ttl_seconds=30 * 24 * 3600):
+        self.db = db
+        self.model = model
+        self.max_entries = max_entries
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self._flight = SingleFlight()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    @staticmethod
+    def key_for(image_bytes, prompt_version):
+        digest = hashlib.sha256()
+        digest.update(prompt_version.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(image_bytes)
+        return digest.hexdigest()
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def get(self, key, count=True):
+        """Return the cached analysis dict or None. The caller commits the session."""
+        entry = self.db.session.get(self.model, key)
+        if entry is None:
+            if count:
+                self._count("_misses")
+            return None
+
+        now = datetime.utcnow()
+        if entry.created_at and now - entry.created_at > self.ttl:
+            self.db.session.delete(entry)
+            if count:
+                self._count("_misses")
+            self._count("_evictions")
+            return None
+
+        entry.hit_count = (entry.hit_count or 0) + 1
+        entry.last_used_at = now
+        if count:
+            self._count("_hits")
+        return entry.result
+
+    def count_lookup(self, hit):
+        """Record the outcome of a lookup made with ``get(..., count=False)``."""
+        self._count("_hits" if hit else "_misses")
+
+    def put(self, key, prompt_version, result):
+        """Store a successful analysis and enforce the TTL/size limits."""
+        now = datetime.utcnow()
+        # An upsert, so a concurrent writer of the same key (another worker
+        # process, or a request that missed alongside this one) can't fail it
+        insert = sqlite_insert(self.model.__table__).values(
+            key=key,
+            prompt_version=prompt_version,
+            result=result,
+            size_bytes=len(json.dumps(result)),
+            hit_count=0,
+            created_at=now,
+            last_used_at=now,
+        )
+        self.db.session.execute(insert.on_conflict_do_update(
+            index_elements=["key"],
+            set_={name: insert.excluded[name]
+                  for name in ("prompt_version", "result", "size_bytes", "created_at", "last_used_at")},
+        ))
+        self.evict()
+
+    def get_or_analyze(self, key, prompt_version, analyze, cacheable=lambda result: True):
+        """
+        Return (analysis, state) where state is "hit", "miss" or "shared"
+        (waited on an identical in-flight analysis). ``analyze()`` runs only on
+        a miss; its result is stored when ``cacheable(result)`` is true.
+        """
+        cached = self.get(key)
+        if cached is not None:
+            return cached, "hit"
+
+        def load():
+            # Another thread or process may have stored it since our lookup
+            cached = self.get(key, count=False)
+            if cached is not None:
+                self.db.session.commit()
+                return cached, "hit"
+            result = analyze()
+            if cacheable(result):
+                self.put(key, prompt_version, result)
+                self.db.session.commit()
+            return result, "miss"
+
+        (result, state), shared = self._flight.do(key, load)
+        return result, "shared" if shared else state
+
+    def evict(self):
+        model = self.model
+        session = self.db.session
+
+        expired = session.query(model).filter(
+            model.created_at < datetime.utcnow() - self.ttl
+        ).delete(synchronize_session=False)
+
+        overflow = 0
+        total = session.query(model).count()
+        if total > self.max_entries:
+            stale_keys = [
+                key for (key,) in session.query(model.key)
+                .order_by(model.last_used_at.asc())
+                .limit(total - self.max_entries)
+            ]
+            overflow = session.query(model).filter(
+                model.key.in_(stale_keys)
+            ).delete(synchronize_session=False)
+
+        if expired or overflow:
+            self._count("_evictions", expired + overflow)
+
+    def stats(self):
+        with self._lock:
+            hits, misses, evictions = self._hits, self._misses, self._evictions
+        lookups = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "evictions": evictions,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "entries": self.db.session.query(self.model).count(),
+            "max_entries": self.max_entries,
+            "ttl_seconds": int(self.ttl.total_seconds()),
+        }
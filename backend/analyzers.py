@@ -0,0 +1,249 @@
+"""
+Room-analysis pipeline: independent analyzers fanned out over one decoded image.
+
+The image is decoded once (gemini_analysis.decode_image) and shared read-only
+by every analyzer. Analyzers run concurrently, each on its own pool (Gemini
+on a pool of its own, so slow model calls never queue the cheap local
+analyzers behind them) and each with its own deadline counted from the
+moment it starts running; their results are merged into one
+``analysis_data`` document. An analyzer that fails or misses its deadline is
+reported under "analyzers" and the others' results are still returned, so
+total latency tracks the slowest analyzer that finishes in time rather than
+the sum of all of them. A timed-out analyzer keeps its pool thread until it
+returns (threads can't be interrupted); its result is discarded. One still
+queued when the longest deadline has passed is cancelled.
+"""
+import contextvars
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+
+import gemini_analysis
+from metrics import REGISTRY, timed
+
+ANALYZER_RUNS = REGISTRY.counter(
+    "room_analyzer_runs_total", "Room analyzer outcomes", ("analyzer", "status"))
+
+LIGHTING_SAMPLE_EDGE = 256
+# How often the pipeline rechecks deadlines while an analyzer is still queued
+QUEUED_POLL_SECONDS = 0.05
+PALETTE_COLOR_COUNT = 6
+
+
+class DecodedImage:
+    """
+    Uploaded image bytes decoded once for all analyzers.
+
+    ``image`` is EXIF-oriented RGB (or L), at most PREPROCESS_MAX_EDGE on its
+    long edge, and must not be modified. Smaller copies come from thumbnail().
+    """
+
+    def __init__(self, image_bytes, max_edge=None):
+        self.bytes = image_bytes
+        self.image, self.info = gemini_analysis.decode_image(image_bytes, max_edge)
+        # Parsed here, once: getexif() caches on the image, which isn't safe to race on
+        self.exif = dict(self.image.getexif())
+        self._thumbnails = {}
+        self._lock = threading.Lock()
+
+    def thumbnail(self, edge):
+        """A cached RGB copy no larger than ``edge`` (shared; don't modify it either)."""
+        from PIL import Image
+
+        with self._lock:
+            if edge not in self._thumbnails:
+                copy = self.image.convert("RGB")
+                copy.thumbnail((edge, edge), Image.Resampling.BILINEAR)
+                self._thumbnails[edge] = copy
+            return self._thumbnails[edge]
+
+
+class Analyzer:
+    """
+    One analysis step. ``fn(decoded)`` returns a dict merged into the document.
+    A ``required`` analyzer's failure is reported as the document's "error".
+    ``pool`` names the pipeline executor it runs on.
+    """
+
+    def __init__(self, name, fn, timeout, required=False, pool="local"):
+        self.name = name
+        self.fn = fn
+        self.timeout = timeout
+        self.required = required
+        self.pool = pool
+
+
+def gemini_analyzer(decoded):
+    encoded, mime_type, encode_ms = gemini_analysis.encode_image(decoded.image)
+    stats = gemini_analysis.preprocess_stats(decoded.image, decoded.info, len(decoded.bytes), encoded, encode_ms)
+    return {"suggestions": gemini_analysis.generate_room_analysis(encoded, mime_type), "preprocess": stats}
+
+
+def metadata_analyzer(decoded):
+    width, height = decoded.image.size
+    original_width, original_height = decoded.info["original_size"]
+    if (width > height) != (original_width > original_height):
+        # EXIF rotated the photo by 90°: report it the way it is displayed
+        original_width, original_height = original_height, original_width
+    if abs(width - height) <= 0.05 * max(width, height):
+        orientation = "square"
+    else:
+        orientation = "landscape" if width > height else "portrait"
+    metadata = {
+        "format": decoded.info["format"],
+        "width": original_width,
+        "height": original_height,
+        "orientation": orientation,
+        "megapixels": round(original_width * original_height / 1_000_000, 2),
+        "bytes": len(decoded.bytes),
+    }
+    # EXIF Make (271), Model (272) and DateTime (306), when the camera recorded them
+    camera = " ".join(str(decoded.exif[tag]).strip() for tag in (271, 272) if decoded.exif.get(tag))
+    if camera:
+        metadata["camera"] = camera
+    if decoded.exif.get(306):
+        metadata["taken_at"] = str(decoded.exif[306])
+    return {"metadata": metadata}
+
+
+def lighting_analyzer(decoded):
+    """Brightness, contrast, clipping and colour cast estimated from a small thumbnail."""
+    from PIL import ImageStat
+
+    sample = decoded.thumbnail(LIGHTING_SAMPLE_EDGE)
+    luma = sample.convert("L")
+    luma_stat = ImageStat.Stat(luma)
+    histogram = luma.histogram()
+    pixels = sum(histogram)
+    brightness = luma_stat.mean[0] / 255
+    red, _, blue = ImageStat.Stat(sample).mean
+    cast = (red - blue) / 255
+
+    if brightness < 0.35:
+        level = "dim"
+    elif brightness > 0.7:
+        level = "bright"
+    else:
+        level = "balanced"
+    if cast > 0.06:
+        temperature = "warm"
+    elif cast < -0.06:
+        temperature = "cool"
+    else:
+        temperature = "neutral"
+    return {"lighting": {
+        "brightness": round(brightness, 3),
+        "contrast": round(luma_stat.stddev[0] / 128, 3),
+        "level": level,
+        "color_temperature": temperature,
+        "shadows_clipped": round(sum(histogram[:6]) / pixels, 4),
+        "highlights_clipped": round(sum(histogram[250:]) / pixels, 4),
+    }}
+
+
+def palette_analyzer(decoded):
+    from palette import PALETTE_SAMPLE_EDGE, palette_from_image
+
+    sample = decoded.thumbnail(PALETTE_SAMPLE_EDGE)
+    return {"palette": palette_from_image(sample, color_count=PALETTE_COLOR_COUNT)}
+
+
+def default_analyzers(gemini_timeout, local_timeout):
+    return [
+        Analyzer("gemini", gemini_analyzer, gemini_timeout, required=True, pool="gemini"),
+        Analyzer("metadata", metadata_analyzer, local_timeout),
+        Analyzer("lighting", lighting_analyzer, local_timeout),
+        Analyzer("palette", palette_analyzer, local_timeout),
+    ]
+
+
+class AnalysisPipeline:
+    """``executors`` maps each analyzer's ``pool`` name to its executor."""
+
+    def __init__(self, analyzers, executors):
+        self.analyzers = analyzers
+        self.executors = executors
+        self.queue_timeout = max(analyzer.timeout for analyzer in analyzers)
+
+    @staticmethod
+    def _run_one(analyzer, decoded, started):
+        started[analyzer.name] = time.perf_counter()
+        with timed(f"analyzer_{analyzer.name}"):
+            result = analyzer.fn(decoded)
+        return result, (time.perf_counter() - started[analyzer.name]) * 1000
+
+    def run(self, image_bytes):
+        """
+        Decode the image, run every analyzer concurrently and merge the results.
+        The document is complete when no analyzer failed or timed out
+        (``analysis_complete``); only complete documents should be cached.
+        """
+        decoded = DecodedImage(image_bytes)
+
+        futures = {}
+        started = {}  # analyzer name -> perf_counter() when it began running
+        submitted = time.perf_counter()
+        for analyzer in self.analyzers:
+            # A copied context keeps the request's timed() calls in its request log
+            context = contextvars.copy_context()
+            future = self.executors[analyzer.pool].submit(context.run, self._run_one, analyzer, decoded, started)
+            futures[future] = analyzer
+
+        def deadline(future):
+            analyzer = futures[future]
+            if analyzer.name in started:
+                return started[analyzer.name] + analyzer.timeout
+            return submitted + self.queue_timeout
+
+        outcomes = {}
+        timeouts = {}
+        pending = set(futures)
+        while pending:
+            now = time.perf_counter()
+            timeout = max(0, min(deadline(future) for future in pending) - now)
+            if any(futures[future].name not in started for future in pending):
+                # A queued analyzer's deadline only begins once it starts: look again soon
+                timeout = min(timeout, QUEUED_POLL_SECONDS)
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                outcomes[futures[future].name] = future
+            now = time.perf_counter()
+            expired = {future for future in pending if deadline(future) <= now}
+            for future in expired:
+                analyzer = futures[future]
+                if future.cancel():
+                    timeouts[analyzer.name] = f"not started within {self.queue_timeout:g}s"
+                else:
+                    timeouts[analyzer.name] = f"no result within {analyzer.timeout:g}s"
+            pending -= expired
+
+        return self._merge(outcomes, timeouts)
+
+    def _merge(self, outcomes, timeouts):
+        document = {}
+        report = {}
+        for analyzer in self.analyzers:
+            future = outcomes.get(analyzer.name)
+            if future is None:
+                status, error = "timeout", timeouts[analyzer.name]
+            elif future.exception() is not None:
+                status, error = "error", str(future.exception())
+            else:
+                result, elapsed_ms = future.result()
+                document.update(result)
+                report[analyzer.name] = {"status": "ok", "ms": round(elapsed_ms, 1)}
+                ANALYZER_RUNS.inc(analyzer.name, "ok")
+                continue
+
+            print(f"❌ Analyzer {analyzer.name} {status}:", error)
+            report[analyzer.name] = {"status": status, "error": error}
+            ANALYZER_RUNS.inc(analyzer.name, status)
+            if analyzer.required:
+                document.setdefault("error", f"{analyzer.name}: {error}")
+        document["analyzers"] = report
+        return document
+
+
+def analysis_complete(document):
+    report = document.get("analyzers")
+    return bool(report) and all(outcome["status"] == "ok" for outcome in report.values())
@@ -1,62 +1,94 @@
 import json
-import base64
+import hashlib
+import re
+from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
 from datetime import datetime
 from uuid import uuid4
-from flask import Flask, request, jsonify
+import click
+from flask import Blueprint, Flask, request, jsonify, Response, stream_with_context
+from flask.cli import with_appcontext
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
-from werkzeug.utils import secure_filename
-from werkzeug.security import generate_password_hash, check_password_hash
-from PIL import Image
-from colorthief import ColorThief
-import requests
-import cloudinary
-import cloudinary.uploader
+import http_client
+import cloudinary_client
 import os
 from dotenv import load_dotenv
-import google.generativeai as genai
-from gemini_analysis import analyze_room_with_gemini, generate_room_inspiration
-from markdown import markdown
+from gemini_analysis import (
+    download_image,
+    generate_room_inspiration,
+    stream_room_analysis,
+    HOME_PROMPT_VERSION,
+    INSPIRATION_PROMPT_VERSION,
+    PROMPT_VERSION,
+    STREAM_PROMPT_VERSION,
+)
+from analysis_cache import AnalysisCache
+from analyzers import AnalysisPipeline, analysis_complete, default_analyzers
+from home_analysis import MAX_IMAGES as MAX_HOME_IMAGES, HomeAnalysis
+from repair_store import RepairStore, migrate_legacy_repairs
+from generation_cache import GenerationCache
+from auth import AuthBusy, PasswordHasher, TokenSigner, bearer_token
+from sse import MarkdownBlockStreamer, format_sse
+from pagination import apply_filters, keyset_page
+from schema import ensure_columns, ensure_indexes
+import search
+from scheduling import (
+    MAX_AVAILABILITY_DAYS,
+    backfill_slots,
+    begin_immediate,
+    find_conflict,
+    free_slots,
+    FREE_STATUSES,
+    parse_slot,
+)
+from bulk import (
+    BulkRequestError,
+    boolean_field,
+    bulk_create,
+    bulk_delete,
+    bulk_update,
+    string_field,
+    summarize,
+    validate_fields,
+)
+from db_setup import WriteQueue, fill_defaults, install_sqlite_pragmas, sqlite_engine_options
+from export import export_statement, iter_batches, stream_csv, stream_ndjson
+from inspiration import InspirationService, normalize_query
+from pricing import PricingError, load_rate_table, normalize_room, quote_rooms, summarize_project
+from jobs import JobQueue, JobQueueFull
+import metrics
+import http_cache
+from metrics import timed
 from sqlalchemy.exc import IntegrityError
 
+# The Gemini SDK, Cloudinary, Pillow, NumPy, markdown and requests are all
+# imported on first use (see gemini_analysis, cloudinary_client, http_client),
+# so importing this module and serving CRUD routes never loads the AI stack.
+# The app is built by create_app(); the schema is created by `flask --app app init-db`.
 load_dotenv()
 
-app = Flask(__name__)
-CORS(app)
-
-# Cloudinary config
-cloudinary.config(
-    cloud_name=os.getenv("CLOUDINARY_CLOUD_NAME"),
-    api_key=os.getenv("CLOUDINARY_API_KEY"),
-    api_secret=os.getenv("CLOUDINARY_API_SECRET")
-)
-
 # ==================== CONFIGURATION ====================
 UNSPLASH_ACCESS_KEY = os.getenv("UNSPLASH_ACCESS_KEY")
+SECRET_KEY = os.getenv('SECRET_KEY')
+# Values that have shipped as defaults or examples; signing tokens with one would let anyone forge them
+PLACEHOLDER_SECRET_KEYS = {'your-secret-key-change-this', 'your_secret_key_here'}
 
 # Define upload folder and max upload size
 UPLOAD_FOLDER = os.path.join(os.getcwd(), 'uploads')
 MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16 MB
 
-if not os.path.exists(UPLOAD_FOLDER):
-    os.makedirs(UPLOAD_FOLDER)
+# Use a single sqlite file as described in your report
+DB_PATH = os.path.join(os.getcwd(), 'interior_design.db')
 
 # Helper function for UUID generation
 def gen_uuid():
     return str(uuid4())
 
-# ==================== APP & DB CONFIG ====================
-app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
-app.config['MAX_CONTENT_LENGTH'] = MAX_CONTENT_LENGTH
+db = SQLAlchemy()
+api = Blueprint('api', __name__)
 
-# Use a single sqlite file as described in your report
-db_path = os.path.join(os.getcwd(), 'interior_design.db')
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{db_path}"
-print("Using DB at:", db_path)
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'your-secret-key-change-this')
-
-db = SQLAlchemy(app)
+metrics.instrument_commits(db.session.session_factory.class_)
 
 # ==================== DATABASE MODELS ====================
 
@@ -79,6 +111,13 @@ class User(db.Model):
         }
 
 class Appointment(db.Model):
+    __table_args__ = (
+        db.Index('ix_appointment_created_id', 'created_at', 'id'),
+        db.Index('ix_appointment_status_created_id', 'status', 'created_at', 'id'),
+        db.Index('ix_appointment_email_created_id', 'email', 'created_at', 'id'),
+        db.Index('ix_appointment_start_end', 'start_at', 'end_at'),
+    )
+
     id = db.Column(db.String(36), primary_key=True, default=gen_uuid)
     user_email = db.Column(db.String(200), nullable=True) 
     name = db.Column(db.String(200), nullable=False)
@@ -86,6 +125,8 @@ class Appointment(db.Model):
     phone = db.Column(db.String(50), nullable=False)
     date = db.Column(db.String(50), nullable=False)
     time = db.Column(db.String(50), nullable=False)
+    start_at = db.Column(db.DateTime, nullable=True)  # parsed from date + time
+    end_at = db.Column(db.DateTime, nullable=True)
     type = db.Column(db.String(100), nullable=True)
     message = db.Column(db.Text, nullable=True)
     status = db.Column(db.String(50), default='pending')
@@ -100,6 +141,8 @@ class Appointment(db.Model):
             "phone": self.phone,
             "date": self.date,
             "time": self.time,
+            "start_at": self.start_at.isoformat() if self.start_at else None,
+            "end_at": self.end_at.isoformat() if self.end_at else None,
             "type": self.type,
             "message": self.message,
             "status": self.status,
@@ -108,6 +151,12 @@ class Appointment(db.Model):
         }
 
 class Contact(db.Model):
+    __table_args__ = (
+        db.Index('ix_contact_created_id', 'created_at', 'id'),
+        db.Index('ix_contact_status_created_id', 'status', 'created_at', 'id'),
+        db.Index('ix_contact_email_created_id', 'email', 'created_at', 'id'),
+    )
+
     id = db.Column(db.String(36), primary_key=True, default=gen_uuid)
     name = db.Column(db.String(200), nullable=False)
     email = db.Column(db.String(200), nullable=False)
@@ -128,6 +177,12 @@ class Contact(db.Model):
         }
 
 class Repair(db.Model):
+    __table_args__ = (
+        db.Index('ix_repair_created_id', 'created_at', 'id'),
+        db.Index('ix_repair_status_created_id', 'status', 'created_at', 'id'),
+        db.Index('ix_repair_client_created_id', 'client_id', 'created_at', 'id'),
+    )
+
     id = db.Column(db.String(36), primary_key=True, default=gen_uuid)
     full_name = db.Column(db.String(200), nullable=False)
     contact_number = db.Column(db.String(100), nullable=False)
@@ -156,41 +211,299 @@ class Repair(db.Model):
         }
 
 class RoomAnalysis(db.Model):
+    __table_args__ = (
+        db.Index('ix_room_analysis_user_created_id', 'user_id', 'created_at', 'id'),
+    )
+
     id = db.Column(db.String(36), primary_key=True, default=gen_uuid)
     user_id = db.Column(db.String(36), nullable=True)
     image_path = db.Column(db.String(1000), nullable=False)
-    analysis_data = db.Column(db.JSON, nullable=False)
+    # Loaded only when accessed (or undefer_group('content')): history listings never need them
+    analysis_data = db.deferred(db.Column(db.JSON, nullable=False), group='content')
+    # Rendered once at write time; content_hash is the strong ETag of the record
+    analysis_html = db.deferred(db.Column(db.Text, nullable=True), group='content')
+    content_hash = db.Column(db.String(64), nullable=True)
+    # Plain-text start of the analysis, written with the HTML, for history listings
+    excerpt = db.Column(db.String(200), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    def render(self):
+        """Render the analysis markdown to HTML and refresh content_hash and excerpt. Returns the HTML."""
+        from markdown import markdown
+
+        text = analysis_text(self.analysis_data)
+        with timed("markdown_render"):
+            self.analysis_html = markdown(text)
+        self.excerpt = analysis_excerpt(text)
+        digest = hashlib.sha256(json.dumps(self.analysis_data, sort_keys=True).encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(self.analysis_html.encode("utf-8"))
+        self.content_hash = digest.hexdigest()
+        return self.analysis_html
+
     def to_dict(self):
         return {
             "id": self.id,
             "user_id": self.user_id,
             "image_path": self.image_path,
             "analysis_data": self.analysis_data,
+            "analysis_html": self.analysis_html,
             "created_at": self.created_at.isoformat() if self.created_at else None
         }
 
-# Create DB tables
-with app.app_context():
-    db.create_all()
+def analysis_text(analysis_data):
+    """The markdown of a stored analysis ({"suggestions": ...} from Gemini, or {"text": ...})."""
+    analysis_data = analysis_data or {}
+    return analysis_data.get("suggestions") or analysis_data.get("text") or ""
+
+ANALYSIS_EXCERPT_CHARS = 160
+
+def analysis_excerpt(markdown_text):
+    """The first ANALYSIS_EXCERPT_CHARS of the analysis as plain text, cut on a word boundary."""
+    text = re.sub(r'[#*_`>]+', '', markdown_text[:ANALYSIS_EXCERPT_CHARS + 40])
+    text = re.sub(r'\s+', ' ', text).strip()
+    if len(text) > ANALYSIS_EXCERPT_CHARS:
+        text = text[:ANALYSIS_EXCERPT_CHARS].rsplit(' ', 1)[0] + '…'
+    return text
+
+def backfill_excerpts(batch_size=500):
+    """
+    Migration for analyses saved before the excerpt column existed: read each
+    record's JSON once and store its excerpt. Returns the number of rows updated.
+    """
+    migrated = 0
+    last_id = ""
+    while True:
+        rows = (
+            db.session.query(RoomAnalysis.id, RoomAnalysis.analysis_data)
+            .filter(RoomAnalysis.excerpt.is_(None), RoomAnalysis.id > last_id)
+            .order_by(RoomAnalysis.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not rows:
+            break
+        db.session.execute(db.update(RoomAnalysis), [
+            {"id": row.id, "excerpt": analysis_excerpt(analysis_text(row.analysis_data))} for row in rows
+        ])
+        db.session.commit()
+        migrated += len(rows)
+        last_id = rows[-1].id
+    return migrated
+
+class PricingEstimate(db.Model):
+    __tablename__ = 'pricing_estimate'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.String(50), nullable=True)
+    room_type = db.Column(db.String(50), nullable=False)
+    room_size = db.Column(db.Float, nullable=False)
+    size_unit = db.Column(db.String(10), default='sqft')
+    services = db.Column(db.JSON, nullable=False)
+    material_quality = db.Column(db.String(20), nullable=False)
+    estimated_price = db.Column(db.Float, nullable=False)
+    price_breakdown = db.Column(db.JSON, nullable=True)
+    status = db.Column(db.String(20), default='quoted')
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "user_id": self.user_id,
+            "room_type": self.room_type,
+            "room_size": self.room_size,
+            "size_unit": self.size_unit,
+            "services": self.services,
+            "material_quality": self.material_quality,
+            "estimated_price": self.estimated_price,
+            "breakdown": self.price_breakdown,
+            "status": self.status,
+            "created_at": self.created_at.isoformat() if self.created_at else None
+        }
+
+class AnalysisCacheEntry(db.Model):
+    __tablename__ = 'analysis_cache'
+
+    key = db.Column(db.String(64), primary_key=True)  # sha256(prompt version + image bytes)
+    prompt_version = db.Column(db.String(20), nullable=False)
+    result = db.Column(db.JSON, nullable=False)
+    size_bytes = db.Column(db.Integer, default=0)
+    hit_count = db.Column(db.Integer, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    last_used_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+class GenerationCacheEntry(db.Model):
+    __tablename__ = 'generation_cache'
+
+    key = db.Column(db.String(64), primary_key=True)  # sha256(prompt version + suggestions + image URL)
+    prompt_version = db.Column(db.String(20), nullable=False)
+    image_url = db.Column(db.String(500), nullable=True)
+    generated_url = db.Column(db.String(500), nullable=False)
+    hit_count = db.Column(db.Integer, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_used_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+class MigrationCheckpoint(db.Model):
+    __tablename__ = 'migration_checkpoint'
+
+    name = db.Column(db.String(100), primary_key=True)  # e.g. "repairs.db:repair_requests"
+    last_source_id = db.Column(db.Integer, nullable=False, default=0)
+    rows_copied = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class Job(db.Model):
+    __tablename__ = 'job'
+
+    id = db.Column(db.String(36), primary_key=True, default=gen_uuid)
+    kind = db.Column(db.String(50), nullable=False)
+    status = db.Column(db.String(20), default='queued', index=True)
+    payload = db.Column(db.JSON, nullable=True)
+    result = db.Column(db.JSON, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    # Set by handlers that report progress (e.g. per-image status of a home analysis)
+    progress = db.Column(db.JSON, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "result": self.result,
+            "error": self.error,
+            "progress": self.progress,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None
+        }
+
+# Optional single writer that group-commits small inserts (contacts, repairs); started by create_app()
+write_queue = None
+
+def save_new(instance):
+    """Insert a new row, through the group-commit writer when it is enabled."""
+    if write_queue is None:
+        db.session.add(instance)
+        db.session.commit()
+        return instance
+    values = fill_defaults(instance)
+    write_queue.insert(instance.__table__, values).result(timeout=30)
+    return instance
+
+# Repair requests from both app.py and the legacy repairs.py; bound by create_app()
+repair_store = RepairStore(Repair.__table__)
+
+analysis_cache = AnalysisCache(
+    db,
+    AnalysisCacheEntry,
+    max_entries=int(os.getenv("ANALYSIS_CACHE_MAX_ENTRIES", "1000")),
+    ttl_seconds=int(os.getenv("ANALYSIS_CACHE_TTL_SECONDS", str(30 * 24 * 3600))),
+)
+
+# Generated inspiration images by (prompt version, suggestions, source image)
+generation_cache = GenerationCache(
+    db,
+    GenerationCacheEntry,
+    max_entries=int(os.getenv("GENERATION_CACHE_MAX_ENTRIES", "500")),
+)
+GENERATION_LOOKUPS = metrics.REGISTRY.counter(
+    "generation_cache_lookups_total", "Inspiration image requests by cache state.", ("state",))
+
+# Gemini and the local analyzers (metadata, lighting, palette) run concurrently,
+# Gemini on its own pool so slow model calls don't hold up the local ones; each
+# analyzer's deadline starts when it starts running
+analysis_pipeline = AnalysisPipeline(
+    default_analyzers(
+        gemini_timeout=float(os.getenv("GEMINI_ANALYZER_TIMEOUT_SECONDS", "90")),
+        local_timeout=float(os.getenv("LOCAL_ANALYZER_TIMEOUT_SECONDS", "5")),
+    ),
+    {
+        "gemini": ThreadPoolExecutor(
+            max_workers=int(os.getenv("GEMINI_ANALYZER_WORKERS", "8")),
+            thread_name_prefix="analyzer-gemini",
+        ),
+        "local": ThreadPoolExecutor(
+            max_workers=int(os.getenv("ANALYZER_WORKERS", "4")),
+            thread_name_prefix="analyzer",
+        ),
+    },
+)
+
+# Cloudinary uploads that overlap with analysis in /api/room-analysis/upload
+upload_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("UPLOAD_WORKERS", "4")),
+    thread_name_prefix="upload",
+)
+
+# Password KDF runs on a bounded process pool; session tokens are signed, not stored
+password_hasher = PasswordHasher(
+    max_workers=int(os.getenv("AUTH_KDF_WORKERS", "2")),
+    max_queue=int(os.getenv("AUTH_KDF_MAX_QUEUE", "16")),
+    timeout=float(os.getenv("AUTH_KDF_TIMEOUT_SECONDS", "10")),
+)
+AUTH_TOKEN_MAX_AGE = int(os.getenv("AUTH_TOKEN_MAX_AGE_SECONDS", str(7 * 24 * 3600)))
+token_signer = None  # built by create_app() from the app's SECRET_KEY
+
+def current_token_payload():
+    """Payload of the request's Bearer token ({"uid", "email"}), or None."""
+    return token_signer.verify(bearer_token(request.headers))
+
+def token_user_id():
+    """Id of the signed-in user (for attributing records), or None."""
+    payload = current_token_payload()
+    return payload["uid"] if payload else None
+
+def foreign_user_error(claimed_user_id, user_id):
+    """
+    Records are attributed to the token's user only. A 403 response when the
+    body still names a different ``userId`` (older clients send their own),
+    else None.
+    """
+    if claimed_user_id and claimed_user_id != user_id:
+        return jsonify({"error": "userId must be the signed-in user"}), 403
+    return None
+
+# Unsplash proxy with an in-memory LRU/TTL cache
+inspiration_service = InspirationService(
+    UNSPLASH_ACCESS_KEY,
+    max_entries=int(os.getenv("INSPIRATION_CACHE_MAX_ENTRIES", "256")),
+    ttl=int(os.getenv("INSPIRATION_CACHE_TTL_SECONDS", "600")),
+    stale_ttl=int(os.getenv("INSPIRATION_STALE_SECONDS", "3600")),
+)
+
+# Background jobs for slow AI calls (image generation)
+job_queue = JobQueue(
+    None,  # bound to the app by create_app()
+    db,
+    Job,
+    max_workers=int(os.getenv("JOB_WORKERS", "2")),
+    max_pending=int(os.getenv("JOB_MAX_PENDING", "20")),
+)
+
+metrics.REGISTRY.gauge("jobs_pending", "Background jobs queued or running.", job_queue.pending)
+metrics.REGISTRY.gauge(
+    "cloudinary_circuit_open", "1 while the Cloudinary circuit breaker is open.",
+    lambda: int(http_client.breaker_for("cloudinary").state == "open"),
+)
 
 # ==================== ROUTES ====================
 
-@app.route('/')
+@api.route('/')
 def home():
     return jsonify({"message": "Flask backend is running!", "status": "ok"})
 
-@app.route('/api/test', methods=['GET'])
+@api.route('/api/test', methods=['GET'])
 def test_endpoint():
     return jsonify({'status': 'ok', 'message': 'Backend running', 'timestamp': datetime.utcnow().isoformat()}), 200
 
-@app.route('/ping', methods=['GET'])
+@api.route('/ping', methods=['GET'])
 def ping():
     return jsonify({"message": "pong", "status": "ok"}), 200
 
 # ----------------- Auth -----------------
-@app.route('/auth/login', methods=['POST', 'OPTIONS'])
+@api.route('/auth/login', methods=['POST', 'OPTIONS'])
 def login():
     if request.method == 'OPTIONS':
         return '', 200  
@@ -204,58 +517,130 @@ def login():
     if not email or not password:
         return jsonify({"message": "Email and password required"}), 400
 
-    user = User.query.filter_by(email=email).first()
-    if user:
-        if check_password_hash(user.password, password):
-            user_dict = user.to_dict()
-            print(f"✅ Login successful! User data: {user_dict}")
-            return jsonify({
-                "token": "dummy_token",
-                "user": user_dict
-            }), 200
-        print("❌ Invalid password")
-        return jsonify({"message": "Invalid credentials"}), 401
-    else:
+    try:
+        user = User.query.filter_by(email=email).first()
+        if user:
+            if password_hasher.verify(user.password, password):
+                user_dict = user.to_dict()
+                print(f"✅ Login successful: {user.id}")
+                return jsonify({
+                    "token": token_signer.issue(user),
+                    "user": user_dict
+                }), 200
+            print("❌ Invalid password")
+            return jsonify({"message": "Invalid credentials"}), 401
+
         # create user
         print(f"Creating new user: {email}")
-        hashed = generate_password_hash(password)
-        new_user = User(email=email, password=hashed)
-        try:
-            db.session.add(new_user)
-            db.session.commit()
-            user_dict = new_user.to_dict()
-            print(f"✅ New user created! User data: {user_dict}")
-        except IntegrityError:
-            db.session.rollback()
-            print("❌ User creation failed - email conflict")
-            return jsonify({"message": "User creation failed (email conflict)"}), 400
+        hashed = password_hasher.hash(password)
+    except AuthBusy as e:
+        return jsonify({"message": str(e)}), 503, {"Retry-After": "1"}
 
-        return jsonify({
-            "token": "dummy_token",
-            "user": user_dict
-        }), 201
+    new_user = User(email=email, password=hashed)
+    try:
+        db.session.add(new_user)
+        db.session.commit()
+        user_dict = new_user.to_dict()
+        print(f"✅ New user created: {new_user.id}")
+    except IntegrityError:
+        db.session.rollback()
+        print("❌ User creation failed - email conflict")
+        return jsonify({"message": "User creation failed (email conflict)"}), 400
+
+    return jsonify({
+        "token": token_signer.issue(new_user),
+        "user": user_dict
+    }), 201
+
+@api.route('/auth/verify', methods=['GET'])
+def verify_token():
+    """Check the Bearer token signature and expiry without touching the database"""
+    payload = current_token_payload()
+    if not payload:
+        return jsonify({"message": "Invalid or expired token"}), 401
+    return jsonify({
+        "valid": True,
+        "user": {"id": payload["uid"], "client_id": payload["uid"], "email": payload["email"]}
+    }), 200
 
 # ----------------- Appointments -----------------
-@app.route('/api/appointments', methods=['POST', 'OPTIONS'])
+def build_appointment(data):
+    """Validate a new appointment payload; raises ValueError with the first problem."""
+    required = ['name', 'email', 'phone', 'date', 'time', 'type']
+    for field in required:
+        if not data.get(field):
+            raise ValueError(f'Missing field: {field}')
+
+    start_at, end_at = parse_slot(data['date'], data['time'], data.get('duration_minutes'))
+    return Appointment(
+        name=data['name'],
+        email=data['email'],
+        phone=data['phone'],
+        date=data['date'],
+        time=data['time'],
+        start_at=start_at,
+        end_at=end_at,
+        type=data.get('type'),
+        message=data.get('message', '')
+    )
+
+def booking_conflict_message(conflict):
+    return f'Time slot already booked ({conflict.start_at:%Y-%m-%d %H:%M}-{conflict.end_at:%H:%M})'
+
+# Fields that PUT and bulk PATCH may change, with their validators
+APPOINTMENT_FIELDS = {
+    'name': string_field(200),
+    'email': string_field(200),
+    'phone': string_field(50),
+    'type': string_field(100),
+    'message': string_field(required=False),
+    'status': string_field(50),
+}
+
+def reactivation_conflicts(session, items):
+    """
+    Appointments whose status goes from a free one (cancelled, rejected) back
+    to an active one take their slot again, so it must not overlap an active
+    booking or another appointment reactivated in the same batch.
+    ``items`` is [(id, changes)]; returns {id: conflict message}.
+    """
+    reactivating = [i for i, changes in items if changes.get('status') not in (None, *FREE_STATUSES)]
+    if not reactivating:
+        return {}
+    errors, accepted = {}, []
+    rows = (
+        session.query(Appointment)
+        .filter(Appointment.id.in_(reactivating), Appointment.status.in_(FREE_STATUSES),
+                Appointment.start_at.isnot(None))
+        .order_by(Appointment.start_at)
+    )
+    for appt in rows:
+        conflict = find_conflict(Appointment, appt.start_at, appt.end_at, exclude_id=appt.id)
+        if conflict is None:
+            conflict = next((a for a in accepted if a.start_at < appt.end_at and a.end_at > appt.start_at), None)
+        if conflict is not None:
+            errors[appt.id] = booking_conflict_message(conflict)
+        else:
+            accepted.append(appt)
+    return errors
+
+@api.route('/api/appointments', methods=['POST', 'OPTIONS'])
 def create_appointment():
     if request.method == 'OPTIONS':
         return '', 200
     try:
         data = request.get_json() or {}
-        required = ['name', 'email', 'phone', 'date', 'time', 'type']
-        for field in required:
-            if not data.get(field):
-                return jsonify({'message': f'Missing field: {field}'}), 400
-
-        appt = Appointment(
-            name=data['name'],
-            email=data['email'],
-            phone=data['phone'],
-            date=data['date'],
-            time=data['time'],
-            type=data.get('type'),
-            message=data.get('message', '')
-        )
+        try:
+            appt = build_appointment(data)
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+
+        # Check and insert under the write lock so two requests can't book the same slot
+        begin_immediate(db.session)
+        conflict = find_conflict(Appointment, appt.start_at, appt.end_at)
+        if conflict:
+            db.session.rollback()
+            return jsonify({'message': booking_conflict_message(conflict)}), 409
         db.session.add(appt)
         db.session.commit()
         return jsonify({'message': 'Appointment booked successfully', 'appointment': appt.to_dict()}), 201
@@ -264,15 +649,38 @@ def create_appointment():
         print("Error create_appointment:", e)
         return jsonify({'message': f'Error: {str(e)}'}), 500
 
-@app.route('/api/appointments', methods=['GET'])
+@api.route('/api/appointments', methods=['GET'])
 def get_appointments():
+    """Keyset-paginated list: ?limit=&cursor=&status=&email=&created_after=&created_before="""
     try:
-        appts = Appointment.query.order_by(Appointment.created_at.desc()).all()
-        return jsonify({'appointments': [a.to_dict() for a in appts]}), 200
+        query = apply_filters(Appointment.query, Appointment, request.args, {'status': 'status', 'email': 'email'})
+        appts, next_cursor = keyset_page(query, Appointment, request.args)
+        return jsonify({'appointments': [a.to_dict() for a in appts], 'next_cursor': next_cursor}), 200
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
     except Exception as e:
         return jsonify({'message': str(e)}), 500
 
-@app.route('/api/appointments/<appointment_id>', methods=['GET'])
+@api.route('/api/appointments/availability', methods=['GET'])
+def get_availability():
+    """Free slots within business hours: ?from=YYYY-MM-DD&to=YYYY-MM-DD&slot_minutes=60"""
+    try:
+        range_start = datetime.strptime(request.args.get('from', ''), '%Y-%m-%d').date()
+        range_end = datetime.strptime(request.args.get('to') or request.args['from'], '%Y-%m-%d').date()
+        slot_minutes = int(request.args.get('slot_minutes', 60))
+    except (KeyError, ValueError):
+        return jsonify({'message': 'from/to must be YYYY-MM-DD and slot_minutes an integer'}), 400
+    if range_end < range_start or (range_end - range_start).days >= MAX_AVAILABILITY_DAYS:
+        return jsonify({'message': f'Range must be 1-{MAX_AVAILABILITY_DAYS} days'}), 400
+    if not 15 <= slot_minutes <= 480:
+        return jsonify({'message': 'slot_minutes must be between 15 and 480'}), 400
+
+    try:
+        return jsonify({'days': free_slots(Appointment, range_start, range_end, slot_minutes)}), 200
+    except Exception as e:
+        return jsonify({'message': str(e)}), 500
+
+@api.route('/api/appointments/<appointment_id>', methods=['GET'])
 def get_appointment(appointment_id):
     try:
         appointment = Appointment.query.get(appointment_id)
@@ -282,22 +690,47 @@ def get_appointment(appointment_id):
     except Exception as e:
         return jsonify({'message': str(e)}), 500
 
-@app.route('/api/appointments/<appointment_id>', methods=['PUT'])
+@api.route('/api/appointments/<appointment_id>', methods=['PUT'])
 def update_appointment(appointment_id):
     try:
         data = request.get_json() or {}
+        fields = {**APPOINTMENT_FIELDS, 'date': string_field(50), 'time': string_field(50)}
+        try:
+            changes = validate_fields({k: data[k] for k in fields if k in data}, fields)
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+
+        begin_immediate(db.session)
         appointment = Appointment.query.get(appointment_id)
         if not appointment:
+            db.session.rollback()
             return jsonify({'message': 'Not found'}), 404
 
-        appointment.name = data.get('name', appointment.name)
-        appointment.email = data.get('email', appointment.email)
-        appointment.phone = data.get('phone', appointment.phone)
-        appointment.date = data.get('date', appointment.date)
-        appointment.time = data.get('time', appointment.time)
-        appointment.type = data.get('type', appointment.type)
-        appointment.message = data.get('message', appointment.message)
-        appointment.status = data.get('status', appointment.status)
+        if 'date' in data or 'time' in data or 'duration_minutes' in data:
+            duration = data.get('duration_minutes')
+            if duration is None and appointment.start_at and appointment.end_at:
+                duration = (appointment.end_at - appointment.start_at).total_seconds() // 60
+            try:
+                start_at, end_at = parse_slot(
+                    data.get('date', appointment.date), data.get('time', appointment.time), duration
+                )
+            except ValueError as e:
+                db.session.rollback()
+                return jsonify({'message': str(e)}), 400
+            conflict = find_conflict(Appointment, start_at, end_at, exclude_id=appointment.id)
+            if conflict:
+                db.session.rollback()
+                return jsonify({'message': booking_conflict_message(conflict)}), 409
+            appointment.start_at, appointment.end_at = start_at, end_at
+        else:
+            # Same slot, but a cancelled/rejected appointment made active again takes it back
+            conflicts = reactivation_conflicts(db.session, [(appointment.id, changes)])
+            if conflicts:
+                db.session.rollback()
+                return jsonify({'message': conflicts[appointment.id]}), 409
+
+        for field, value in changes.items():
+            setattr(appointment, field, value)
         appointment.updated_at = datetime.utcnow()
 
         db.session.commit()
@@ -306,7 +739,7 @@ def update_appointment(appointment_id):
         db.session.rollback()
         return jsonify({'message': str(e)}), 500
 
-@app.route('/api/appointments/<appointment_id>', methods=['DELETE'])
+@api.route('/api/appointments/<appointment_id>', methods=['DELETE'])
 def delete_appointment(appointment_id):
     try:
         appointment = Appointment.query.get(appointment_id)
@@ -320,39 +753,52 @@ def delete_appointment(appointment_id):
         return jsonify({'message': str(e)}), 500
 
 # ----------------- Contact Messages -----------------
-@app.route('/api/contact', methods=['POST', 'OPTIONS'])
+CONTACT_FIELDS = {'status': string_field(50)}
+
+def build_contact(data):
+    """Validate a new contact message payload; raises ValueError with the first problem."""
+    required = ['name', 'email', 'message']
+    for field in required:
+        if not data.get(field):
+            raise ValueError(f'Missing field: {field}')
+
+    return Contact(
+        name=data['name'],
+        email=data['email'],
+        message=data['message']
+    )
+
+@api.route('/api/contact', methods=['POST', 'OPTIONS'])
 def create_contact():
     if request.method == 'OPTIONS':
         return '', 200
     try:
         data = request.get_json() or {}
-        required = ['name', 'email', 'message']
-        for field in required:
-            if not data.get(field):
-                return jsonify({'message': f'Missing field: {field}'}), 400
-
-        contact = Contact(
-            name=data['name'],
-            email=data['email'],
-            message=data['message']
-        )
-        db.session.add(contact)
-        db.session.commit()
+        try:
+            contact = build_contact(data)
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+
+        save_new(contact)
         return jsonify({'message': 'Message sent successfully', 'contact': contact.to_dict()}), 201
     except Exception as e:
         db.session.rollback()
         print("Error create_contact:", e)
         return jsonify({'message': f'Error: {str(e)}'}), 500
 
-@app.route('/api/contact', methods=['GET'])
+@api.route('/api/contact', methods=['GET'])
 def get_contacts():
+    """Keyset-paginated list: ?limit=&cursor=&status=&email=&created_after=&created_before="""
     try:
-        contacts = Contact.query.order_by(Contact.created_at.desc()).all()
-        return jsonify({'contacts': [c.to_dict() for c in contacts]}), 200
+        query = apply_filters(Contact.query, Contact, request.args, {'status': 'status', 'email': 'email'})
+        contacts, next_cursor = keyset_page(query, Contact, request.args)
+        return jsonify({'contacts': [c.to_dict() for c in contacts], 'next_cursor': next_cursor}), 200
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
     except Exception as e:
         return jsonify({'message': str(e)}), 500
 
-@app.route('/api/contact/<contact_id>', methods=['GET'])
+@api.route('/api/contact/<contact_id>', methods=['GET'])
 def get_contact(contact_id):
     try:
         contact = Contact.query.get(contact_id)
@@ -362,14 +808,19 @@ def get_contact(contact_id):
     except Exception as e:
         return jsonify({'message': str(e)}), 500
 
-@app.route('/api/contact/<contact_id>', methods=['PUT'])
+@api.route('/api/contact/<contact_id>', methods=['PUT'])
 def update_contact(contact_id):
     try:
         data = request.get_json() or {}
+        try:
+            changes = validate_fields({k: data[k] for k in CONTACT_FIELDS if k in data}, CONTACT_FIELDS)
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
         contact = Contact.query.get(contact_id)
         if not contact:
             return jsonify({'message': 'Not found'}), 404
-        contact.status = data.get('status', contact.status)
+        for field, value in changes.items():
+            setattr(contact, field, value)
         contact.updated_at = datetime.utcnow()
         db.session.commit()
         return jsonify({'message': 'Updated', 'contact': contact.to_dict()}), 200
@@ -377,7 +828,7 @@ def update_contact(contact_id):
         db.session.rollback()
         return jsonify({'message': str(e)}), 500
 
-@app.route('/api/contact/<contact_id>', methods=['DELETE'])
+@api.route('/api/contact/<contact_id>', methods=['DELETE'])
 def delete_contact(contact_id):
     try:
         contact = Contact.query.get(contact_id)
@@ -391,7 +842,7 @@ def delete_contact(contact_id):
         return jsonify({'message': str(e)}), 500
 
 # ----------------- Room Analysis -----------------
-@app.route("/api/upload", methods=["POST"])
+@api.route("/api/upload", methods=["POST"])
 def upload_image():
     """Upload image to Cloudinary"""
     try:
@@ -399,55 +850,294 @@ def upload_image():
             return jsonify({"error": "No image file"}), 400
 
         file = request.files["image"]
-        upload_result = cloudinary.uploader.upload(file)
+        upload_result = cloudinary_client.upload(file)
         image_url = upload_result["secure_url"]
 
         return jsonify({"url": image_url})
+    except http_client.CircuitOpenError as e:
+        print("❌ Upload error:", e)
+        return jsonify({"error": str(e)}), 503
     except Exception as e:
         print("❌ Upload error:", e)
         return jsonify({"error": str(e)}), 500
 
-@app.route("/api/analyze", methods=["POST"])
+def analyze_with_cache(image_bytes, source):
+    """Return (analysis, cached) for the image bytes, calling Gemini only on a cache miss."""
+    cache_key = AnalysisCache.key_for(image_bytes, PROMPT_VERSION)
+
+    def analyze():
+        print("Sending image to Gemini/HF for analysis:", source)
+        try:
+            return analysis_pipeline.run(image_bytes)
+        except Exception as e:
+            # The image itself couldn't be decoded, so no analyzer could run
+            print("❌ Gemini analysis error:", e)
+            return {"error": str(e)}
+
+    # Partial results (an analyzer failed or timed out) are returned but not cached
+    analysis, state = analysis_cache.get_or_analyze(cache_key, PROMPT_VERSION, analyze, cacheable=analysis_complete)
+    if state == "hit":
+        print("⚡ Analysis cache hit:", cache_key[:12])
+    return analysis, state == "hit"
+
+def analysis_palette(analysis, image_bytes):
+    """The palette the pipeline already computed; extracted here only for analyses cached without one."""
+    if isinstance(analysis, dict) and analysis.get("palette"):
+        return analysis["palette"]
+    from palette import extract_palette
+    return extract_palette(image_bytes)
+
+def save_room_analysis(user_id, image_url, analysis):
+    """Render the analysis markdown once and persist it with a RoomAnalysis record. Returns (record, html)."""
+    analysis_payload = analysis if isinstance(analysis, dict) else {"text": analysis}
+
+    # Save analysis record in DB, with the HTML the frontend displays
+    record = RoomAnalysis(
+        user_id=user_id,
+        image_path=image_url,
+        analysis_data=analysis_payload
+    )
+    analysis_html = record.render()
+    db.session.add(record)
+    db.session.commit()
+    return record, analysis_html
+
+@api.route("/api/analyze", methods=["POST"])
 def analyze_image():
     try:
         data = request.get_json() or {}
         image_url = data.get("imageUrl")
-        user_id = data.get("userId")  # optional
+        user_id = token_user_id()
+        forbidden = foreign_user_error(data.get("userId"), user_id)
+        if forbidden:
+            return forbidden
 
         if not image_url:
             return jsonify({"error": "No image URL provided"}), 400
 
-        print("Sending image to Gemini/HF for analysis:", image_url)
-        analysis = analyze_room_with_gemini(image_url)
-        print("✅ Gemini response:", analysis)
+        image_bytes = download_image(image_url)
+        analysis, cached = analyze_with_cache(image_bytes, image_url)
+        record, analysis_html = save_room_analysis(user_id, image_url, analysis)
 
-        if isinstance(analysis, dict):
-            analysis_text = analysis.get("suggestions", "")
-            analysis_payload = analysis
-        else:
-            analysis_text = analysis
-            analysis_payload = {"text": analysis_text}
+        response = {"analysis": analysis_html, "record_id": record.id, "cached": cached}
+        if data.get("includePalette"):
+            response["palette"] = analysis_palette(analysis, image_bytes)
+        return jsonify(response), 200
 
-        # Convert markdown to clean HTML for frontend display
-        analysis_html = markdown(analysis_text)
+    except Exception as e:
+        db.session.rollback()
+        print("❌ Gemini analysis error:", e)
+        return jsonify({"error": str(e)}), 500
 
-        # Save analysis record in DB
-        record = RoomAnalysis(
-            user_id=user_id,
-            image_path=image_url,
-            analysis_data=analysis_payload
-        )
-        db.session.add(record)
-        db.session.commit()
+@api.route("/api/analyze/stream", methods=["POST"])
+def analyze_image_stream():
+    """Stream the analysis as Server-Sent Events (start, chunk..., done | error) while Gemini generates it"""
+    data = request.get_json() or {}
+    image_url = data.get("imageUrl")
+    user_id = token_user_id()
+    forbidden = foreign_user_error(data.get("userId"), user_id)
+    if forbidden:
+        return forbidden
 
-        return jsonify({"analysis": analysis_html, "record_id": record.id}), 200
+    if not image_url:
+        return jsonify({"error": "No image URL provided"}), 400
 
+    try:
+        image_bytes = download_image(image_url)
+        # A full pipeline document serves the stream too; streamed text is cached
+        # under its own version so /api/analyze never gets a text-only document
+        cache_key = AnalysisCache.key_for(image_bytes, STREAM_PROMPT_VERSION)
+        cached = (analysis_cache.get(AnalysisCache.key_for(image_bytes, PROMPT_VERSION), count=False)
+                  or analysis_cache.get(cache_key, count=False))
+        analysis_cache.count_lookup(cached is not None)
     except Exception as e:
         db.session.rollback()
         print("❌ Gemini analysis error:", e)
         return jsonify({"error": str(e)}), 500
 
-@app.route("/api/generate-room-image", methods=["POST"])
+    def events():
+        streamer = MarkdownBlockStreamer()
+        yield format_sse("start", {"cached": cached is not None})
+        try:
+            chunks = [cached.get("suggestions", "")] if cached else stream_room_analysis(image_bytes)
+            for chunk in chunks:
+                block = streamer.feed(chunk)
+                if block:
+                    yield format_sse("chunk", {"markdown": block[0], "html": block[1]})
+            block = streamer.flush()
+            if block:
+                yield format_sse("chunk", {"markdown": block[0], "html": block[1]})
+
+            analysis = cached or {"suggestions": streamer.text}
+            if not cached:
+                # Only a stream that ran to the end with some text is worth caching
+                # (an error or a client disconnect never gets here)
+                if not streamer.text.strip():
+                    raise ValueError("Gemini returned an empty analysis")
+                analysis_cache.put(cache_key, STREAM_PROMPT_VERSION, analysis)
+            record, analysis_html = save_room_analysis(user_id, image_url, analysis)
+            yield format_sse("done", {"record_id": record.id, "analysis": analysis_html, "cached": cached is not None})
+        except Exception as e:
+            db.session.rollback()
+            print("❌ Gemini streaming error:", e)
+            yield format_sse("error", {"error": str(e)})
+
+    return Response(
+        stream_with_context(events()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@api.route("/api/room-analysis/upload", methods=["POST"])
+def upload_and_analyze_image():
+    """Upload to Cloudinary and analyze the same bytes concurrently, in one request"""
+    try:
+        if "image" not in request.files:
+            return jsonify({"error": "No image file"}), 400
+
+        image_bytes = request.files["image"].read()
+        user_id = token_user_id()
+        forbidden = foreign_user_error(request.form.get("userId"), user_id)
+        if forbidden:
+            return forbidden
+        if not image_bytes:
+            return jsonify({"error": "Empty image file"}), 400
+
+        # The upload only needs the bytes we already hold, so it runs while Gemini works
+        upload_future = upload_executor.submit(cloudinary_client.upload, BytesIO(image_bytes))
+        analysis, cached = analyze_with_cache(image_bytes, "uploaded file")
+        # The SDK times out each request; this bounds the wait for a retried upload too
+        image_url = upload_future.result(timeout=cloudinary_client.UPLOAD_TIMEOUT * 2)["secure_url"]
+
+        record, analysis_html = save_room_analysis(user_id, image_url, analysis)
+
+        response = {
+            "url": image_url,
+            "analysis": analysis_html,
+            "record_id": record.id,
+            "cached": cached
+        }
+        if request.form.get("includePalette") in ("1", "true"):
+            response["palette"] = analysis_palette(analysis, image_bytes)
+        return jsonify(response), 200
+
+    except http_client.CircuitOpenError as e:
+        db.session.rollback()
+        print("❌ Upload+analyze error:", e)
+        return jsonify({"error": str(e)}), 503
+    except FutureTimeout:
+        db.session.rollback()
+        print("❌ Upload+analyze error: Cloudinary upload timed out")
+        return jsonify({"error": "Image upload timed out"}), 504
+    except Exception as e:
+        db.session.rollback()
+        print("❌ Upload+analyze error:", e)
+        return jsonify({"error": str(e)}), 500
+
+def analysis_summaries(user_id):
+    """
+    History projection for one user's analyses: the id, image, date and the
+    excerpt stored at write time. The analysis JSON and HTML are never read.
+    """
+    return db.session.query(
+        RoomAnalysis.id, RoomAnalysis.image_path, RoomAnalysis.created_at, RoomAnalysis.excerpt
+    ).filter(RoomAnalysis.user_id == user_id)
+
+def summary_to_dict(row):
+    return {
+        'id': row.id,
+        'thumbnail_url': cloudinary_client.thumbnail_url(row.image_path),
+        'image_path': row.image_path,
+        'excerpt': row.excerpt or '',
+        'created_at': row.created_at.isoformat() if row.created_at else None
+    }
+
+@api.route("/api/room-analysis/user", methods=["GET"])
+def get_user_analyses():
+    """The signed-in user's analysis history, newest first: ?limit=&cursor="""
+    payload = current_token_payload()
+    if not payload:
+        return jsonify({"message": "Invalid or expired token"}), 401
+    try:
+        rows, next_cursor = keyset_page(analysis_summaries(payload["uid"]), RoomAnalysis, request.args)
+        return jsonify({"analyses": [summary_to_dict(row) for row in rows], "next_cursor": next_cursor}), 200
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    except Exception as e:
+        return jsonify({"message": str(e)}), 500
+
+@api.route("/api/room-analysis/<analysis_id>", methods=["GET"])
+def get_room_analysis(analysis_id):
+    """One full analysis record; records saved for a user are only visible with that user's token"""
+    try:
+        # Access check and revalidation need neither the JSON nor the HTML
+        header = db.session.query(RoomAnalysis.user_id, RoomAnalysis.content_hash).filter_by(id=analysis_id).first()
+        payload = current_token_payload()
+        if header is None or (header.user_id and (not payload or payload["uid"] != header.user_id)):
+            return jsonify({"message": "Not found"}), 404
+        client_tag = header.content_hash and http_cache.matching_etag(request, header.content_hash)
+        if client_tag:
+            return http_cache.not_modified(client_tag)
+
+        record = db.session.get(RoomAnalysis, analysis_id, options=[db.undefer_group('content')])
+        if record.analysis_html is None:
+            # Saved before HTML was stored: render it this once
+            record.render()
+            db.session.commit()
+        response = jsonify(record.to_dict())
+        response.set_etag(record.content_hash)
+        return response, 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"message": str(e)}), 500
+
+@api.route("/api/palette", methods=["POST"])
+def get_palette():
+    """Dominant wall/decor colours of a room image (multipart `image` or JSON `imageUrl`)"""
+    from palette import extract_palette  # NumPy + Pillow, loaded on first use
+    from PIL import UnidentifiedImageError
+
+    try:
+        if "image" in request.files:
+            image_bytes = request.files["image"].read()
+            count = request.form.get("count", 6)
+        else:
+            data = request.get_json() or {}
+            if not data.get("imageUrl"):
+                return jsonify({"error": "No image file or image URL provided"}), 400
+            image_bytes = download_image(data["imageUrl"])
+            count = data.get("count", 6)
+
+        count = int(count)
+        if not 1 <= count <= 16:
+            return jsonify({"error": "count must be between 1 and 16"}), 400
+
+        return jsonify({"palette": extract_palette(image_bytes, color_count=count)}), 200
+    except (ValueError, UnidentifiedImageError) as e:
+        return jsonify({"error": f"Invalid image or count: {e}"}), 400
+    except Exception as e:
+        print("❌ Palette error:", e)
+        return jsonify({"error": str(e)}), 500
+
+@api.route("/api/analyze/cache-stats", methods=["GET"])
+def analysis_cache_stats():
+    try:
+        return jsonify(analysis_cache.stats()), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+def extract_generated_url(result):
+    """Pick the generated image URL out of whatever shape the generator returned."""
+    if not isinstance(result, dict):
+        return None
+    return (
+        result.get("generatedImageUrl")
+        or result.get("url")
+        or result.get("image_url")
+        or (result.get("data") or {}).get("url")
+    )
+
+@api.route("/api/generate-room-image", methods=["POST"])
 def generate_room_image():
     """Generate an AI-inspired version of the room based on suggestions"""
     try:
@@ -458,74 +1148,200 @@ def generate_room_image():
         if not image_url or not suggestions:
             return jsonify({"error": "Missing imageUrl or suggestions"}), 400
 
+        generated_url, state = generate_with_cache(image_url, suggestions)
+        return jsonify({"generatedImageUrl": generated_url, "cached": state != "miss"})
+
+    except GenerationFailed as e:
+        print("⚠️ Image generation failed:", e)
+        return jsonify({"error": str(e)}), 500
+    except Exception as e:
+        db.session.rollback()
+        print("❌ Image generation route error:", e)
+        return jsonify({"error": str(e)}), 500
+
+class GenerationFailed(RuntimeError):
+    """The generator returned an error or no image URL."""
+
+def generate_with_cache(image_url, suggestions):
+    """
+    Return (generated_url, state). Repeat requests are served from the
+    generation cache; identical concurrent requests share one SDXL call.
+    """
+    def generate():
         print("Generating inspirational image...")
         result = generate_room_inspiration(image_url, suggestions)
+        generated_url = extract_generated_url(result)
+        if not generated_url:
+            error = result.get("error") if isinstance(result, dict) else None
+            raise GenerationFailed(error or "No image URL returned")
+        return generated_url
+
+    generated_url, state = generation_cache.get_or_generate(
+        INSPIRATION_PROMPT_VERSION, image_url, suggestions, generate
+    )
+    GENERATION_LOOKUPS.inc(state)
+    return generated_url, state
+
+def run_generate_room_image_job(payload):
+    generated_url, state = generate_with_cache(payload["imageUrl"], payload["suggestions"])
+    return {"generatedImageUrl": generated_url, "cached": state != "miss"}
+
+job_queue.register("generate-room-image", run_generate_room_image_job)
+
+def save_home_analysis(user_id, rooms, summary):
+    """
+    Persist one RoomAnalysis per room plus the house-level summary (a record
+    whose analysis_data has scope "home"), in one commit.
+    Returns (room record ids, summary record id or None).
+    """
+    records = []
+    for image_url, analysis in rooms:
+        record = RoomAnalysis(id=gen_uuid(), user_id=user_id, image_path=image_url, analysis_data=analysis)
+        record.render()
+        records.append(record)
+    summary_record = None
+    if summary:
+        summary_record = RoomAnalysis(
+            id=gen_uuid(),
+            user_id=user_id,
+            image_path=rooms[0][0],
+            analysis_data={"text": summary, "scope": "home", "room_analysis_ids": [r.id for r in records]},
+        )
+        summary_record.render()
+        records.append(summary_record)
+    db.session.add_all(records)
+    db.session.commit()
+    room_ids = [record.id for record in records if record is not summary_record]
+    return room_ids, summary_record.id if summary_record else None
+
+# Downloads, preprocessing and the multi-image Gemini requests of home analyses
+home_analysis = HomeAnalysis(
+    analysis_cache,
+    HOME_PROMPT_VERSION,
+    save_home_analysis,
+    ThreadPoolExecutor(
+        max_workers=int(os.getenv("HOME_ANALYSIS_WORKERS", "4")),
+        thread_name_prefix="home-analysis",
+    ),
+    max_images_per_request=int(os.getenv("HOME_ANALYSIS_IMAGES_PER_REQUEST", "20")),
+    max_request_bytes=int(os.getenv("HOME_ANALYSIS_MAX_REQUEST_BYTES", "14000000")),
+    max_edge=int(os.getenv("HOME_ANALYSIS_MAX_EDGE", "1024")),
+)
 
-        generated_url = (
-            result.get("generatedImageUrl") if isinstance(result, dict) else None
-        ) or (result.get("url") if isinstance(result, dict) else None) or (result.get("image_url") if isinstance(result, dict) else None) or (result.get("data", {}).get("url") if isinstance(result, dict) else None)
+def run_home_analysis_job(payload, report):
+    return home_analysis.run(payload["imageUrls"], payload.get("userId"), report)
 
-        if not generated_url:
-            print("⚠️ No valid URL found in AI result:", result)
-            return jsonify({"error": "No image URL returned"}), 500
+job_queue.register("analyze-home", run_home_analysis_job, reports_progress=True)
 
-        return jsonify({"generatedImageUrl": generated_url})
+# ----------------- Background Jobs -----------------
+@api.route("/api/jobs/generate-room-image", methods=["POST"])
+def enqueue_generate_room_image():
+    """Queue image generation and return a job id to poll immediately"""
+    try:
+        data = request.get_json() or {}
+        image_url = data.get("imageUrl")
+        suggestions = data.get("suggestions")
+
+        if not image_url or not suggestions:
+            return jsonify({"error": "Missing imageUrl or suggestions"}), 400
+
+        job = job_queue.submit("generate-room-image", {"imageUrl": image_url, "suggestions": suggestions})
+        return jsonify({
+            "job_id": job.id,
+            "status": job.status,
+            "status_url": f"/api/jobs/{job.id}"
+        }), 202
 
+    except JobQueueFull as e:
+        db.session.rollback()
+        return jsonify({"error": f"Too many pending jobs: {e}"}), 503, {"Retry-After": "5"}
     except Exception as e:
-        print("❌ Image generation route error:", e)
+        db.session.rollback()
+        print("❌ Job enqueue error:", e)
+        return jsonify({"error": str(e)}), 500
+
+@api.route("/api/room-analysis/batch", methods=["POST"])
+def enqueue_home_analysis():
+    """
+    Analyse all room photos of a home in one job: {"imageUrls": [...]}, saved for the signed-in user.
+    Poll the job for per-image progress; the result lists one record per room plus a summary.
+    """
+    try:
+        data = request.get_json() or {}
+        image_urls = data.get("imageUrls")
+        if not isinstance(image_urls, list) or not image_urls:
+            return jsonify({"error": "imageUrls must be a non-empty list"}), 400
+        if len(image_urls) > MAX_HOME_IMAGES:
+            return jsonify({"error": f"At most {MAX_HOME_IMAGES} images per home analysis"}), 400
+        if not all(isinstance(url, str) and url.startswith(("http://", "https://")) for url in image_urls):
+            return jsonify({"error": "imageUrls must be http(s) URLs"}), 400
+
+        user_id = token_user_id()
+        forbidden = foreign_user_error(data.get("userId"), user_id)
+        if forbidden:
+            return forbidden
+        job = job_queue.submit("analyze-home", {"imageUrls": image_urls, "userId": user_id})
+        return jsonify({
+            "job_id": job.id,
+            "status": job.status,
+            "status_url": f"/api/jobs/{job.id}"
+        }), 202
+
+    except JobQueueFull as e:
+        db.session.rollback()
+        return jsonify({"error": f"Too many pending jobs: {e}"}), 503, {"Retry-After": "5"}
+    except Exception as e:
+        db.session.rollback()
+        print("❌ Home analysis enqueue error:", e)
+        return jsonify({"error": str(e)}), 500
+
+@api.route("/api/jobs/<job_id>", methods=["GET"])
+def get_job(job_id):
+    try:
+        job = db.session.get(Job, job_id)
+        if not job:
+            return jsonify({"error": "Job not found"}), 404
+        return jsonify(job.to_dict()), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@api.route("/api/jobs/<job_id>", methods=["DELETE"])
+def cancel_job(job_id):
+    try:
+        job = job_queue.cancel(job_id)
+        if not job:
+            return jsonify({"error": "Job not found"}), 404
+        return jsonify(job.to_dict()), 200
+    except Exception as e:
+        db.session.rollback()
         return jsonify({"error": str(e)}), 500
 
 # ----------------- Repairs & Maintenance -----------------
-@app.route('/api/repairs', methods=['POST', 'OPTIONS'])
+REPAIR_FIELDS = {'status': string_field(50), 'whatsapp_sent': boolean_field}
+
+def build_repair(data):
+    """Validate a new repair request (camelCase or snake_case keys); raises ValueError with the first problem."""
+    return Repair(**RepairStore.build(data))
+
+@api.route('/api/repairs', methods=['POST', 'OPTIONS'])
 def create_repair():
     if request.method == 'OPTIONS':
         return '', 200
 
     try:
         data = request.get_json() or {}
-        
-        print("Received data:", data)  # Debug log
-        
-        # Extract fields - try both camelCase and snake_case
-        full_name = data.get('fullName') or data.get('full_name')
-        contact_number = data.get('contactNumber') or data.get('contact_number')
-        address = data.get('address')
-        product_name = data.get('productName') or data.get('product_name')
-        client_id = data.get('clientId') or data.get('client_id')
-        message = data.get('message', '')
-        
-        print(f"Extracted - Name: {full_name}, Phone: {contact_number}, Address: {address}, Product: {product_name}, ClientID: {client_id}")
-        
-        # Validate required fields
-        if not full_name:
-            return jsonify({'error': 'Full name is required'}), 400
-        if not contact_number:
-            return jsonify({'error': 'Contact number is required'}), 400
-        if not address:
-            return jsonify({'error': 'Address is required'}), 400
-        if not product_name:
-            return jsonify({'error': 'Product name is required'}), 400
-
-        repair = Repair(
-            full_name=full_name,
-            contact_number=contact_number,
-            address=address,
-            product_name=product_name,
-            client_id=client_id,  # This is optional, can be None
-            message=message,
-            status='pending',
-            whatsapp_sent=False
-        )
 
-        db.session.add(repair)
-        db.session.commit()
-        
-        print("✅ Repair request saved:", repair.to_dict())
+        try:
+            repair = repair_store.create(data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        print("✅ Repair request saved:", repair['id'])
 
         return jsonify({
             'status': 'success',
             'message': 'Repair request submitted successfully. Our team will contact you on WhatsApp soon.',
-            'repair': repair.to_dict()
+            'repair': Repair(**repair).to_dict()
         }), 201
 
     except Exception as e:
@@ -535,16 +1351,25 @@ def create_repair():
         traceback.print_exc()
         return jsonify({'error': f'Server error: {str(e)}'}), 500
 
-@app.route('/api/repairs', methods=['GET'])
+@api.route('/api/repairs', methods=['GET'])
 def get_repairs():
+    """Keyset-paginated list: ?limit=&cursor=&status=&client_id=&created_after=&created_before="""
     try:
-        repairs = Repair.query.order_by(Repair.created_at.desc()).all()
-        return jsonify({'status': 'success', 'repairs': [r.to_dict() for r in repairs], 'count': len(repairs)}), 200
+        query = apply_filters(Repair.query, Repair, request.args, {'status': 'status', 'client_id': 'client_id'})
+        repairs, next_cursor = keyset_page(query, Repair, request.args)
+        return jsonify({
+            'status': 'success',
+            'repairs': [r.to_dict() for r in repairs],
+            'count': len(repairs),
+            'next_cursor': next_cursor
+        }), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         print(f"❌ Error getting repairs: {e}")
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/repairs/<repair_id>', methods=['GET'])
+@api.route('/api/repairs/<repair_id>', methods=['GET'])
 def get_repair(repair_id):
     try:
         repair = Repair.query.get(repair_id)
@@ -554,16 +1379,20 @@ def get_repair(repair_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/repairs/<repair_id>', methods=['PUT'])
+@api.route('/api/repairs/<repair_id>', methods=['PUT'])
 def update_repair(repair_id):
     try:
         data = request.get_json() or {}
+        try:
+            changes = validate_fields({k: data[k] for k in REPAIR_FIELDS if k in data}, REPAIR_FIELDS)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         repair = Repair.query.get(repair_id)
         if not repair:
             return jsonify({'error': 'Repair request not found'}), 404
 
-        repair.status = data.get('status', repair.status)
-        repair.whatsapp_sent = data.get('whatsapp_sent', repair.whatsapp_sent)
+        for field, value in changes.items():
+            setattr(repair, field, value)
         repair.updated_at = datetime.utcnow()
         db.session.commit()
 
@@ -572,7 +1401,7 @@ def update_repair(repair_id):
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/repairs/<repair_id>', methods=['DELETE'])
+@api.route('/api/repairs/<repair_id>', methods=['DELETE'])
 def delete_repair(repair_id):
     try:
         repair = Repair.query.get(repair_id)
@@ -585,7 +1414,364 @@ def delete_repair(repair_id):
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+# ----------------- Inspiration (Unsplash proxy) -----------------
+def inspiration_response(query, count):
+    if not query:
+        return jsonify({'message': 'Search query required'}), 400
+    try:
+        count = int(count)
+    except (TypeError, ValueError):
+        return jsonify({'message': 'count must be an integer'}), 400
+
+    try:
+        payload, etag, max_age, state = inspiration_service.get_images(query, count)
+    except (RuntimeError, http_client.CircuitOpenError) as e:
+        return jsonify({'message': str(e)}), 503
+    except Exception as e:
+        print("❌ Inspiration error:", e)
+        return jsonify({'message': str(e)}), 500
+
+    response = jsonify(payload)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = (
+        f'public, max-age={max_age}, stale-while-revalidate={inspiration_service.stale_ttl}'
+    )
+    response.headers['X-Cache'] = state.upper()
+    # If-None-Match (in any encoding) is answered by http_cache's after_request hook
+    return response
+
+@api.route('/api/inspiration/<room_type>/<style>', methods=['GET'])
+def get_inspiration(room_type, style):
+    return inspiration_response(normalize_query(style, room_type, 'interior'), request.args.get('count', 9))
+
+@api.route('/api/inspiration/search', methods=['GET'])
+def search_inspiration():
+    return inspiration_response(normalize_query(request.args.get('query', '')), request.args.get('count', 12))
+
+@api.route('/api/inspiration/stats', methods=['GET'])
+def inspiration_stats():
+    return jsonify(inspiration_service.stats), 200
+
+# ----------------- Pricing -----------------
+MAX_ROOMS_PER_QUOTE = 100
+
+def build_estimates(rooms, user_id):
+    """Quote normalized rooms in one pass and return unsaved PricingEstimate rows."""
+    breakdowns = quote_rooms(rooms)
+    estimates = [
+        PricingEstimate(
+            user_id=user_id,
+            estimated_price=breakdown['estimated_price'],
+            price_breakdown=breakdown,
+            status='quoted',
+            **room
+        )
+        for room, breakdown in zip(rooms, breakdowns)
+    ]
+    return estimates, breakdowns
+
+@api.route('/api/pricing/rates', methods=['GET'])
+def get_pricing_rates():
+    rates = load_rate_table()
+    return jsonify({k: v for k, v in rates.items() if not k.startswith('_')}), 200
+
+@api.route('/api/pricing/estimate', methods=['POST'])
+def create_pricing_estimate():
+    try:
+        data = request.get_json() or {}
+        room = normalize_room(data, load_rate_table())
+        user_id = token_user_id()
+        forbidden = foreign_user_error(data.get('user_id') or data.get('userId'), user_id)
+        if forbidden:
+            return forbidden
+        (estimate,), _ = build_estimates([room], user_id)
+
+        db.session.add(estimate)
+        db.session.commit()
+        return jsonify({'estimate': estimate.to_dict()}), 201
+    except PricingError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        print("❌ Pricing error:", e)
+        return jsonify({'error': str(e)}), 500
+
+@api.route('/api/pricing/estimate/batch', methods=['POST'])
+def create_pricing_estimates_batch():
+    """Quote a whole multi-room project in one request: {"rooms": [...]}, saved for the signed-in user"""
+    try:
+        data = request.get_json() or {}
+        rooms = data.get('rooms') if isinstance(data, dict) else None
+        if not isinstance(rooms, list) or not rooms:
+            return jsonify({'error': 'rooms must be a non-empty list'}), 400
+        if len(rooms) > MAX_ROOMS_PER_QUOTE:
+            return jsonify({'error': f'At most {MAX_ROOMS_PER_QUOTE} rooms per quote'}), 400
+
+        rates = load_rate_table()
+        normalized, errors = [], []
+        for index, room in enumerate(rooms):
+            try:
+                normalized.append(normalize_room({} if room is None else room, rates))
+            except PricingError as e:
+                errors.append({'index': index, 'error': str(e)})
+        if errors:
+            return jsonify({'error': 'Invalid rooms', 'errors': errors}), 400
+
+        user_id = token_user_id()
+        forbidden = foreign_user_error(data.get('user_id') or data.get('userId'), user_id)
+        if forbidden:
+            return forbidden
+        estimates, breakdowns = build_estimates(normalized, user_id)
+        db.session.add_all(estimates)
+        db.session.commit()
+
+        return jsonify({
+            'estimates': [e.to_dict() for e in estimates],
+            'project': summarize_project(breakdowns, rates)
+        }), 201
+    except Exception as e:
+        db.session.rollback()
+        print("❌ Batch pricing error:", e)
+        return jsonify({'error': str(e)}), 500
+
+# ----------------- Bulk Create / Update / Delete -----------------
+BULK_ENTITIES = {
+    # (model, builder, updatable fields -> validators, update check).
+    # Rescheduling (date/time) goes through PUT; reactivations are conflict-checked here too
+    'appointments': (Appointment, build_appointment, APPOINTMENT_FIELDS, reactivation_conflicts),
+    'contact': (Contact, build_contact, CONTACT_FIELDS, None),
+    'repairs': (Repair, build_repair, REPAIR_FIELDS, None),
+}
+
+def booking_builder():
+    """build_appointment plus double-booking checks against the DB and earlier records in the batch."""
+    accepted = []
+
+    def build(data):
+        appt = build_appointment(data)
+        conflict = find_conflict(Appointment, appt.start_at, appt.end_at)
+        if conflict is None:
+            conflict = next((a for a in accepted if a.start_at < appt.end_at and a.end_at > appt.start_at), None)
+        if conflict is not None:
+            raise ValueError(booking_conflict_message(conflict))
+        accepted.append(appt)
+        return appt
+
+    return build
+
+def handle_bulk(entity):
+    """
+    POST   {"records": [...]}                          create many
+    PATCH  {"ids": [...], "changes": {...}}             same change for many rows
+           {"updates": [{"id": ..., field: value}]}     per-row changes
+    DELETE {"ids": [...]}                               delete many
+    All in a single transaction and commit; results are reported per item.
+    """
+    model, build, fields, check = BULK_ENTITIES[entity]
+    try:
+        data = request.get_json() or {}
+        if request.method == 'POST':
+            if model is Appointment:
+                begin_immediate(db.session)
+                build = booking_builder()
+            results, _ = bulk_create(db.session, model, data.get('records'), build)
+        elif request.method == 'PATCH':
+            if check is not None:
+                # Conflict checks and updates under one write lock, as for POST
+                begin_immediate(db.session)
+            results = bulk_update(db.session, model, data, fields, check)
+        else:
+            results = bulk_delete(db.session, model, data.get('ids'))
+        db.session.commit()
+        return jsonify({'results': results, 'summary': summarize(results)}), 200
+    except BulkRequestError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        print(f"❌ Bulk {request.method} {entity} error:", e)
+        return jsonify({'error': str(e)}), 500
+
+@api.route('/api/appointments/bulk', methods=['POST', 'PATCH', 'DELETE'])
+def bulk_appointments():
+    return handle_bulk('appointments')
+
+@api.route('/api/contact/bulk', methods=['POST', 'PATCH', 'DELETE'])
+def bulk_contacts():
+    return handle_bulk('contact')
+
+@api.route('/api/repairs/bulk', methods=['POST', 'PATCH', 'DELETE'])
+def bulk_repairs():
+    return handle_bulk('repairs')
+
+# ----------------- Bulk Exports -----------------
+EXPORTABLE_MODELS = {
+    'repairs': Repair,
+    'appointments': Appointment,
+    'contacts': Contact,
+    'room-analyses': RoomAnalysis,
+}
+
+@api.route('/api/export/<entity>', methods=['GET'])
+def export_entity(entity):
+    """Stream a whole table as NDJSON (default) or CSV: ?format=csv&created_after=&created_before="""
+    model = EXPORTABLE_MODELS.get(entity)
+    if model is None:
+        return jsonify({'error': f'Unknown export: {entity}'}), 404
+
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in ('ndjson', 'csv'):
+        return jsonify({'error': 'format must be ndjson or csv'}), 400
+
+    try:
+        # Validate the filters up front; errors inside the stream can't change the status code
+        statement = export_statement(model, lambda stmt: apply_filters(stmt, model, request.args, {}))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    columns = [column.name for column in model.__table__.columns]
+    batches = iter_batches(db.session, statement)
+    if export_format == 'csv':
+        body, mimetype = stream_csv(batches, columns), 'text/csv'
+    else:
+        body, mimetype = stream_ndjson(batches, columns), 'application/x-ndjson'
+
+    filename = f"{entity}-{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}.{export_format}"
+    return Response(
+        stream_with_context(body),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
+# ----------------- Search -----------------
+@api.route('/api/search', methods=['GET'])
+def search_records():
+    """Ranked full-text search: ?q=&type=contacts,repairs,room_analyses&limit=20&offset=0"""
+    query = (request.args.get('q') or '').strip()
+    if not query:
+        return jsonify({'error': 'q is required'}), 400
+
+    entities = [t for t in request.args.get('type', '').split(',') if t] or None
+    unknown = set(entities or []) - set(search.SEARCH_INDEXES)
+    if unknown:
+        return jsonify({'error': f"Unknown type: {', '.join(sorted(unknown))}"}), 400
+    try:
+        limit = min(int(request.args.get('limit', 20)), search.MAX_RESULTS)
+        offset = int(request.args.get('offset', 0))
+    except ValueError:
+        return jsonify({'error': 'limit and offset must be integers'}), 400
+    if limit < 1 or not 0 <= offset <= search.MAX_OFFSET:
+        return jsonify({'error': f'limit must be positive and offset at most {search.MAX_OFFSET}'}), 400
+
+    try:
+        results, next_offset = search.search(db.session, query, entities, limit, offset)
+        return jsonify({'results': results, 'next_offset': next_offset}), 200
+    except Exception as e:
+        print("❌ Search error:", e)
+        return jsonify({'error': str(e)}), 500
+
+# ==================== APP FACTORY ====================
+def init_db():
+    """Create tables, add missing columns/indexes and migrate legacy rows."""
+    db.create_all()
+    ensure_columns(db)
+    ensure_indexes(db)
+    backfill_slots(db.session, Appointment)
+    backfill_excerpts()
+    # New search indexes start empty: fill them from the existing rows
+    created = search.ensure_search_schema(db.engine)
+    if created:
+        search.rebuild(db.engine, created)
+    job_queue.recover_interrupted()
+
+@click.command('init-db')
+@with_appcontext
+def init_db_command():
+    """Create or upgrade the database schema (run once per deploy)."""
+    init_db()
+    click.echo(f"Initialized the database at {db.engine.url.database}")
+
+@click.command('migrate-repairs')
+@click.option('--source', default='repairs.db', show_default=True, help='Legacy repairs.py database file.')
+@click.option('--batch-size', default=500, show_default=True, help='Rows per transaction.')
+@click.option('--restart', is_flag=True, help='Read from the first legacy row again (copied rows are skipped).')
+@with_appcontext
+def migrate_repairs_command(source, batch_size, restart):
+    """Copy repair_requests from the legacy repairs.db into the Repair table (resumable, idempotent)."""
+    if not os.path.exists(source):
+        raise click.ClickException(f"No legacy database at {source}")
+    db.create_all()
+
+    def progress(report):
+        done = report['processed'] / report['total'] * 100 if report['total'] else 100
+        click.echo(f"  {report['processed']}/{report['total']} rows ({done:.1f}%), "
+                   f"copied {report['copied']}, already present {report['skipped']}, "
+                   f"{report['rows_per_second']} rows/s")
+
+    report = migrate_legacy_repairs(
+        db.engine, Repair.__table__, MigrationCheckpoint.__table__, source,
+        batch_size=batch_size, restart=restart, progress=progress,
+    )
+    click.echo(f"Migrated {source}: copied {report['copied']}, already present {report['skipped']}, "
+               f"last legacy id {report['last_source_id']}")
+    if report["unparsed_dates"]:
+        click.echo(f"{len(report['unparsed_dates'])} rows had an unreadable created_at and were dated "
+                   f"at migration time; legacy ids: {', '.join(map(str, report['unparsed_dates']))}")
+
+@click.command('rebuild-search')
+@with_appcontext
+def rebuild_search_command():
+    """Re-index all contacts, repairs and room analyses for /api/search."""
+    search.ensure_search_schema(db.engine)
+    search.rebuild(db.engine)
+    click.echo("Rebuilt search indexes: " + ", ".join(search.SEARCH_INDEXES))
+
+def create_app(config=None):
+    """
+    Build the Flask app. No schema work happens here; run
+    `flask --app app init-db` (or call init_db()) before serving.
+    """
+    global write_queue, token_signer
+
+    app = Flask(__name__)
+    CORS(app)
+    app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+    app.config['MAX_CONTENT_LENGTH'] = MAX_CONTENT_LENGTH
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{DB_PATH}"
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = sqlite_engine_options()
+    app.config['SECRET_KEY'] = SECRET_KEY
+    app.config.update(config or {})
+    if not app.config['SECRET_KEY'] or app.config['SECRET_KEY'] in PLACEHOLDER_SECRET_KEYS:
+        raise RuntimeError("SECRET_KEY must be set to a random secret (it signs the auth tokens)")
+    token_signer = TokenSigner(app.config['SECRET_KEY'], max_age=AUTH_TOKEN_MAX_AGE)
+
+    os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+
+    db.init_app(app)
+    with app.app_context():
+        # WAL, busy_timeout, cache/mmap sizing on every pooled connection
+        install_sqlite_pragmas(db.engine)
+        if write_queue is None and os.getenv("DB_WRITE_QUEUE", "0") == "1":
+            write_queue = WriteQueue(db.engine).start()
+        repair_store.bind(db.engine, write_queue)
+
+    # Request latency/status histograms and /metrics; REQUEST_LOG=1 adds a JSON line per request
+    metrics.install_flask(app, log_requests=os.getenv("REQUEST_LOG", "0") == "1")
+    # ETag/304 and gzip for GET responses (registered after metrics so 304s are counted)
+    http_cache.install_flask(app)
+    app.register_blueprint(api)
+    app.cli.add_command(init_db_command)
+    app.cli.add_command(rebuild_search_command)
+    app.cli.add_command(migrate_repairs_command)
+    job_queue.init_app(app)
+    return app
+
 # ==================== RUN ====================
 if __name__ == "__main__":
+    app = create_app()
+    with app.app_context():
+        init_db()
+    print("Using DB at:", DB_PATH)
     print("Starting Flask server at http://127.0.0.1:5000")
     app.run(host="0.0.0.0", port=5000, debug=False)
\ No newline at end of file
@@ -0,0 +1,96 @@
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+
+from itsdangerous import BadSignature, SignatureExpired, URLSafeTimedSerializer
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class AuthBusy(Exception):
+    """Raised when the password-hashing pool is saturated; callers should answer 503."""
+
+
+class PasswordHasher:
+    """
+    Runs the deliberately slow password KDF off the request threads.
+
+    Work goes to a small process pool (so it doesn't hold the GIL either).
+    At most ``max_workers + max_queue`` hashes may be in flight; beyond that
+    calls fail fast with AuthBusy instead of queueing without bound, which
+    keeps login latency bounded during a burst. ``max_workers=0`` hashes
+    inline on the calling thread.
+    """
+
+    def __init__(self, max_workers=2, max_queue=16, timeout=10.0):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max(1, max_workers + max_queue))
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                # Spawned, not forked: a fork of this threaded server can inherit held locks
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn"))
+            return self._executor
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise AuthBusy("Too many concurrent logins, try again shortly")
+        if self.max_workers == 0:
+            try:
+                return fn(*args)
+            finally:
+                self._slots.release()
+
+        try:
+            future = self._pool().submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            raise AuthBusy("Password check timed out")
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password)
+
+    def verify(self, password_hash, password):
+        return self._run(check_password_hash, password_hash, password)
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+class TokenSigner:
+    """Stateless signed session tokens: verifying one is an HMAC check, no DB hit."""
+
+    def __init__(self, secret_key, max_age=7 * 24 * 3600):
+        self.max_age = max_age
+        self._serializer = URLSafeTimedSerializer(secret_key, salt="auth-token")
+
+    def issue(self, user):
+        return self._serializer.dumps({"uid": user.id, "email": user.email})
+
+    def verify(self, token):
+        """Return the token payload, or None if it is invalid or expired."""
+        if not token:
+            return None
+        try:
+            return self._serializer.loads(token, max_age=self.max_age)
+        except (BadSignature, SignatureExpired):
+            return None
+
+
+def bearer_token(headers):
+    auth_header = headers.get("Authorization", "")
+    if auth_header.startswith("Bearer "):
+        return auth_header[len("Bearer "):].strip()
+    return None
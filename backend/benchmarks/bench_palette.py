@@ -0,0 +1,89 @@
+"""
+Compare palette.extract_palette against ColorThief on a fixture set.
+
+    python benchmarks/bench_palette.py                 # synthetic room-like fixtures
+    python benchmarks/bench_palette.py photos/*.jpg    # your own photos
+
+Prints per-image timings (median of --repeat runs) for both extractors.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from palette import extract_palette  # noqa: E402
+
+FIXTURE_SIZES = [(640, 480), (1536, 1152), (4000, 3000)]
+
+
+def synthetic_fixtures(seed=7):
+    """Room-like JPEGs: a few large flat regions (walls, floor, furniture) plus sensor noise."""
+    rng = np.random.default_rng(seed)
+    fixtures = []
+    for width, height in FIXTURE_SIZES:
+        pixels = np.empty((height, width, 3), dtype=np.float32)
+        pixels[: height // 2] = rng.integers(150, 250, 3)           # wall
+        pixels[height // 2:] = rng.integers(60, 160, 3)             # floor
+        pixels[height // 3: height * 3 // 4, width // 4: width // 2] = rng.integers(0, 255, 3)  # sofa
+        pixels[height // 5: height // 2, width * 2 // 3: width * 5 // 6] = rng.integers(0, 255, 3)  # art
+        pixels += rng.normal(0, 8, pixels.shape)
+        buffer = BytesIO()
+        Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8)).save(buffer, "JPEG", quality=90)
+        fixtures.append((f"synthetic_{width}x{height}.jpg", buffer.getvalue()))
+    return fixtures
+
+
+def file_fixtures(paths):
+    fixtures = []
+    for path in paths:
+        with open(path, "rb") as f:
+            fixtures.append((os.path.basename(path), f.read()))
+    return fixtures
+
+
+def time_call(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("images", nargs="*", help="image files (defaults to synthetic fixtures)")
+    parser.add_argument("--colors", type=int, default=6)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    try:
+        from colorthief import ColorThief
+    except ImportError:
+        ColorThief = None
+        print("colorthief not installed - only timing extract_palette")
+
+    fixtures = file_fixtures(args.images) if args.images else synthetic_fixtures()
+
+    print(f"{'image':<28}{'numpy k-means ms':>18}{'ColorThief ms':>16}{'speedup':>10}")
+    for name, image_bytes in fixtures:
+        ours = time_call(lambda: extract_palette(image_bytes, color_count=args.colors), args.repeat)
+        if ColorThief is None:
+            print(f"{name:<28}{ours:>18.1f}{'-':>16}{'-':>10}")
+            continue
+        theirs = time_call(
+            lambda: ColorThief(BytesIO(image_bytes)).get_palette(color_count=args.colors, quality=10),
+            args.repeat,
+        )
+        print(f"{name:<28}{ours:>18.1f}{theirs:>16.1f}{theirs / ours:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Concurrent insert throughput for the SQLite profiles in db_setup.py.
+
+    python benchmarks/bench_sqlite_writes.py --threads 16 --inserts 200
+
+Each thread plays a request handler inserting small rows (like POST
+/api/contact). Three setups are compared on a fresh temporary database:
+
+  default      rollback journal, one commit per insert (the old setup)
+  wal          db_setup pragmas + pool options, one commit per insert
+  wal+queue    db_setup pragmas + WriteQueue group commits
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, MetaData, String, Table, Text, create_engine, func, select
+from sqlalchemy.exc import OperationalError
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db_setup import WriteQueue, install_sqlite_pragmas, sqlite_engine_options  # noqa: E402
+
+metadata = MetaData()
+contact = Table(
+    "contact", metadata,
+    Column("id", String(36), primary_key=True),
+    Column("name", String(200)),
+    Column("email", String(200)),
+    Column("message", Text),
+    Column("created_at", DateTime),
+)
+
+
+def make_row(i):
+    return {
+        "id": str(uuid.uuid4()),
+        "name": f"user {i}",
+        "email": f"user{i}@example.com",
+        "message": "Hello, I'd like a quote for my living room.",
+        "created_at": datetime.utcnow(),
+    }
+
+
+def build_engine(path, profile):
+    if profile == "default":
+        # The old setup: SQLAlchemy defaults plus the same busy timeout, so the
+        # comparison is about journaling/commits rather than immediate lock errors.
+        engine = create_engine(f"sqlite:///{path}", connect_args={"timeout": 5, "check_same_thread": False})
+    else:
+        engine = install_sqlite_pragmas(create_engine(f"sqlite:///{path}", **sqlite_engine_options()))
+    metadata.create_all(engine)
+    return engine
+
+
+def run(profile, threads, inserts):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = build_engine(os.path.join(tmp, "bench.db"), profile)
+        writer = WriteQueue(engine).start() if profile == "wal+queue" else None
+        errors = []
+        barrier = threading.Barrier(threads)
+
+        def worker(offset):
+            barrier.wait()
+            for i in range(inserts):
+                row = make_row(offset + i)
+                try:
+                    if writer is not None:
+                        writer.insert(contact, row).result()
+                    else:
+                        with engine.begin() as connection:
+                            connection.execute(contact.insert(), row)
+                except OperationalError as e:
+                    errors.append(str(e.orig))
+
+        pool = [threading.Thread(target=worker, args=(t * inserts,)) for t in range(threads)]
+        started = time.perf_counter()
+        for t in pool:
+            t.start()
+        for t in pool:
+            t.join()
+        elapsed = time.perf_counter() - started
+
+        with engine.connect() as connection:
+            saved = connection.execute(select(func.count()).select_from(contact)).scalar()
+        batches = writer.batches if writer else saved
+        if writer:
+            writer.stop()
+        engine.dispose()
+        return {
+            "profile": profile,
+            "saved": saved,
+            "errors": len(errors),
+            "commits": batches,
+            "seconds": elapsed,
+            "inserts_per_s": saved / elapsed if elapsed else 0,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--inserts", type=int, default=200, help="inserts per thread")
+    args = parser.parse_args()
+
+    print(f"{args.threads} threads x {args.inserts} inserts")
+    print(f"{'profile':<12}{'saved':>8}{'errors':>8}{'commits':>9}{'seconds':>10}{'inserts/s':>12}")
+    for profile in ("default", "wal", "wal+queue"):
+        r = run(profile, args.threads, args.inserts)
+        print(f"{r['profile']:<12}{r['saved']:>8}{r['errors']:>8}{r['commits']:>9}"
+              f"{r['seconds']:>10.2f}{r['inserts_per_s']:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Import-time budget for app.py.
+
+    python benchmarks/check_import_time.py                  # default budget
+    python benchmarks/check_import_time.py --budget-ms 500 --runs 7
+
+Each run starts a fresh interpreter in an empty directory and times
+``import app; app.create_app()``. The check fails (exit status 1) when the
+median exceeds the budget, or when any module that must stay lazy (the
+Gemini SDK, Cloudinary, Pillow, NumPy, markdown, requests) was loaded.
+--top lists the slowest imports of the last run (from ``python -X importtime``).
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+LAZY_MODULES = ("google.generativeai", "cloudinary", "PIL", "numpy", "markdown", "requests", "colorthief")
+
+CHILD = f"""
+import json, sys, time
+sys.path.insert(0, {BACKEND_DIR!r})
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+app.create_app({{"SECRET_KEY": "import-time-check"}})
+created = time.perf_counter()
+print(json.dumps({{
+    "import_ms": (imported - started) * 1000,
+    "create_app_ms": (created - imported) * 1000,
+    "loaded": [m for m in {LAZY_MODULES!r} if m in sys.modules],
+}}))
+"""
+
+
+def run_once(workdir):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD],
+        cwd=workdir, capture_output=True, text=True, check=True,
+    )
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    return report, result.stderr
+
+
+def slowest_imports(importtime_log, top):
+    """(self_us, module) pairs with the largest self time."""
+    rows = []
+    for line in importtime_log.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        rows.append((int(self_us), name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget-ms", type=float, default=float(os.getenv("IMPORT_BUDGET_MS", "1000")))
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    reports = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for _ in range(args.runs):
+            report, log = run_once(workdir)
+            reports.append(report)
+
+    total = [r["import_ms"] + r["create_app_ms"] for r in reports]
+    median = statistics.median(total)
+    loaded = sorted({m for r in reports for m in r["loaded"]})
+
+    print(f"import app + create_app(): median {median:.0f} ms over {args.runs} runs "
+          f"(import {statistics.median(r['import_ms'] for r in reports):.0f} ms, "
+          f"create_app {statistics.median(r['create_app_ms'] for r in reports):.0f} ms), "
+          f"budget {args.budget_ms:.0f} ms")
+    if args.top:
+        print("Slowest imports (self time, last run):")
+        for self_us, name in slowest_imports(log, args.top):
+            print(f"  {self_us / 1000:8.1f} ms  {name}")
+
+    failed = False
+    if median > args.budget_ms:
+        print(f"FAIL: over budget by {median - args.budget_ms:.0f} ms")
+        failed = True
+    if loaded:
+        print(f"FAIL: modules that should load lazily were imported: {', '.join(loaded)}")
+        failed = True
+    if not failed:
+        print("OK")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
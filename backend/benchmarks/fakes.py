@@ -0,0 +1,256 @@
+"""
+Local stand-ins for the services app.py talks to, for benchmarks.
+
+- FakeGeminiModel       replaces genai.GenerativeModel (blocking and stream=True)
+- FakeUpstream          a local HTTP server playing the image CDN, Hugging Face
+                        inference and the Unsplash search API
+- FakeCloudinary        replaces cloudinary.uploader.upload
+
+Each fake takes a Behaviour: a latency (with jitter) and a failure rate, drawn
+from its own seeded RNG so runs are reproducible. install() wires them into
+an already-imported app module.
+"""
+import json
+import random
+import threading
+import time
+from io import BytesIO
+
+from PIL import Image
+from werkzeug.serving import make_server
+from werkzeug.wrappers import Request, Response
+
+FAKE_SUGGESTIONS = """## Wall colours
+
+Warm whites with a sage green accent wall.
+
+## Furniture
+
+- A low walnut media console
+- Linen sofa with textured cushions
+
+## Lighting
+
+Layer a floor lamp and warm 2700K bulbs behind the sofa.
+
+## Decor
+
+Add a fiddle-leaf fig and two framed prints above the console.
+"""
+
+
+class FakeServiceError(RuntimeError):
+    pass
+
+
+class Behaviour:
+    """Latency (ms, +/- jitter fraction) and failure rate of one fake service."""
+
+    def __init__(self, latency_ms=0, jitter=0.2, failure_rate=0.0, seed=0):
+        self.latency_ms = latency_ms
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.failures = 0
+
+    def draw(self):
+        """Return (sleep_seconds, fail) for one call."""
+        with self._lock:
+            self.calls += 1
+            spread = self.latency_ms * self.jitter
+            delay = max(0.0, self.latency_ms + self._rng.uniform(-spread, spread)) / 1000
+            fail = self._rng.random() < self.failure_rate
+            if fail:
+                self.failures += 1
+        return delay, fail
+
+    def wait(self):
+        delay, fail = self.draw()
+        time.sleep(delay)
+        if fail:
+            raise FakeServiceError("injected failure")
+
+    def to_dict(self):
+        return {
+            "latency_ms": self.latency_ms,
+            "jitter": self.jitter,
+            "failure_rate": self.failure_rate,
+            "calls": self.calls,
+            "failures": self.failures,
+        }
+
+
+def room_jpeg(width=1600, height=1200, seed=1):
+    """A room-like JPEG (flat wall/floor/furniture regions plus noise)."""
+    rng = random.Random(seed)
+    image = Image.new("RGB", (width, height), (rng.randrange(180, 240),) * 3)
+    pixels = image.load()
+    floor = (rng.randrange(90, 140), rng.randrange(60, 90), 40)
+    for y in range(int(height * 0.7), height, 4):
+        for x in range(0, width, 4):
+            pixels[x, y] = floor
+    out = BytesIO()
+    image.save(out, format="JPEG", quality=90)
+    return out.getvalue()
+
+
+def png_bytes(width=512, height=512):
+    out = BytesIO()
+    Image.new("RGB", (width, height), (200, 180, 160)).save(out, format="PNG")
+    return out.getvalue()
+
+
+class _Response:
+    def __init__(self, text):
+        self.text = text
+
+
+class _Chunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeGeminiModel:
+    """
+    Drop-in for genai.GenerativeModel: generate_content(parts) sleeps for the
+    behaviour's latency; with stream=True the same latency is spread over chunks.
+    Each image after the first adds ``extra_image_cost`` of that latency, and a
+    JSON response (multi-image home analysis) gets one room per image.
+    """
+
+    def __init__(self, behaviour, text=FAKE_SUGGESTIONS, chunk_size=40, extra_image_cost=0.15):
+        self.behaviour = behaviour
+        self.text = text
+        self.chunk_size = chunk_size
+        self.extra_image_cost = extra_image_cost
+
+    def generate_content(self, parts, stream=False, generation_config=None):
+        delay, fail = self.behaviour.draw()
+        images = sum(1 for part in parts if isinstance(part, dict)) if isinstance(parts, list) else 0
+        delay *= 1 + self.extra_image_cost * max(0, images - 1)
+        if not stream:
+            time.sleep(delay)
+            if fail:
+                raise FakeServiceError("injected Gemini failure")
+            if (generation_config or {}).get("response_mime_type") == "application/json":
+                return _Response(self._home_reply(parts[0], images))
+            return _Response(self.text)
+        return self._stream(delay, fail)
+
+    def _home_reply(self, prompt, images):
+        reply = {"rooms": [{"image": n, "room_type": "Living Room", "analysis": self.text}
+                           for n in range(1, images + 1)]}
+        if '"summary"' in prompt:
+            reply["summary"] = "## Whole home\n\nCarry the sage accent through every room."
+        return json.dumps(reply)
+
+    def _stream(self, delay, fail):
+        chunks = [self.text[i:i + self.chunk_size] for i in range(0, len(self.text), self.chunk_size)]
+        for index, chunk in enumerate(chunks):
+            time.sleep(delay / len(chunks))
+            if fail and index == len(chunks) // 2:
+                raise FakeServiceError("injected Gemini failure mid-stream")
+            yield _Chunk(chunk)
+
+
+class FakeCloudinary:
+    """Drop-in for cloudinary.uploader.upload returning a URL served by FakeUpstream."""
+
+    def __init__(self, behaviour, upstream):
+        self.behaviour = behaviour
+        self.upstream = upstream
+        self._counter = 0
+        self._lock = threading.Lock()
+
+    def upload(self, file, **options):
+        data = file.read() if hasattr(file, "read") else file
+        self.behaviour.wait()
+        with self._lock:
+            self._counter += 1
+            public_id = f"fake-{self._counter}"
+        return {
+            "public_id": public_id,
+            "bytes": len(data or b""),
+            "secure_url": f"{self.upstream.url}/images/{public_id}.jpg",
+        }
+
+
+class FakeUpstream:
+    """
+    Threaded local HTTP server:
+
+        GET  /images/<name>       a room JPEG (the "CDN")
+        POST /hf                  PNG bytes after the HF behaviour's latency
+        GET  /unsplash/search     Unsplash-shaped search results
+
+    Failures are answered with 503 so the app's retry/breaker logic is exercised.
+    """
+
+    def __init__(self, hf=None, download=None, unsplash=None, image=None):
+        self.hf = hf or Behaviour()
+        self.download = download or Behaviour()
+        self.unsplash = unsplash or Behaviour()
+        self.image = image or room_jpeg()
+        self.generated = png_bytes()
+        self._server = make_server("127.0.0.1", 0, self._wsgi, threaded=True)
+        self.url = f"http://127.0.0.1:{self._server.server_port}"
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-upstream", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+
+    def _respond(self, behaviour, body, mimetype):
+        delay, fail = behaviour.draw()
+        time.sleep(delay)
+        if fail:
+            return Response("injected failure", status=503)
+        return Response(body, mimetype=mimetype)
+
+    def _wsgi(self, environ, start_response):
+        request = Request(environ)
+        if request.path.startswith("/images/"):
+            # Bytes after the JPEG end marker are ignored by decoders, so every
+            # URL gets distinct content (and its own analysis cache key)
+            body = self.image + request.path.encode()
+            response = self._respond(self.download, body, "image/jpeg")
+        elif request.path == "/hf" and request.method == "POST":
+            response = self._respond(self.hf, self.generated, "image/png")
+        elif request.path == "/unsplash/search":
+            count = int(request.args.get("per_page", 12))
+            body = json.dumps({
+                "total": 1000,
+                "results": [
+                    {
+                        "id": f"photo-{i}",
+                        "alt_description": request.args.get("query"),
+                        "urls": {"regular": f"{self.url}/images/{i}.jpg", "small": f"{self.url}/images/{i}.jpg"},
+                        "user": {"name": "Fake Photographer"},
+                    }
+                    for i in range(count)
+                ],
+            })
+            response = self._respond(self.unsplash, body, "application/json")
+        else:
+            response = Response("not found", status=404)
+        return response(environ, start_response)
+
+
+def install(app_module, gemini, cloudinary_fake, upstream):
+    """Point an imported app module (and the modules it uses) at the fakes."""
+    import cloudinary.uploader
+    import gemini_analysis
+    import http_client
+    import inspiration
+
+    gemini_analysis.get_gemini_model = lambda: FakeGeminiModel(gemini)
+    gemini_analysis.HF_API_URL = f"{upstream.url}/hf"
+    cloudinary.uploader.upload = cloudinary_fake.upload
+    inspiration.UNSPLASH_SEARCH_URL = f"{upstream.url}/unsplash/search"
+    app_module.inspiration_service.access_key = app_module.inspiration_service.access_key or "fake-key"
+    http_client.reset()
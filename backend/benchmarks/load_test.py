@@ -0,0 +1,490 @@
+"""
+Load test every route in app.py against local fakes of Gemini, Hugging Face,
+Cloudinary, the image CDN and Unsplash (see fakes.py).
+
+    python benchmarks/load_test.py --concurrency 8 --requests 200 --output results.json
+    python benchmarks/load_test.py --routes analyze,upload --gemini-ms 1500 --failure-rate 0.05
+    python benchmarks/load_test.py --output new.json --baseline results.json
+
+The app runs on a threaded local server backed by a fresh SQLite database in
+a temporary directory. Every route gets --requests requests from --concurrency
+clients and reports req/s, p50/p95/p99 latency, status counts and the peak RSS
+seen while it ran. --output writes the results as JSON, and --baseline prints
+the change against an earlier file.
+"""
+import argparse
+import contextlib
+import json
+import logging
+import os
+import platform
+import resource
+import secrets
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+import requests
+from werkzeug.serving import make_server
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fakes import Behaviour, FakeCloudinary, FakeUpstream, install, room_jpeg  # noqa: E402
+
+ROOM = {"room_type": "Living Room", "room_size": 220, "services": ["Lighting Plan", "Flooring"],
+        "material_quality": "Premium"}
+FIRST_DAY = date(2030, 1, 7)
+
+
+def slot(i, first_day=FIRST_DAY):
+    """A distinct, non-overlapping booking slot for request i (9 one-hour slots a day)."""
+    day = first_day + timedelta(days=i // 9)
+    return day.isoformat(), f"{9 + i % 9:02d}:00"
+
+
+def appointment(i, first_day=FIRST_DAY):
+    day, hour = slot(i, first_day)
+    return {"name": f"Client {i}", "email": f"client{i}@example.com", "phone": "9999999999",
+            "date": day, "time": hour, "type": "Consultation", "message": "Kitchen refresh"}
+
+
+def contact(i):
+    return {"name": f"Client {i}", "email": f"client{i}@example.com", "message": "Please call me back"}
+
+
+def repair(i):
+    return {"fullName": f"Client {i}", "contactNumber": "9999999999", "address": f"{i} Main Street",
+            "productName": "Sofa", "message": "Torn cushion"}
+
+
+class Scenario:
+    """One route under load. ``build(ctx, i)`` returns (path, requests kwargs)."""
+
+    def __init__(self, name, method, rule, build, setup=None):
+        self.name = name
+        self.method = method
+        self.rule = rule
+        self.build = build
+        self.setup = setup
+
+
+def seed(entity, make, offset=0):
+    """Setup helper: bulk-create n rows and keep their ids in ctx[entity]."""
+
+    def setup(ctx, n):
+        ids = []
+        for start in range(0, n, 500):
+            records = [make(offset + i) for i in range(start, min(n, start + 500))]
+            response = ctx["http"].post(f"{ctx['base']}/api/{entity}/bulk", json={"records": records})
+            response.raise_for_status()
+            ids.extend(r["id"] for r in response.json()["results"] if r["status"] == "created")
+        ctx[entity] = ids
+
+    return setup
+
+
+def seed_jobs(ctx, n):
+    ids = []
+    for i in range(n):
+        response = ctx["http"].post(f"{ctx['base']}/api/jobs/generate-room-image",
+                                    json={"imageUrl": ctx["image_url"](f"job-{i}"), "suggestions": "Warm"})
+        ids.append(response.json().get("job_id"))
+    ctx["jobs"] = ids
+
+
+def login_user(ctx, n):
+    response = ctx["http"].post(f"{ctx['base']}/auth/login",
+                                json={"email": "bench@example.com", "password": "bench-password"})
+    ctx["token"] = response.json().get("token")
+
+
+def seed_user_analyses(ctx, n):
+    """Setup helper: the bench user's analysis history (ids in ctx["room-analyses"])."""
+    login_user(ctx, n)
+    headers = {"Authorization": f"Bearer {ctx['token']}"}
+    ids = []
+    for i in range(n):
+        response = ctx["http"].post(f"{ctx['base']}/api/analyze", headers=headers,
+                                    json={"imageUrl": ctx["image_url"](f"history-{i}")})
+        ids.append(response.json().get("record_id"))
+    ctx["room-analyses"] = ids
+
+
+def upload_files(ctx, i):
+    return {"files": {"image": (f"room-{i}.jpg", ctx["image"] + str(i).encode(), "image/jpeg")}}
+
+
+def scenarios():
+    image_url = lambda ctx, name: ctx["image_url"](name)  # noqa: E731
+    return [
+        Scenario("home", "GET", "/", lambda ctx, i: ("/", {})),
+        Scenario("test", "GET", "/api/test", lambda ctx, i: ("/api/test", {})),
+        Scenario("ping", "GET", "/ping", lambda ctx, i: ("/ping", {})),
+        Scenario("metrics", "GET", "/metrics", lambda ctx, i: ("/metrics", {})),
+        Scenario("login_new", "POST", "/auth/login", lambda ctx, i: (
+            "/auth/login", {"json": {"email": f"user{i}@example.com", "password": "secret-password"}})),
+        Scenario("login_existing", "POST", "/auth/login", lambda ctx, i: (
+            "/auth/login", {"json": {"email": "bench@example.com", "password": "bench-password"}}),
+            setup=login_user),
+        Scenario("verify", "GET", "/auth/verify", lambda ctx, i: (
+            "/auth/verify", {"headers": {"Authorization": f"Bearer {ctx['token']}"}}), setup=login_user),
+
+        Scenario("appointments_create", "POST", "/api/appointments",
+                 lambda ctx, i: ("/api/appointments", {"json": appointment(i)})),
+        Scenario("appointments_list", "GET", "/api/appointments",
+                 lambda ctx, i: ("/api/appointments?limit=50", {})),
+        Scenario("appointments_availability", "GET", "/api/appointments/availability",
+                 lambda ctx, i: (f"/api/appointments/availability?from={FIRST_DAY}"
+                                 f"&to={FIRST_DAY + timedelta(days=13)}", {})),
+        Scenario("appointments_get", "GET", "/api/appointments/<appointment_id>",
+                 lambda ctx, i: (f"/api/appointments/{ctx['appointments'][i]}", {}),
+                 setup=seed("appointments", appointment, offset=10_000)),
+        Scenario("appointments_update", "PUT", "/api/appointments/<appointment_id>",
+                 lambda ctx, i: (f"/api/appointments/{ctx['appointments'][i]}", {"json": {"status": "confirmed"}}),
+                 setup=seed("appointments", appointment, offset=20_000)),
+        Scenario("appointments_delete", "DELETE", "/api/appointments/<appointment_id>",
+                 lambda ctx, i: (f"/api/appointments/{ctx['appointments'][i]}", {}),
+                 setup=seed("appointments", appointment, offset=30_000)),
+        Scenario("appointments_bulk_create", "POST", "/api/appointments/bulk", lambda ctx, i: (
+            "/api/appointments/bulk", {"json": {"records": [appointment(40_000 + i * 20 + j) for j in range(20)]}})),
+        Scenario("appointments_bulk_update", "PATCH", "/api/appointments/bulk", lambda ctx, i: (
+            "/api/appointments/bulk", {"json": {"ids": ctx["appointments"][:50], "changes": {"status": "confirmed"}}}),
+            setup=seed("appointments", appointment, offset=50_000)),
+        Scenario("appointments_bulk_delete", "DELETE", "/api/appointments/bulk",
+                 lambda ctx, i: ("/api/appointments/bulk", {"json": {"ids": [ctx["appointments"][i]]}}),
+                 setup=seed("appointments", appointment, offset=60_000)),
+
+        Scenario("contact_create", "POST", "/api/contact",
+                 lambda ctx, i: ("/api/contact", {"json": contact(i)})),
+        Scenario("contact_list", "GET", "/api/contact", lambda ctx, i: ("/api/contact?limit=50", {})),
+        Scenario("contact_get", "GET", "/api/contact/<contact_id>",
+                 lambda ctx, i: (f"/api/contact/{ctx['contact'][i]}", {}), setup=seed("contact", contact)),
+        Scenario("contact_update", "PUT", "/api/contact/<contact_id>",
+                 lambda ctx, i: (f"/api/contact/{ctx['contact'][i]}", {"json": {"status": "read"}}),
+                 setup=seed("contact", contact)),
+        Scenario("contact_delete", "DELETE", "/api/contact/<contact_id>",
+                 lambda ctx, i: (f"/api/contact/{ctx['contact'][i]}", {}), setup=seed("contact", contact)),
+        Scenario("contact_bulk_create", "POST", "/api/contact/bulk",
+                 lambda ctx, i: ("/api/contact/bulk", {"json": {"records": [contact(i) for _ in range(20)]}})),
+        Scenario("contact_bulk_update", "PATCH", "/api/contact/bulk", lambda ctx, i: (
+            "/api/contact/bulk", {"json": {"ids": ctx["contact"][:50], "changes": {"status": "read"}}}),
+            setup=seed("contact", contact)),
+        Scenario("contact_bulk_delete", "DELETE", "/api/contact/bulk",
+                 lambda ctx, i: ("/api/contact/bulk", {"json": {"ids": [ctx["contact"][i]]}}),
+                 setup=seed("contact", contact)),
+
+        Scenario("repairs_create", "POST", "/api/repairs", lambda ctx, i: ("/api/repairs", {"json": repair(i)})),
+        Scenario("repairs_list", "GET", "/api/repairs", lambda ctx, i: ("/api/repairs?limit=50", {})),
+        Scenario("repairs_get", "GET", "/api/repairs/<repair_id>",
+                 lambda ctx, i: (f"/api/repairs/{ctx['repairs'][i]}", {}), setup=seed("repairs", repair)),
+        Scenario("repairs_update", "PUT", "/api/repairs/<repair_id>",
+                 lambda ctx, i: (f"/api/repairs/{ctx['repairs'][i]}", {"json": {"status": "scheduled"}}),
+                 setup=seed("repairs", repair)),
+        Scenario("repairs_delete", "DELETE", "/api/repairs/<repair_id>",
+                 lambda ctx, i: (f"/api/repairs/{ctx['repairs'][i]}", {}), setup=seed("repairs", repair)),
+        Scenario("repairs_bulk_create", "POST", "/api/repairs/bulk",
+                 lambda ctx, i: ("/api/repairs/bulk", {"json": {"records": [repair(i) for _ in range(20)]}})),
+        Scenario("repairs_bulk_update", "PATCH", "/api/repairs/bulk", lambda ctx, i: (
+            "/api/repairs/bulk", {"json": {"ids": ctx["repairs"][:50], "changes": {"status": "scheduled"}}}),
+            setup=seed("repairs", repair)),
+        Scenario("repairs_bulk_delete", "DELETE", "/api/repairs/bulk",
+                 lambda ctx, i: ("/api/repairs/bulk", {"json": {"ids": [ctx["repairs"][i]]}}),
+                 setup=seed("repairs", repair)),
+
+        Scenario("upload", "POST", "/api/upload", lambda ctx, i: ("/api/upload", upload_files(ctx, i))),
+        Scenario("analyze", "POST", "/api/analyze",
+                 lambda ctx, i: ("/api/analyze", {"json": {"imageUrl": image_url(ctx, f"analyze-{i}")}})),
+        Scenario("analyze_cached", "POST", "/api/analyze",
+                 lambda ctx, i: ("/api/analyze", {"json": {"imageUrl": image_url(ctx, "same-room")}})),
+        Scenario("analyze_stream", "POST", "/api/analyze/stream",
+                 lambda ctx, i: ("/api/analyze/stream", {"json": {"imageUrl": image_url(ctx, f"stream-{i}")}})),
+        Scenario("room_analysis_upload", "POST", "/api/room-analysis/upload",
+                 lambda ctx, i: ("/api/room-analysis/upload", upload_files(ctx, i))),
+        Scenario("room_analysis_history", "GET", "/api/room-analysis/user", lambda ctx, i: (
+            "/api/room-analysis/user?limit=20", {"headers": {"Authorization": f"Bearer {ctx['token']}"}}),
+            setup=seed_user_analyses),
+        Scenario("room_analysis_get", "GET", "/api/room-analysis/<analysis_id>", lambda ctx, i: (
+            f"/api/room-analysis/{ctx['room-analyses'][i]}",
+            {"headers": {"Authorization": f"Bearer {ctx['token']}"}}), setup=seed_user_analyses),
+        Scenario("room_analysis_batch", "POST", "/api/room-analysis/batch", lambda ctx, i: (
+            "/api/room-analysis/batch", {"json": {"imageUrls": [image_url(ctx, f"home-{i}-{n}") for n in range(12)]}})),
+        Scenario("palette", "POST", "/api/palette", lambda ctx, i: ("/api/palette", upload_files(ctx, i))),
+        Scenario("analysis_cache_stats", "GET", "/api/analyze/cache-stats",
+                 lambda ctx, i: ("/api/analyze/cache-stats", {})),
+        Scenario("generate_room_image", "POST", "/api/generate-room-image", lambda ctx, i: (
+            "/api/generate-room-image", {"json": {"imageUrl": image_url(ctx, f"gen-{i}"), "suggestions": "Warm"}})),
+        Scenario("jobs_enqueue", "POST", "/api/jobs/generate-room-image", lambda ctx, i: (
+            "/api/jobs/generate-room-image",
+            {"json": {"imageUrl": image_url(ctx, f"job-{i}"), "suggestions": "Warm"}})),
+        Scenario("jobs_get", "GET", "/api/jobs/<job_id>",
+                 lambda ctx, i: (f"/api/jobs/{ctx['jobs'][i]}", {}), setup=seed_jobs),
+        Scenario("jobs_cancel", "DELETE", "/api/jobs/<job_id>",
+                 lambda ctx, i: (f"/api/jobs/{ctx['jobs'][i]}", {}), setup=seed_jobs),
+
+        Scenario("inspiration", "GET", "/api/inspiration/<room_type>/<style>",
+                 lambda ctx, i: (f"/api/inspiration/living-room/style-{i % 10}", {})),
+        Scenario("inspiration_search", "GET", "/api/inspiration/search",
+                 lambda ctx, i: (f"/api/inspiration/search?query=kitchen+{i % 10}", {})),
+        Scenario("inspiration_stats", "GET", "/api/inspiration/stats",
+                 lambda ctx, i: ("/api/inspiration/stats", {})),
+
+        Scenario("pricing_rates", "GET", "/api/pricing/rates", lambda ctx, i: ("/api/pricing/rates", {})),
+        Scenario("pricing_estimate", "POST", "/api/pricing/estimate",
+                 lambda ctx, i: ("/api/pricing/estimate", {"json": ROOM})),
+        Scenario("pricing_estimate_batch", "POST", "/api/pricing/estimate/batch",
+                 lambda ctx, i: ("/api/pricing/estimate/batch", {"json": {"rooms": [ROOM] * 10}})),
+
+        Scenario("export_repairs", "GET", "/api/export/<entity>",
+                 lambda ctx, i: ("/api/export/repairs", {})),
+        Scenario("export_appointments_csv", "GET", "/api/export/<entity>",
+                 lambda ctx, i: ("/api/export/appointments?format=csv", {})),
+
+        Scenario("search", "GET", "/api/search", lambda ctx, i: ("/api/search?q=sofa&limit=20", {})),
+    ]
+
+
+class RssSampler:
+    """Peak resident set size of this process while a route runs (Linux /proc, else ru_maxrss)."""
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.peak_kb = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+
+    @staticmethod
+    def current_kb():
+        try:
+            with open("/proc/self/status") as status:
+                for line in status:
+                    if line.startswith("VmRSS:"):
+                        return int(line.split()[1])
+        except OSError:
+            pass
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self.peak_kb = max(self.peak_kb, self.current_kb())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.peak_kb = self.current_kb()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak_kb = max(self.peak_kb, self.current_kb())
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def run_scenario(scenario, ctx, requests_per_route, concurrency):
+    if scenario.setup:
+        scenario.setup(ctx, requests_per_route)
+
+    local = threading.local()
+    latencies = []
+    statuses = {}
+    lock = threading.Lock()
+
+    def one(i):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        path, kwargs = scenario.build(ctx, i)
+        started = time.perf_counter()
+        try:
+            response = session.request(scenario.method, ctx["base"] + path, timeout=300, **kwargs)
+            response.content  # read streamed bodies to the end
+            status = str(response.status_code)
+        except requests.RequestException as e:
+            status = type(e).__name__
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    with RssSampler() as rss:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(one, range(requests_per_route)))
+        wall = time.perf_counter() - started
+
+    latencies.sort()
+    ok = sum(count for status, count in statuses.items() if status.startswith(("2", "3")))
+    return {
+        "method": scenario.method,
+        "rule": scenario.rule,
+        "requests": len(latencies),
+        "ok": ok,
+        "statuses": statuses,
+        "seconds": round(wall, 4),
+        "req_per_s": round(len(latencies) / wall, 2) if wall else 0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "max_ms": round(latencies[-1] * 1000, 2) if latencies else 0,
+        "peak_rss_mb": round(rss.peak_kb / 1024, 1),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def uncovered_routes(flask_app, chosen):
+    covered = {(s.method, s.rule) for s in chosen}
+    missing = []
+    for rule in flask_app.url_map.iter_rules():
+        if rule.endpoint == "static":
+            continue
+        for method in sorted(rule.methods - {"HEAD", "OPTIONS"}):
+            if (method, rule.rule) not in covered:
+                missing.append(f"{method} {rule.rule}")
+    return missing
+
+
+def print_table(results, baseline=None):
+    header = f"{'route':<28}{'req':>6}{'ok':>6}{'req/s':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'rss MB':>8}"
+    if baseline:
+        header += f"{'Δreq/s':>9}{'Δp95':>9}"
+    print(header)
+    for name, r in results.items():
+        line = (f"{name:<28}{r['requests']:>6}{r['ok']:>6}{r['req_per_s']:>9.1f}"
+                f"{r['p50_ms']:>9.1f}{r['p95_ms']:>9.1f}{r['p99_ms']:>9.1f}{r['peak_rss_mb']:>8.0f}")
+        old = (baseline or {}).get(name)
+        if old:
+            change = lambda new, prev: f"{(new - prev) / prev * 100:+.0f}%" if prev else "n/a"  # noqa: E731
+            line += f"{change(r['req_per_s'], old['req_per_s']):>9}{change(r['p95_ms'], old['p95_ms']):>9}"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=100, help="requests per route")
+    parser.add_argument("--routes", help="comma-separated scenario names (default: all)")
+    parser.add_argument("--gemini-ms", type=float, default=800, help="fake Gemini latency")
+    parser.add_argument("--hf-ms", type=float, default=2000, help="fake Hugging Face latency")
+    parser.add_argument("--cloudinary-ms", type=float, default=300, help="fake Cloudinary upload latency")
+    parser.add_argument("--download-ms", type=float, default=50, help="fake image CDN latency")
+    parser.add_argument("--unsplash-ms", type=float, default=150, help="fake Unsplash latency")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="failure rate of every fake")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--baseline", help="earlier --output file to compare against")
+    parser.add_argument("--verbose", action="store_true", help="keep the app's prints and access logs")
+    args = parser.parse_args()
+    quiet = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(open(os.devnull, "w"))
+    if not args.verbose:
+        logging.getLogger("werkzeug").setLevel(logging.ERROR)
+
+    def behaviour(latency_ms, offset):
+        return Behaviour(latency_ms, failure_rate=args.failure_rate, seed=args.seed + offset)
+
+    gemini = behaviour(args.gemini_ms, 1)
+    upstream = FakeUpstream(
+        hf=behaviour(args.hf_ms, 2), download=behaviour(args.download_ms, 3), unsplash=behaviour(args.unsplash_ms, 4)
+    ).start()
+    cloudinary_fake = FakeCloudinary(behaviour(args.cloudinary_ms, 5), upstream)
+
+    output = os.path.abspath(args.output) if args.output else None
+    baseline_path = os.path.abspath(args.baseline) if args.baseline else None
+    # The app keeps its database in the working directory
+    workdir = tempfile.mkdtemp(prefix="interior-bench-")
+    os.chdir(workdir)
+    os.environ.setdefault("JOB_MAX_PENDING", str(args.requests * 4))
+    os.environ.setdefault("SECRET_KEY", secrets.token_hex(32))
+    with quiet:
+        started = time.perf_counter()
+        import app as app_module
+        flask_app = app_module.create_app()
+        import_seconds = time.perf_counter() - started
+        with flask_app.app_context():
+            app_module.init_db()
+    install(app_module, gemini, cloudinary_fake, upstream)
+
+    server = make_server("127.0.0.1", 0, flask_app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    ctx = {
+        "base": f"http://127.0.0.1:{server.server_port}",
+        "http": requests.Session(),
+        "image": room_jpeg(),
+        "image_url": lambda name: f"{upstream.url}/images/{name}.jpg",
+    }
+
+    chosen = scenarios()
+    if args.routes:
+        wanted = set(args.routes.split(","))
+        unknown = wanted - {s.name for s in chosen}
+        if unknown:
+            parser.error(f"unknown routes: {', '.join(sorted(unknown))}")
+        chosen = [s for s in chosen if s.name in wanted]
+
+    results = {}
+    for scenario in chosen:
+        with quiet:
+            results[scenario.name] = run_scenario(scenario, ctx, args.requests, args.concurrency)
+        print(f"  {scenario.name}: {results[scenario.name]['req_per_s']} req/s", file=sys.stderr)
+
+    baseline = None
+    if baseline_path:
+        with open(baseline_path) as f:
+            baseline = json.load(f)["routes"]
+    print_table(results, baseline)
+
+    missing = uncovered_routes(flask_app, scenarios())
+    if missing:
+        print("Routes without a scenario:", ", ".join(missing))
+
+    if output:
+        report = {
+            "meta": {
+                "commit": git_commit(),
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpus": os.cpu_count(),
+                "concurrency": args.concurrency,
+                "requests_per_route": args.requests,
+                "app_import_seconds": round(import_seconds, 3),
+                "fakes": {
+                    "gemini": gemini.to_dict(),
+                    "hf": upstream.hf.to_dict(),
+                    "download": upstream.download.to_dict(),
+                    "unsplash": upstream.unsplash.to_dict(),
+                    "cloudinary": cloudinary_fake.behaviour.to_dict(),
+                },
+                "uncovered_routes": missing,
+            },
+            "routes": results,
+        }
+        with open(output, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        print(f"Wrote {output}")
+
+    server.shutdown()
+    upstream.stop()
+    app_module.job_queue.shutdown()
+
+
+if __name__ == "__main__":
+    main()
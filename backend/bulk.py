@@ -0,0 +1,172 @@
+from datetime import datetime
+
+from sqlalchemy import delete, insert, select, update
+
+from db_setup import fill_defaults
+
+MAX_BULK_ITEMS = 1000
+
+
+class BulkRequestError(ValueError):
+    """The bulk request body itself is malformed (answered with 400)."""
+
+
+def _check_size(items, name):
+    if not isinstance(items, list) or not items:
+        raise BulkRequestError(f"{name} must be a non-empty list")
+    if len(items) > MAX_BULK_ITEMS:
+        raise BulkRequestError(f"At most {MAX_BULK_ITEMS} {name} per request")
+
+
+def _check_ids(ids, name="ids"):
+    _check_size(ids, name)
+    if not all(isinstance(i, str) and i for i in ids):
+        raise BulkRequestError("Every id must be a non-empty string")
+
+
+def string_field(max_length=None, required=True):
+    """Validator for a text column: a string, non-blank when ``required``, at most ``max_length`` chars."""
+    def validate(name, value):
+        if not isinstance(value, str) or (required and not value.strip()):
+            raise ValueError(f"{name} must be a non-empty string" if required else f"{name} must be a string")
+        if max_length is not None and len(value) > max_length:
+            raise ValueError(f"{name} must be at most {max_length} characters")
+        return value
+    return validate
+
+
+def boolean_field(name, value):
+    if not isinstance(value, bool):
+        raise ValueError(f"{name} must be true or false")
+    return value
+
+
+def validate_fields(changes, validators):
+    """
+    Check each field of ``changes`` with its validator from ``validators``
+    (field -> validator(name, value)). Returns the validated changes; raises
+    ValueError with the first problem. Used by the single-record PUTs too.
+    """
+    return {name: validators[name](name, value) for name, value in changes.items()}
+
+
+def _existing_ids(session, model, ids):
+    return set(session.execute(select(model.id).where(model.id.in_(ids))).scalars())
+
+
+def bulk_create(session, model, records, build):
+    """
+    Validate every record with ``build(data)`` (raises ValueError) and insert
+    the valid ones with one multi-row INSERT. Invalid records are reported,
+    not inserted. Returns (results, created_instances); the caller commits.
+    """
+    _check_size(records, "records")
+    results, created, rows = [], [], []
+    for index, data in enumerate(records):
+        try:
+            instance = build(data or {})
+        except ValueError as e:
+            results.append({"index": index, "status": "invalid", "error": str(e)})
+            continue
+        rows.append(fill_defaults(instance))
+        created.append(instance)
+        results.append({"index": index, "status": "created", "id": instance.id})
+
+    if rows:
+        session.execute(insert(model), rows)
+    return results, created
+
+
+def bulk_update(session, model, data, validators, check=None):
+    """
+    Apply field changes to many rows in one transaction. Accepts either
+
+        {"ids": [...], "changes": {"status": "done"}}       one UPDATE ... WHERE id IN (...)
+        {"updates": [{"id": ..., "status": ...}, ...]}       executemany UPDATE by primary key
+
+    Only fields in ``validators`` (field -> validator) may change, and every
+    value is validated: bad shared ``changes`` reject the request, a bad
+    per-row update is reported as invalid. ``check(session, [(id, changes)])``
+    may veto rows (returns {id: error}), e.g. for booking conflicts. Unknown
+    ids are reported as not_found. Returns per-item results; the caller commits.
+    """
+    now = datetime.utcnow()
+
+    if "ids" in data:
+        ids = data.get("ids")
+        _check_ids(ids)
+        changes = data.get("changes") or {}
+        _check_fields(changes, validators)
+        try:
+            changes = validate_fields(changes, validators)
+        except ValueError as e:
+            raise BulkRequestError(str(e))
+        found = _existing_ids(session, model, ids)
+        errors = check(session, [(i, changes) for i in found]) if check and found else {}
+        accepted = found - set(errors)
+        if accepted:
+            session.execute(
+                update(model)
+                .where(model.id.in_(accepted))
+                .values(**changes, updated_at=now)
+                .execution_options(synchronize_session=False)
+            )
+        return [_update_result(i, found, errors) for i in ids]
+
+    updates = data.get("updates")
+    _check_size(updates, "updates")
+    for item in updates:
+        if not isinstance(item, dict) or not item.get("id"):
+            raise BulkRequestError("Every update needs an id")
+        _check_ids([item["id"]])
+        _check_fields({k: v for k, v in item.items() if k != "id"}, validators)
+
+    found = _existing_ids(session, model, [item["id"] for item in updates])
+    errors, valid = {}, []
+    for item in updates:
+        if item["id"] not in found:
+            continue
+        try:
+            valid.append((item["id"], validate_fields({k: v for k, v in item.items() if k != "id"}, validators)))
+        except ValueError as e:
+            errors[item["id"]] = str(e)
+    if check and valid:
+        errors.update(check(session, valid))
+    rows = [{**changes, "id": i, "updated_at": now} for i, changes in valid if i not in errors]
+    if rows:
+        session.execute(update(model), rows)
+    return [_update_result(item["id"], found, errors) for item in updates]
+
+
+def _update_result(row_id, found, errors):
+    if row_id not in found:
+        return {"id": row_id, "status": "not_found"}
+    if row_id in errors:
+        return {"id": row_id, "status": "invalid", "error": errors[row_id]}
+    return {"id": row_id, "status": "updated"}
+
+
+def bulk_delete(session, model, ids):
+    """Delete many rows with one DELETE ... WHERE id IN (...). The caller commits."""
+    _check_ids(ids)
+    found = _existing_ids(session, model, ids)
+    if found:
+        session.execute(
+            delete(model).where(model.id.in_(found)).execution_options(synchronize_session=False)
+        )
+    return [{"id": i, "status": "deleted" if i in found else "not_found"} for i in ids]
+
+
+def _check_fields(changes, allowed_fields):
+    if not changes:
+        raise BulkRequestError("No changes given")
+    unknown = set(changes) - set(allowed_fields)
+    if unknown:
+        raise BulkRequestError(f"Fields cannot be bulk-updated: {', '.join(sorted(unknown))}")
+
+
+def summarize(results):
+    counts = {}
+    for result in results:
+        counts[result["status"]] = counts.get(result["status"], 0) + 1
+    return counts
@@ -0,0 +1,87 @@
+"""
+Cloudinary uploads, imported and configured on first use.
+
+The SDK is only loaded by processes that actually upload, so CRUD-only
+workers never pay for it. Uploads go through the "cloudinary" circuit
+breaker with a per-request timeout. Only transport errors and server-side
+failures count against the breaker; a rejected upload (e.g. BadRequest for a
+file that isn't an image) means Cloudinary is healthy. An upload is a POST,
+so it is only retried when Cloudinary rate-limited it (nothing was stored).
+"""
+import os
+import threading
+import time
+
+import http_client
+from metrics import timed
+
+_lock = threading.Lock()
+_configured = False
+
+UPLOAD_TIMEOUT = float(os.getenv("CLOUDINARY_UPLOAD_TIMEOUT", "60"))
+
+THUMBNAIL_TRANSFORMATION = os.getenv("CLOUDINARY_THUMBNAIL_TRANSFORMATION", "c_fill,w_320,h_240,q_auto,f_auto")
+
+
+def uploader():
+    """Return ``cloudinary.uploader``, configuring the SDK from the environment once."""
+    global _configured
+    import cloudinary
+    import cloudinary.uploader
+
+    with _lock:
+        if not _configured:
+            cloudinary.config(
+                cloud_name=os.getenv("CLOUDINARY_CLOUD_NAME"),
+                api_key=os.getenv("CLOUDINARY_API_KEY"),
+                api_secret=os.getenv("CLOUDINARY_API_SECRET")
+            )
+            _configured = True
+    return cloudinary.uploader
+
+
+def _client_error(error):
+    """Whether Cloudinary rejected the request itself (4xx other than rate limiting)."""
+    from cloudinary import exceptions
+
+    return isinstance(error, (exceptions.BadRequest, exceptions.AuthorizationRequired,
+                              exceptions.NotAllowed, exceptions.NotFound, exceptions.AlreadyExists))
+
+
+def upload(file, retries=http_client.MAX_RETRIES, **options):
+    """Upload through the Cloudinary circuit breaker, timed as cloudinary_upload."""
+    from cloudinary.exceptions import RateLimited
+
+    upload_fn = uploader().upload
+    options.setdefault("timeout", UPLOAD_TIMEOUT)
+    breaker = http_client.breaker_for("cloudinary")
+    if not breaker.allow():
+        raise http_client.CircuitOpenError(f"Circuit open for {breaker.name}")
+
+    with timed("cloudinary_upload"):
+        for attempt in range(retries + 1):
+            try:
+                result = upload_fn(file, **options)
+            except Exception as e:
+                if _client_error(e):
+                    breaker.record_success()
+                    raise
+                if isinstance(e, RateLimited) and attempt < retries:
+                    if hasattr(file, "seek"):
+                        file.seek(0)
+                    time.sleep(http_client.backoff_delay(attempt))
+                    continue
+                breaker.record_failure()
+                raise
+            breaker.record_success()
+            return result
+
+
+def thumbnail_url(url, transformation=None):
+    """
+    Delivery URL of a resized copy of a Cloudinary image (Cloudinary renders
+    and caches it on first request). URLs from anywhere else come back unchanged.
+    """
+    if not url or "res.cloudinary.com" not in url or "/upload/" not in url:
+        return url
+    return url.replace("/upload/", f"/upload/{transformation or THUMBNAIL_TRANSFORMATION}/", 1)
@@ -0,0 +1,69 @@
+import csv
+import io
+import json
+from datetime import date, datetime
+
+from sqlalchemy import select
+
+EXPORT_BATCH_SIZE = 1000
+
+
+def _plain(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _csv_cell(value):
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return _plain(value)
+
+
+def export_statement(model, filter_query=None):
+    """
+    Core SELECT over the model's table in (created_at, id) order.
+
+    Rows come back as plain tuples rather than ORM objects, so nothing is
+    kept in the session identity map while streaming.
+    """
+    table = model.__table__
+    statement = select(table).order_by(table.c.created_at.asc(), table.c.id.asc())
+    if filter_query is not None:
+        statement = filter_query(statement)
+    return statement
+
+
+def iter_batches(session, statement, batch_size=EXPORT_BATCH_SIZE):
+    result = session.execute(
+        statement,
+        execution_options={"stream_results": True, "yield_per": batch_size},
+    )
+    try:
+        for partition in result.partitions():
+            yield partition
+    finally:
+        result.close()
+
+
+def stream_ndjson(batches, columns):
+    """Yield one newline-delimited JSON chunk per batch."""
+    for rows in batches:
+        yield "".join(
+            json.dumps({name: _plain(value) for name, value in zip(columns, row)}, ensure_ascii=False) + "\n"
+            for row in rows
+        )
+
+
+def stream_csv(batches, columns):
+    """Yield the CSV header, then one CSV chunk per batch."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    yield buffer.getvalue()
+
+    for rows in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([_csv_cell(value) for value in row] for row in rows)
+        yield buffer.getvalue()
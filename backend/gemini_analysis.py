@@ -1,25 +1,50 @@
-import requests
-from PIL import Image
-import base64
+import cloudinary_client
+import http_client
+from metrics import timed
+import threading
+import time
 from io import BytesIO
-import google.generativeai as genai
 import os
-import cloudinary.uploader
 from dotenv import load_dotenv
 
+# google.generativeai and Pillow are imported on first use: the Gemini SDK alone
+# takes about a second to import, and most requests never need it.
 load_dotenv()
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+_genai_lock = threading.Lock()
+_genai_configured = False
 
+# Bump whenever ROOM_ANALYSIS_PROMPT or the model changes so cached analyses
+# produced by the old prompt are no longer served.
+PROMPT_VERSION = "v1"
 
-def analyze_room_with_gemini(image_url):
-    try:
-        print("📸 Downloading image from Cloudinary...")
-        response = requests.get(image_url)
-        response.raise_for_status()
-        image = Image.open(BytesIO(response.content))
+GEMINI_MODEL_NAME = "models/gemini-2.5-flash"
+
+HF_API_URL = os.getenv(
+    "HF_API_URL",
+    "https://router.huggingface.co/hf-inference/models/stabilityai/stable-diffusion-xl-base-1.0",
+)
+# SDXL inference regularly takes tens of seconds
+HF_TIMEOUT = (http_client.CONNECT_TIMEOUT, float(os.getenv("HF_READ_TIMEOUT", "120")))
+
+# Preprocessing applied before images are sent to Gemini
+PREPROCESS_MAX_EDGE = int(os.getenv("PREPROCESS_MAX_EDGE", "1536"))
+PREPROCESS_FORMAT = os.getenv("PREPROCESS_FORMAT", "JPEG").upper()  # JPEG or WEBP
+PREPROCESS_QUALITY = int(os.getenv("PREPROCESS_QUALITY", "85"))
+# Refuse to decode anything larger than this (checked from the header, before decoding)
+PREPROCESS_MAX_PIXELS = int(os.getenv("PREPROCESS_MAX_PIXELS", "60000000"))
+
+# Bump whenever ROOM_INSPIRATION_PROMPT or the SDXL model changes so cached
+# generated images are no longer served.
+INSPIRATION_PROMPT_VERSION = "v1"
+
+ROOM_INSPIRATION_PROMPT = """
+        Redesign this room based on these interior design suggestions:
+        {suggestions}
+
+        Make it elegant, cozy, and realistic with good lighting and decor.
+        """
 
-        model = genai.GenerativeModel("models/gemini-2.5-flash")
-        prompt = """
+ROOM_ANALYSIS_PROMPT = """
         Analyze this room image and suggest:
         1. Ideal color palette for walls
         2. Furniture style recommendations
@@ -28,13 +53,209 @@ def analyze_room_with_gemini(image_url):
         Give a short AI interior design summary.
         """
 
-        result = model.generate_content([prompt, image])
-        print("✅ Gemini response:", result.text)
-        return {"suggestions": result.text}
+# One request analyses several photos of the same home. The per-room part asks
+# for the same four points as ROOM_ANALYSIS_PROMPT, but the prompt and the
+# smaller images differ, so these analyses are cached under their own version.
+# Bump with HOME_ANALYSIS_PROMPT (or PROMPT_VERSION).
+HOME_PROMPT_VERSION = f"{PROMPT_VERSION}-home"
 
-    except Exception as e:
-        print("❌ Gemini analysis error:", e)
-        return {"error": str(e)}
+# Streamed analyses use ROOM_ANALYSIS_PROMPT but keep only the text (no local
+# analyzers), so they are cached apart from the pipeline's full documents.
+STREAM_PROMPT_VERSION = f"{PROMPT_VERSION}-stream"
+
+HOME_ANALYSIS_PROMPT = """
+        These {count} photos show rooms of the same home, numbered 1 to {count} in the order given.
+        For each photo, identify the room type and suggest:
+        1. Ideal color palette for walls
+        2. Furniture style recommendations
+        3. Lighting setup improvements
+        4. Additional decor suggestions (plants, art, etc.)
+        Give a short AI interior design summary for each room, in markdown.
+        {summary_instruction}
+        Reply with JSON only: {{"rooms": [{{"image": <photo number>, "room_type": "<room type>",
+        "analysis": "<markdown>"}}, ...]{summary_field}}}
+        """
+
+HOME_SUMMARY_INSTRUCTION = (
+    "Then write a house-level summary in markdown: a cohesive palette and style "
+    "across rooms, and the most valuable improvements to prioritise."
+)
+
+HOME_SUMMARY_PROMPT = """
+        These are interior design analyses of the rooms of one home:
+
+        {rooms}
+
+        Write a house-level summary in markdown: a cohesive palette and style
+        across rooms, and the most valuable improvements to prioritise.
+        """
+
+
+def download_image(image_url):
+    """Download the raw image bytes (e.g. from Cloudinary)."""
+    with timed("image_download"):
+        response = http_client.get(image_url)
+    return response.content
+
+
+def decode_image(image_bytes, max_edge=None):
+    """
+    Decode an uploaded photo at the size the model actually needs.
+
+    JPEGs are decoded in draft mode (libjpeg DCT scaling), so a 12 MP photo is
+    never fully decoded when a 1536px edge is wanted. The image is downscaled to
+    ``max_edge``, EXIF orientation is applied and it is converted to RGB (or L).
+    Returns (image, info) with the source format, original size and timings.
+    """
+    from PIL import Image, ImageOps
+
+    max_edge = max_edge or PREPROCESS_MAX_EDGE
+    timings = {}
+
+    started = time.perf_counter()
+    image = Image.open(BytesIO(image_bytes))
+    source_format = image.format
+    original_size = image.size
+    if original_size[0] * original_size[1] > PREPROCESS_MAX_PIXELS:
+        raise ValueError(f"Image too large: {original_size[0]}x{original_size[1]}")
+    if image.format == "JPEG":
+        scale = max_edge / max(original_size)
+        if scale < 1:
+            image.draft("RGB", (int(original_size[0] * scale), int(original_size[1] * scale)))
+    image.load()
+    timings["decode_ms"] = (time.perf_counter() - started) * 1000
+
+    # Resize before rotating so the transpose only touches the small image
+    started = time.perf_counter()
+    image.thumbnail((max_edge, max_edge), Image.Resampling.LANCZOS)
+    timings["resize_ms"] = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    timings["orient_ms"] = (time.perf_counter() - started) * 1000
+
+    info = {"format": source_format, "original_size": list(original_size), "timings": timings}
+    return image, info
+
+
+def encode_image(image, fmt=None, quality=None):
+    """Re-encode a decoded image as JPEG/WebP. Returns (encoded_bytes, mime_type, encode_ms)."""
+    fmt = (fmt or PREPROCESS_FORMAT).upper()
+    quality = quality or PREPROCESS_QUALITY
+
+    started = time.perf_counter()
+    out = BytesIO()
+    if fmt == "WEBP":
+        image.save(out, format="WEBP", quality=quality, method=4)
+        mime_type = "image/webp"
+    else:
+        image.save(out, format="JPEG", quality=quality, optimize=True)
+        mime_type = "image/jpeg"
+    return out.getvalue(), mime_type, (time.perf_counter() - started) * 1000
+
+
+def preprocess_stats(image, info, bytes_in, encoded, encode_ms):
+    timings = {**info["timings"], "encode_ms": encode_ms}
+    return {
+        "original_size": info["original_size"],
+        "output_size": list(image.size),
+        "bytes_in": bytes_in,
+        "bytes_out": len(encoded),
+        "bytes_saved": bytes_in - len(encoded),
+        **{name: round(ms, 2) for name, ms in timings.items()},
+    }
+
+
+def preprocess_image(image_bytes, max_edge=None, fmt=None, quality=None):
+    """
+    Shrink an uploaded photo to what the model actually needs: decode_image()
+    then encode_image(). Returns (encoded_bytes, mime_type, stats).
+    """
+    image, info = decode_image(image_bytes, max_edge)
+    encoded, mime_type, encode_ms = encode_image(image, fmt, quality)
+    return encoded, mime_type, preprocess_stats(image, info, len(image_bytes), encoded, encode_ms)
+
+
+def get_gemini_model():
+    """Model factory; swap it out (e.g. for a fake streaming model) in tests and benchmarks."""
+    global _genai_configured
+    import google.generativeai as genai
+
+    with _genai_lock:
+        if not _genai_configured:
+            genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+            _genai_configured = True
+    return genai.GenerativeModel(GEMINI_MODEL_NAME)
+
+
+def generate_room_analysis(encoded, mime_type):
+    """One Gemini call on an already preprocessed image; returns the analysis markdown. Errors are raised."""
+    model = get_gemini_model()
+    with timed("gemini"):
+        result = model.generate_content([ROOM_ANALYSIS_PROMPT, {"mime_type": mime_type, "data": encoded}])
+        text = result.text
+    print(f"✅ Gemini response: {len(text)} chars")
+    return text
+
+
+def generate_home_analysis(images, include_summary):
+    """
+    One multi-image Gemini call over preprocessed ``images`` [(encoded, mime_type), ...].
+    Returns {"rooms": {photo number: {"room_type", "analysis"}}, "summary": markdown or None}.
+    Errors (including an unparseable reply) are raised.
+    """
+    import json
+
+    prompt = HOME_ANALYSIS_PROMPT.format(
+        count=len(images),
+        summary_instruction=HOME_SUMMARY_INSTRUCTION if include_summary else "",
+        summary_field=', "summary": "<markdown>"' if include_summary else "",
+    )
+    parts = [prompt]
+    for number, (encoded, mime_type) in enumerate(images, start=1):
+        parts += [f"Photo {number}:", {"mime_type": mime_type, "data": encoded}]
+
+    model = get_gemini_model()
+    with timed("gemini_batch"):
+        result = model.generate_content(parts, generation_config={"response_mime_type": "application/json"})
+        reply = json.loads(result.text)
+    rooms = {}
+    for room in reply.get("rooms", []):
+        if isinstance(room, dict) and room.get("analysis"):
+            rooms[int(room.get("image", 0))] = {"room_type": room.get("room_type"), "analysis": room["analysis"]}
+    print(f"✅ Gemini batch response: {len(rooms)}/{len(images)} rooms")
+    return {"rooms": rooms, "summary": reply.get("summary") if include_summary else None}
+
+
+def generate_home_summary(room_analyses):
+    """Text-only Gemini call combining per-room analyses [(room_type, markdown), ...] into a house summary."""
+    rooms = "\n\n".join(f"## {room_type or 'Room'}\n{analysis}" for room_type, analysis in room_analyses)
+    model = get_gemini_model()
+    with timed("gemini"):
+        return model.generate_content(HOME_SUMMARY_PROMPT.format(rooms=rooms)).text
+
+
+def stream_room_analysis(image_bytes, model=None):
+    """
+    Streaming room analysis of already-downloaded image bytes: yields text
+    chunks as Gemini generates them. Errors are raised to the caller.
+    """
+    with timed("preprocess"):
+        encoded, mime_type, stats = preprocess_image(image_bytes)
+
+    model = model or get_gemini_model()
+    # Timed until the last chunk arrives
+    with timed("gemini_stream"):
+        response = model.generate_content(
+            [ROOM_ANALYSIS_PROMPT, {"mime_type": mime_type, "data": encoded}],
+            stream=True,
+        )
+        for chunk in response:
+            text = getattr(chunk, "text", "")
+            if text:
+                yield text
 
 
 def generate_room_inspiration(image_url, suggestions_text):
@@ -44,34 +265,21 @@ def generate_room_inspiration(image_url, suggestions_text):
     try:
         print("🎨 Generating improved room image via Hugging Face...")
 
-        prompt = f"""
-        Redesign this room based on these interior design suggestions:
-        {suggestions_text}
-
-        Make it elegant, cozy, and realistic with good lighting and decor.
-        """
-
-        # the Hugging Face API endpoint 
-        HF_API_URL = "https://router.huggingface.co/hf-inference/models/stabilityai/stable-diffusion-xl-base-1.0"
+        prompt = ROOM_INSPIRATION_PROMPT.format(suggestions=suggestions_text)
 
         # Use the same key name you have in your .env
         headers = {"Authorization": f"Bearer {os.getenv('HF_API_KEY')}"}
 
         # Send the prompt to Hugging Face Inference API
-        response = requests.post(HF_API_URL, headers=headers, json={"inputs": prompt})
-        response.raise_for_status()
-
-        # Convert raw bytes → Image
-        image_data = BytesIO(response.content)
-        image = Image.open(image_data)
-
-        # Save temporarily as PNG before uploading
-        temp_buffer = BytesIO()
-        image.save(temp_buffer, format="PNG")
-        temp_buffer.seek(0)
+        with timed("hf_inference"):
+            response = http_client.post(HF_API_URL, headers=headers, json={"inputs": prompt}, timeout=HF_TIMEOUT)
 
-        # Upload to Cloudinary
-        upload_result = cloudinary.uploader.upload(temp_buffer, resource_type="image")
+        # Upload the model's bytes as they are (already an encoded image);
+        # Cloudinary detects the format itself.
+        content_type = response.headers.get("Content-Type", "")
+        if not content_type.startswith("image/"):
+            raise ValueError(f"Expected an image from the model, got {content_type or 'no content type'}")
+        upload_result = cloudinary_client.upload(BytesIO(response.content), resource_type="image")
         inspired_image_url = upload_result["secure_url"]
 
         print("✅ Generated inspirational image:", inspired_image_url)
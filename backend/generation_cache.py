@@ -0,0 +1,118 @@
+import hashlib
+import re
+import threading
+from datetime import datetime
+
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from singleflight import SingleFlight
+
+
+def normalize_suggestions(text):
+    """Whitespace and case differences don't change the generated image, so they share a key."""
+    return re.sub(r"\s+", " ", text or "").strip().casefold()
+
+
+class GenerationCache:
+    """
+    Persistent cache of generated inspiration images.
+
+    Maps sha256(prompt version, normalized suggestions, source image URL) to
+    the Cloudinary URL of the image SDXL produced for it, so a repeat click on
+    "Generate Inspiration" is a primary-key lookup instead of a tens-of-seconds
+    inference call. Least recently used entries beyond ``max_entries`` are
+    evicted on write. Concurrent misses for the same key in this process run
+    the generator once.
+    """
+
+    def __init__(self, db, model, max_entries=500):
+        self.db = db
+        self.model = model
+        self.max_entries = max_entries
+        self._flight = SingleFlight()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "shared": 0, "evictions": 0}
+
+    @staticmethod
+    def key_for(prompt_version, suggestions, image_url):
+        digest = hashlib.sha256()
+        for part in (prompt_version, normalize_suggestions(suggestions), (image_url or "").strip()):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self.stats[name] += amount
+
+    def get(self, key):
+        """Return the cached generated-image URL or None. The caller commits the session."""
+        entry = self.db.session.get(self.model, key)
+        if entry is None:
+            return None
+        entry.hit_count = (entry.hit_count or 0) + 1
+        entry.last_used_at = datetime.utcnow()
+        return entry.generated_url
+
+    def put(self, key, prompt_version, image_url, generated_url):
+        now = datetime.utcnow()
+        # Upsert: another worker process may have generated the same key meanwhile
+        insert = sqlite_insert(self.model.__table__).values(
+            key=key,
+            prompt_version=prompt_version,
+            image_url=image_url,
+            generated_url=generated_url,
+            hit_count=0,
+            created_at=now,
+            last_used_at=now,
+        )
+        self.db.session.execute(insert.on_conflict_do_update(
+            index_elements=["key"],
+            set_={name: insert.excluded[name]
+                  for name in ("prompt_version", "image_url", "generated_url", "created_at", "last_used_at")},
+        ))
+        self.evict()
+
+    def evict(self):
+        model = self.model
+        session = self.db.session
+        total = session.query(model).count()
+        if total <= self.max_entries:
+            return 0
+        stale_keys = [
+            key for (key,) in session.query(model.key)
+            .order_by(model.last_used_at.asc())
+            .limit(total - self.max_entries)
+        ]
+        evicted = session.query(model).filter(model.key.in_(stale_keys)).delete(synchronize_session=False)
+        self._count("evictions", evicted)
+        return evicted
+
+    def get_or_generate(self, prompt_version, image_url, suggestions, generate):
+        """
+        Return (generated_url, state) where state is "hit", "miss" or "shared"
+        (waited on an identical in-flight generation). ``generate()`` returns
+        the new image URL or raises; failures are not cached.
+        """
+        key = self.key_for(prompt_version, suggestions, image_url)
+        cached = self.get(key)
+        self.db.session.commit()
+        if cached:
+            self._count("hits")
+            return cached, "hit"
+
+        def load():
+            # Another thread or process may have stored it since our lookup
+            cached = self.get(key)
+            if cached:
+                self.db.session.commit()
+                return cached, "hit"
+            generated_url = generate()
+            self.put(key, prompt_version, image_url, generated_url)
+            self.db.session.commit()
+            return generated_url, "miss"
+
+        (generated_url, state), shared = self._flight.do(key, load)
+        state = "shared" if shared else state
+        self._count({"hit": "hits", "miss": "misses", "shared": "shared"}[state])
+        return generated_url, state
@@ -0,0 +1,207 @@
+"""
+Whole-home batch analysis: many room photos, as few Gemini requests as possible.
+
+Photos are downloaded, decoded once and preprocessed with bounded concurrency
+(the local metadata/lighting/palette analyzers run on the same decoded image).
+Photos a previous home analysis already covered come from the analysis cache
+(under HOME_PROMPT_VERSION, apart from single-image results). The rest are
+packed, in order, into multi-image Gemini requests limited by image count and
+inline payload size; a single request also writes the house-level summary,
+otherwise a text-only call combines the room analyses. Progress is reported
+per photo.
+"""
+import contextvars
+from concurrent.futures import as_completed
+
+import analyzers
+import gemini_analysis
+from analysis_cache import AnalysisCache
+
+MAX_IMAGES = 20
+
+PENDING = "pending"
+PREPROCESSED = "preprocessed"
+ANALYZING = "analyzing"
+DONE = "done"
+FAILED = "failed"
+
+LOCAL_ANALYZERS = (analyzers.metadata_analyzer, analyzers.lighting_analyzer, analyzers.palette_analyzer)
+
+
+def group_images(sizes, max_images, max_bytes):
+    """
+    Pack image positions into consecutive groups of at most ``max_images``
+    images and ``max_bytes`` encoded bytes. An image larger than ``max_bytes``
+    still gets a group of its own.
+    """
+    groups = []
+    current, current_bytes = [], 0
+    for position, size in enumerate(sizes):
+        if current and (len(current) >= max_images or current_bytes + size > max_bytes):
+            groups.append(current)
+            current, current_bytes = [], 0
+        current.append(position)
+        current_bytes += size
+    if current:
+        groups.append(current)
+    return groups
+
+
+class HomeAnalysis:
+    """
+    Runs one whole-home analysis (as a background job handler).
+
+    ``analysis_cache`` is the shared AnalysisCache; ``save_home(user_id, rooms,
+    summary)`` persists [(image_url, analysis_data), ...] plus the summary and
+    returns (room record ids, summary record id). Downloads, preprocessing and
+    Gemini requests share ``executor``, whose size bounds their concurrency.
+    """
+
+    def __init__(self, analysis_cache, prompt_version, save_home, executor,
+                 max_images_per_request=20, max_request_bytes=14_000_000, max_edge=1024):
+        self.analysis_cache = analysis_cache
+        self.prompt_version = prompt_version
+        self.save_home = save_home
+        self.executor = executor
+        self.max_images_per_request = max_images_per_request
+        self.max_request_bytes = max_request_bytes
+        self.max_edge = max_edge
+
+    def _submit(self, fn, *args):
+        # A copied context keeps the job's timed() calls together
+        return self.executor.submit(contextvars.copy_context().run, fn, *args)
+
+    def _prepare(self, image_url):
+        """Download, decode once, run the local analyzers and encode for Gemini (worker thread)."""
+        image_bytes = gemini_analysis.download_image(image_url)
+        decoded = analyzers.DecodedImage(image_bytes, self.max_edge)
+        encoded, mime_type, encode_ms = gemini_analysis.encode_image(decoded.image)
+        document = {}
+        for analyzer in LOCAL_ANALYZERS:
+            document.update(analyzer(decoded))
+        document["preprocess"] = gemini_analysis.preprocess_stats(
+            decoded.image, decoded.info, len(image_bytes), encoded, encode_ms)
+        return {
+            "cache_key": AnalysisCache.key_for(image_bytes, self.prompt_version),
+            "encoded": encoded,
+            "mime_type": mime_type,
+            "document": document,
+        }
+
+    def run(self, image_urls, user_id, report):
+        rooms = [{"index": index, "image_url": url, "status": PENDING} for index, url in enumerate(image_urls)]
+
+        def publish(stage):
+            finished = [room for room in rooms if room["status"] in (DONE, FAILED)]
+            report({
+                "stage": stage,
+                "total": len(rooms),
+                "completed": len(finished),
+                "failed": sum(1 for room in finished if room["status"] == FAILED),
+                "images": [{"index": room["index"], "status": room["status"]} for room in rooms],
+            })
+
+        def fail(room, error):
+            print(f"❌ Home analysis image {room['index']} failed:", error)
+            room.update(status=FAILED, error=str(error))
+
+        # 1. Download and preprocess with bounded concurrency
+        publish("preprocessing")
+        prepared = {}
+        futures = {self._submit(self._prepare, room["image_url"]): room for room in rooms}
+        for future in as_completed(futures):
+            room = futures[future]
+            try:
+                prepared[room["index"]] = future.result()
+                room["status"] = PREPROCESSED
+            except Exception as e:
+                fail(room, e)
+            publish("preprocessing")
+
+        # 2. Photos analysed before come from the cache
+        to_analyze = []
+        for index, item in sorted(prepared.items()):
+            cached = self.analysis_cache.get(item["cache_key"])
+            if cached is not None:
+                rooms[index].update(cached=True, analysis={**cached, **item["document"]})
+            else:
+                to_analyze.append(index)
+        self.analysis_cache.db.session.commit()
+
+        # 3. As few multi-image Gemini requests as the limits allow
+        groups = [
+            [to_analyze[position] for position in group]
+            for group in group_images([len(prepared[index]["encoded"]) for index in to_analyze],
+                                      self.max_images_per_request, self.max_request_bytes)
+        ]
+        # The summary comes with the only request when that request sees every photo
+        summary_in_request = len(groups) == 1 and len(to_analyze) == len(prepared)
+        summary = None
+        for index in to_analyze:
+            rooms[index]["status"] = ANALYZING
+        publish("analyzing")
+
+        futures = {}
+        gemini_requests = len(groups)
+        for group in groups:
+            images = [(prepared[index]["encoded"], prepared[index]["mime_type"]) for index in group]
+            futures[self._submit(gemini_analysis.generate_home_analysis, images, summary_in_request)] = group
+        for future in as_completed(futures):
+            group = futures[future]
+            try:
+                reply = future.result()
+            except Exception as e:
+                for index in group:
+                    fail(rooms[index], e)
+                publish("analyzing")
+                continue
+            summary = reply["summary"] or summary
+            for number, index in enumerate(group, start=1):
+                room_reply = reply["rooms"].get(number)
+                if room_reply is None:
+                    fail(rooms[index], "No analysis returned for this photo")
+                    continue
+                analysis = {"suggestions": room_reply["analysis"], "room_type": room_reply["room_type"],
+                            **prepared[index]["document"]}
+                self.analysis_cache.put(prepared[index]["cache_key"], self.prompt_version, analysis)
+                rooms[index].update(cached=False, analysis=analysis)
+            self.analysis_cache.db.session.commit()
+            publish("analyzing")
+
+        analyzed = [room for room in rooms if "analysis" in room and room["status"] != FAILED]
+        if not analyzed:
+            raise RuntimeError("No photo could be analysed: " + "; ".join(
+                f"#{room['index']}: {room.get('error')}" for room in rooms))
+
+        summary_error = None
+        if summary is None:
+            try:
+                summary = gemini_analysis.generate_home_summary(
+                    [(room["analysis"].get("room_type"), room["analysis"]["suggestions"]) for room in analyzed])
+                gemini_requests += 1
+            except Exception as e:
+                print("❌ Home summary failed:", e)
+                summary_error = str(e)
+
+        # 4. One RoomAnalysis per room plus the house-level summary
+        record_ids, summary_record_id = self.save_home(
+            user_id, [(room["image_url"], room["analysis"]) for room in analyzed], summary)
+        for room, record_id in zip(analyzed, record_ids):
+            room.update(status=DONE, record_id=record_id)
+        publish("done")
+
+        return {
+            "rooms": [{
+                "index": room["index"],
+                "image_url": room["image_url"],
+                "status": room["status"],
+                "record_id": room.get("record_id"),
+                "room_type": room.get("analysis", {}).get("room_type"),
+                "cached": room.get("cached"),
+                "error": room.get("error"),
+            } for room in rooms],
+            "summary": summary,
+            "summary_record_id": summary_record_id,
+            "summary_error": summary_error,
+            "gemini_requests": gemini_requests,
+        }
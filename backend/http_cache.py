@@ -0,0 +1,138 @@
+"""
+Conditional GETs and response compression.
+
+Every successful, non-streamed GET response gets a strong ETag (a hash of the
+body, unless the view already set one from stored data) and is answered with
+304 Not Modified when the client's If-None-Match matches. Large text bodies
+are then gzip/deflate-compressed when the client accepts it; the encoding is
+appended to the ETag (as Apache does) so each representation keeps a distinct
+strong validator, and stripped again when comparing If-None-Match. A 304
+carries the tag the client sent, plus the Vary and Cache-Control the full
+response would have had.
+"""
+import gzip
+import hashlib
+import os
+import zlib
+
+from metrics import REGISTRY
+
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+COMPRESS_LEVEL = int(os.getenv("COMPRESS_LEVEL", "6"))
+COMPRESSIBLE_MIMETYPES = {
+    "application/json",
+    "application/x-ndjson",
+    "text/html",
+    "text/plain",
+    "text/csv",
+}
+# Preferred first when the client accepts both
+ENCODINGS = ("gzip", "deflate")
+
+NOT_MODIFIED = REGISTRY.counter(
+    "http_not_modified_total", "GET requests answered with 304 Not Modified", ("route",))
+COMPRESSED_BYTES = REGISTRY.counter(
+    "http_compression_bytes_total", "Response bytes before and after compression", ("stage",))
+
+
+def content_etag(data):
+    """Strong ETag value (unquoted) for a body or any other bytes."""
+    return hashlib.sha256(data).hexdigest()[:32]
+
+
+def _strip_encoding(tag):
+    for encoding in ENCODINGS:
+        if tag.endswith(f"-{encoding}"):
+            return tag[:-len(encoding) - 1]
+    return tag
+
+
+def matching_etag(request, etag):
+    """
+    The If-None-Match tag naming one of ``etag``'s representations (e.g.
+    ``<etag>-gzip``), ``etag`` itself for ``*``, or None when nothing matches.
+    """
+    if_none_match = request.if_none_match
+    if not if_none_match:
+        return None
+    if if_none_match.star_tag:
+        return etag
+    for tag in if_none_match.as_set():
+        if _strip_encoding(tag) == etag:
+            return tag
+    return None
+
+
+def etag_matches(request, etag):
+    """Whether the request's If-None-Match covers ``etag`` in any of our encodings."""
+    return matching_etag(request, etag) is not None
+
+
+def not_modified(etag, full_response=None):
+    """
+    A bodiless 304 carrying ``etag``, the tag of the representation the client
+    holds. Vary and Cache-Control are copied from ``full_response``, the 200
+    it stands in for; views answering before building the body pass none and
+    get the ``Vary: Accept-Encoding`` every compressible GET has.
+    """
+    from flask import Response
+
+    response = Response(status=304)
+    response.set_etag(etag)
+    if full_response is None:
+        response.vary.add("Accept-Encoding")
+    else:
+        for header in ("Vary", "Cache-Control", "Expires"):
+            if header in full_response.headers:
+                response.headers[header] = full_response.headers[header]
+    return response
+
+
+def _negotiate(request):
+    accepted = request.accept_encodings
+    for encoding in ENCODINGS:
+        if accepted[encoding]:
+            return encoding
+    return None
+
+
+def _compress(data, encoding):
+    if encoding == "gzip":
+        return gzip.compress(data, compresslevel=COMPRESS_LEVEL, mtime=0)
+    return zlib.compress(data, COMPRESS_LEVEL)
+
+
+def install_flask(app):
+    from flask import request
+
+    @app.after_request
+    def _conditional_and_compress(response):
+        if (request.method not in ("GET", "HEAD") or response.status_code != 200
+                or response.direct_passthrough or response.is_streamed):
+            return response
+
+        etag, _ = response.get_etag()
+        if etag is None:
+            etag = content_etag(response.get_data())
+            response.set_etag(etag)
+        response.vary.add("Accept-Encoding")
+        client_tag = matching_etag(request, etag)
+        if client_tag is not None:
+            route = request.url_rule.rule if request.url_rule else "unmatched"
+            NOT_MODIFIED.inc(route)
+            return not_modified(client_tag, response)
+
+        encoding = _negotiate(request)
+        if (encoding is None or response.content_encoding
+                or response.mimetype not in COMPRESSIBLE_MIMETYPES
+                or response.content_length is None or response.content_length < COMPRESS_MIN_BYTES):
+            return response
+
+        body = response.get_data()
+        compressed = _compress(body, encoding)
+        COMPRESSED_BYTES.inc("identity", amount=len(body))
+        COMPRESSED_BYTES.inc("encoded", amount=len(compressed))
+        response.set_data(compressed)
+        response.content_encoding = encoding
+        response.set_etag(f"{etag}-{encoding}")
+        return response
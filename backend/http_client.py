@@ -0,0 +1,242 @@
+"""
+Shared outbound HTTP client for the AI/image services (Cloudinary, Hugging Face, Unsplash).
+
+- one pooled keep-alive ``requests.Session`` per host
+- per-call (connect, read) timeouts so a hung upstream cannot pin a worker
+- retries with full-jitter exponential backoff on 429/5xx and connection errors;
+  a non-idempotent call (POST) is only retried when the upstream cannot have
+  started the work (connect failure, 429, 503)
+- a circuit breaker per host that fails fast while an upstream is down
+
+Everything is configured through environment variables, so the client can be
+pointed at a local stub server (e.g. ``HF_API_URL=http://127.0.0.1:8001``).
+"""
+import os
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+# requests is imported on first use, so processes that never call out don't load it
+
+CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "3.05"))
+READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "30"))
+MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "2"))
+BACKOFF_BASE = float(os.getenv("HTTP_BACKOFF_BASE", "0.5"))
+BACKOFF_MAX = float(os.getenv("HTTP_BACKOFF_MAX", "8"))
+POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "10"))
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("HTTP_BREAKER_FAILURES", "5"))
+BREAKER_RESET_TIMEOUT = float(os.getenv("HTTP_BREAKER_RESET_SECONDS", "30"))
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+# Answers that say the request was not processed, so even a POST may be resent
+UNPROCESSED_STATUSES = frozenset({429, 503})
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+
+class CircuitOpenError(Exception):
+    """Raised without touching the network while a host's breaker is open."""
+
+
+class UpstreamError(Exception):
+    """Raised when an upstream keeps answering with a retryable status."""
+
+    def __init__(self, response):
+        super().__init__(f"{response.status_code} from {response.url}")
+        self.response = response
+
+
+class CircuitBreaker:
+    """
+    Classic closed → open → half-open breaker.
+
+    After ``failure_threshold`` consecutive failed calls the breaker opens and
+    rejects calls for ``reset_timeout`` seconds; then a single trial call is let
+    through and its outcome closes or re-opens the breaker.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name, failure_threshold=BREAKER_FAILURE_THRESHOLD,
+                 reset_timeout=BREAKER_RESET_TIMEOUT, clock=time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._state == self.OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow(self):
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN:
+                if self._clock() - self._opened_at < self.reset_timeout:
+                    return False
+                self._state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = self._clock()
+
+    def call(self, fn, *args, **kwargs):
+        if not self.allow():
+            raise CircuitOpenError(f"Circuit open for {self.name}")
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            self.record_failure()
+            raise
+        self.record_success()
+        return result
+
+
+_lock = threading.Lock()
+_sessions = {}
+_breakers = {}
+
+
+def _host_of(url):
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def get_session(url):
+    """Return the pooled keep-alive session for the URL's host."""
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    host = _host_of(url)
+    with _lock:
+        session = _sessions.get(host)
+        if session is None:
+            session = requests.Session()
+            # Retries are handled in request() so they share the backoff and breaker.
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_MAXSIZE, max_retries=0)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _sessions[host] = session
+        return session
+
+
+def breaker_for(name):
+    """Return the circuit breaker for a host URL or a service name (e.g. "cloudinary")."""
+    key = _host_of(name) if "://" in name else name
+    with _lock:
+        breaker = _breakers.get(key)
+        if breaker is None:
+            breaker = _breakers[key] = CircuitBreaker(key)
+        return breaker
+
+
+def reset():
+    """Close all pooled sessions and forget breaker state (used by tests/benchmarks)."""
+    with _lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+        _breakers.clear()
+
+
+def backoff_delay(attempt, response=None):
+    retry_after = response.headers.get("Retry-After") if response is not None else None
+    if retry_after and retry_after.isdigit():
+        return min(float(retry_after), BACKOFF_MAX)
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+
+
+def _sent(error):
+    """Whether a failed request may have reached the upstream (anything but a failed connect)."""
+    import requests
+    from urllib3.exceptions import NewConnectionError
+
+    if isinstance(error, requests.ConnectTimeout):
+        return False
+    if isinstance(error, requests.ConnectionError):
+        reason = getattr(error.args[0], "reason", None) if error.args else None
+        return not isinstance(reason, NewConnectionError)
+    return True
+
+
+def request(method, url, timeout=None, retries=MAX_RETRIES, idempotent=None, **kwargs):
+    """
+    Send a request through the pooled session for ``url``'s host.
+
+    Retries connection errors, timeouts and 429/5xx answers with jittered
+    backoff, then raises (``raise_for_status`` semantics for other 4xx).
+    Unless ``idempotent`` (default: by method), a request that may already
+    have reached the upstream (read timeout, dropped response, 500/502/504)
+    is not resent. The host's circuit breaker records one success/failure
+    per call, whatever the error.
+    """
+    import requests
+
+    breaker = breaker_for(url)
+    if not breaker.allow():
+        raise CircuitOpenError(f"Circuit open for {breaker.name}")
+
+    session = get_session(url)
+    timeout = timeout or (CONNECT_TIMEOUT, READ_TIMEOUT)
+    if idempotent is None:
+        idempotent = method.upper() in IDEMPOTENT_METHODS
+    retry_statuses = RETRY_STATUSES if idempotent else UNPROCESSED_STATUSES
+
+    for attempt in range(retries + 1):
+        response = None
+        try:
+            response = session.request(method, url, timeout=timeout, **kwargs)
+        except requests.RequestException as e:
+            retryable = (isinstance(e, (requests.ConnectionError, requests.Timeout))
+                         and (idempotent or not _sent(e)))
+            if attempt == retries or not retryable:
+                # Any failure (also e.g. ChunkedEncodingError) ends a half-open trial
+                breaker.record_failure()
+                raise
+        else:
+            if response.status_code not in RETRY_STATUSES:
+                if response.status_code >= 400:
+                    # Client errors mean the upstream is healthy.
+                    breaker.record_success()
+                    response.raise_for_status()
+                breaker.record_success()
+                return response
+            if attempt == retries or response.status_code not in retry_statuses:
+                breaker.record_failure()
+                raise UpstreamError(response)
+            response.close()
+        time.sleep(backoff_delay(attempt, response))
+
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
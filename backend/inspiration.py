@@ -0,0 +1,132 @@
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import http_client
+from singleflight import SingleFlight
+
+UNSPLASH_SEARCH_URL = "https://api.unsplash.com/search/photos"
+MAX_PER_PAGE = 30  # Unsplash's own per_page limit
+
+
+def normalize_query(*parts):
+    """'Living-Room', ' MODERN ' -> 'living room modern' so equivalent searches share a cache entry."""
+    text = " ".join(str(p) for p in parts if p)
+    return re.sub(r"\s+", " ", re.sub(r"[_\-+]", " ", text)).strip().lower()
+
+
+class _Entry:
+    __slots__ = ("payload", "etag", "fetched_at")
+
+    def __init__(self, payload, etag, fetched_at):
+        self.payload = payload
+        self.etag = etag
+        self.fetched_at = fetched_at
+
+
+class InspirationService:
+    """
+    Caching proxy in front of the Unsplash search API.
+
+    - LRU of normalized (query, count) keys, bounded by ``max_entries``
+    - entries are fresh for ``ttl`` seconds; for a further ``stale_ttl`` seconds
+      they are still served while one background refresh runs
+    - concurrent misses for the same key trigger a single upstream request
+    """
+
+    def __init__(self, access_key, max_entries=256, ttl=600, stale_ttl=3600,
+                 fetch=None, clock=time.monotonic):
+        self.access_key = access_key
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._fetch = fetch or self._fetch_unsplash
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._flight = SingleFlight()
+        self._refresher = ThreadPoolExecutor(max_workers=2, thread_name_prefix="inspiration")
+        self.stats = {"hits": 0, "stale": 0, "misses": 0, "upstream_calls": 0}
+
+    def _fetch_unsplash(self, query, count):
+        if not self.access_key:
+            raise RuntimeError("UNSPLASH_ACCESS_KEY is not configured")
+        response = http_client.get(
+            UNSPLASH_SEARCH_URL,
+            params={"query": query, "per_page": count},
+            headers={"Authorization": f"Client-ID {self.access_key}", "Accept-Version": "v1"},
+        )
+        data = response.json()
+        return {
+            "query": query,
+            "total": data.get("total", 0),
+            "images": [
+                {
+                    "id": item.get("id"),
+                    "alt_description": item.get("alt_description"),
+                    "description": item.get("description"),
+                    "color": item.get("color"),
+                    "urls": {k: item.get("urls", {}).get(k) for k in ("thumb", "small", "regular")},
+                    "user": {"name": item.get("user", {}).get("name")},
+                    "links": {"html": item.get("links", {}).get("html")},
+                }
+                for item in data.get("results", [])
+            ],
+        }
+
+    def _load(self, key):
+        query, count = key
+        with self._lock:
+            self.stats["upstream_calls"] += 1
+        payload = self._fetch(query, count)
+        body = json.dumps(payload, sort_keys=True).encode("utf-8")
+        entry = _Entry(payload, hashlib.sha256(body).hexdigest()[:32], self._clock())
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def _refresh_in_background(self, key):
+        if self._flight.in_flight(key):
+            return
+
+        def refresh():
+            try:
+                self._flight.do(key, self._load, key)
+            except Exception as e:
+                print("❌ Inspiration refresh failed:", e)
+
+        self._refresher.submit(refresh)
+
+    def get_images(self, query, count):
+        """
+        Return (payload, etag, max_age, cache_state) for a normalized query.
+        cache_state is "hit", "stale" or "miss".
+        """
+        key = (query, max(1, min(int(count), MAX_PER_PAGE)))
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        age = now - entry.fetched_at if entry else None
+
+        if entry is not None and age < self.ttl:
+            state = "hit"
+        elif entry is not None and age < self.ttl + self.stale_ttl:
+            state = "stale"
+            self._refresh_in_background(key)
+        else:
+            state = "miss"
+            entry, _ = self._flight.do(key, self._load, key)
+            age = 0
+
+        with self._lock:
+            self.stats["misses" if state == "miss" else "hits" if state == "hit" else "stale"] += 1
+        return entry.payload, entry.etag, max(0, int(self.ttl - age)), state
@@ -0,0 +1,157 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+FINISHED_STATES = (SUCCEEDED, FAILED, CANCELLED)
+
+
+class JobQueueFull(Exception):
+    """Raised when the queue already holds ``max_pending`` unfinished jobs."""
+
+
+class JobCancelled(Exception):
+    """Raised from a progress report when the job was cancelled meanwhile."""
+
+
+class JobQueue:
+    """
+    Bounded in-process worker pool for slow AI calls.
+
+    Every job is persisted in the jobs table so its status and result can be
+    polled from any request. Handlers are plain functions ``handler(payload)``
+    returning a JSON-serialisable result; they run on a small thread pool so
+    they never hold a Flask request thread. Handlers registered with
+    ``reports_progress`` are called as ``handler(payload, report)``, where
+    ``report(progress)`` stores a JSON progress document on the job.
+
+    Status changes are conditional UPDATEs (``WHERE status IN (...)``), so a
+    cancel racing a worker's start or finish leaves exactly one final state.
+    """
+
+    def __init__(self, app, db, model, max_workers=2, max_pending=20):
+        self.app = app
+        self.db = db
+        self.model = model
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._handlers = {}
+        self._futures = {}
+        self._reserved = 0  # slots taken by submits still committing their job row
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """Bind the queue to the app whose context the workers run in."""
+        self.app = app
+
+    def register(self, kind, handler, reports_progress=False):
+        self._handlers[kind] = (handler, reports_progress)
+
+    def pending(self):
+        with self._lock:
+            return sum(1 for f in self._futures.values() if not f.done())
+
+    def _transition(self, job_id, from_states, **values):
+        """Set ``values`` on the job only if its status is one of ``from_states``; True if it was."""
+        session = self.db.session
+        updated = (
+            session.query(self.model)
+            .filter(self.model.id == job_id, self.model.status.in_(from_states))
+            .update(values, synchronize_session=False)
+        )
+        session.commit()
+        return bool(updated)
+
+    def _forget(self, job_id, future):
+        # Done callback: runs once the job finished, failed or was cancelled before starting
+        with self._lock:
+            if self._futures.get(job_id) is future:
+                del self._futures[job_id]
+
+    def recover_interrupted(self):
+        """Mark jobs left queued/running by a previous process as failed."""
+        with self.app.app_context():
+            stale = self.model.query.filter(self.model.status.in_([QUEUED, RUNNING])).all()
+            for job in stale:
+                job.status = FAILED
+                job.error = "Interrupted by server restart"
+                job.finished_at = datetime.utcnow()
+            self.db.session.commit()
+            return len(stale)
+
+    def submit(self, kind, payload):
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+
+        with self._lock:
+            in_flight = sum(1 for f in self._futures.values() if not f.done()) + self._reserved
+            if in_flight >= self.max_pending:
+                raise JobQueueFull(f"{in_flight} jobs already pending")
+            self._reserved += 1
+
+        # The row is committed outside the lock; the reserved slot keeps the bound
+        try:
+            job = self.model(kind=kind, status=QUEUED, payload=payload)
+            self.db.session.add(job)
+            self.db.session.commit()
+            job_id = job.id
+            with self._lock:
+                future = self._executor.submit(self._run, job_id)
+                self._futures[job_id] = future
+        finally:
+            with self._lock:
+                self._reserved -= 1
+        # Registered after the future is stored, so it also pops one that already finished
+        future.add_done_callback(lambda done: self._forget(job_id, done))
+        return job
+
+    def cancel(self, job_id):
+        """Cancel a queued or running job. Returns the job, or None if unknown."""
+        if not self._transition(job_id, (QUEUED, RUNNING), status=CANCELLED, finished_at=datetime.utcnow()):
+            # Unknown, or already finished
+            return self.db.session.get(self.model, job_id, populate_existing=True)
+
+        with self._lock:
+            future = self._futures.get(job_id)
+        if future is not None:
+            # A queued future never starts; a running one finishes but its
+            # result is discarded because the row is already cancelled.
+            future.cancel()
+        return self.db.session.get(self.model, job_id, populate_existing=True)
+
+    def _report(self, job_id, progress):
+        """Store ``progress`` on a running job; raises JobCancelled once it was cancelled."""
+        if not self._transition(job_id, (RUNNING,), progress=progress):
+            raise JobCancelled(job_id)
+
+    def _run(self, job_id):
+        with self.app.app_context():
+            session = self.db.session
+            try:
+                if not self._transition(job_id, (QUEUED,), status=RUNNING, started_at=datetime.utcnow()):
+                    return  # cancelled (or gone) before it started
+                job = session.get(self.model, job_id)
+                (handler, reports_progress), payload = self._handlers[job.kind], job.payload
+                args = (payload, lambda progress: self._report(job_id, progress)) if reports_progress else (payload,)
+
+                try:
+                    result, error = handler(*args), None
+                except JobCancelled:
+                    return
+                except Exception as e:
+                    print(f"❌ Job {job_id} ({job.kind}) failed:", e)
+                    result, error = None, str(e)
+
+                # No-op if the job was cancelled while it ran
+                self._transition(job_id, (RUNNING,), status=FAILED if error else SUCCEEDED,
+                                 result=result, error=error, finished_at=datetime.utcnow())
+            finally:
+                session.remove()
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
@@ -0,0 +1,280 @@
+"""
+In-process metrics with a Prometheus text exposition.
+
+- per-route request latency histograms and status counters (install_flask)
+- timed(call) around external calls: Cloudinary, image download, Gemini,
+  Hugging Face, markdown rendering, DB commits
+- optional one-line JSON request logs with the timed calls of that request
+
+Nothing leaves the process; /metrics is scraped or read by hand.
+"""
+import bisect
+import contextvars
+import json
+import logging
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# Seconds. The tail covers Gemini and SDXL calls that take tens of seconds.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+# Timed calls of the current request: [(call, seconds, ok)], or None outside a request
+_request_timings = contextvars.ContextVar("request_timings", default=None)
+
+request_log = logging.getLogger("interior.requests")
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values):
+        return self._values.get(label_values, 0)
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for label_values, value in items:
+            yield self.name, _labels(self.label_names, label_values), value
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (+Inf last), sum, count]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, seconds, *label_values):
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += seconds
+            series[2] += 1
+
+    def count(self, *label_values):
+        series = self._series.get(label_values)
+        return series[2] if series else 0
+
+    def samples(self):
+        with self._lock:
+            items = sorted((k, ([*v[0]], v[1], v[2])) for k, v in self._series.items())
+        for label_values, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                yield (f"{self.name}_bucket",
+                       _labels(self.label_names, label_values, [("le", _number(bound))]), cumulative)
+            yield f"{self.name}_sum", _labels(self.label_names, label_values), total
+            yield f"{self.name}_count", _labels(self.label_names, label_values), count
+
+
+class Gauge:
+    """A value read from ``fn()`` at scrape time (queue depth, breaker state...)."""
+
+    kind = "gauge"
+
+    def __init__(self, name, help_text, fn):
+        self.name = name
+        self.help = help_text
+        self.fn = fn
+
+    def samples(self):
+        try:
+            value = self.fn()
+        except Exception:
+            return
+        yield self.name, "", value
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _add(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, help_text, labels=()):
+        return self._add(Counter(name, help_text, labels))
+
+    def histogram(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._add(Histogram(name, help_text, labels, buckets))
+
+    def gauge(self, name, help_text, fn):
+        # Re-registering replaces the callback (the app may be reloaded)
+        with self._lock:
+            self._metrics[name] = Gauge(name, help_text, fn)
+            return self._metrics[name]
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+HTTP_REQUESTS = REGISTRY.counter(
+    "http_requests_total", "HTTP requests by route, method and status.", ("route", "method", "status"))
+HTTP_LATENCY = REGISTRY.histogram(
+    "http_request_duration_seconds",
+    "Time until the response is returned (headers only for streamed bodies).", ("route", "method"))
+EXTERNAL_LATENCY = REGISTRY.histogram(
+    "external_call_duration_seconds", "Duration of timed calls (upstream APIs, rendering, commits).", ("call",))
+EXTERNAL_ERRORS = REGISTRY.counter(
+    "external_call_errors_total", "Timed calls that raised.", ("call",))
+
+
+def observe_call(call, seconds, ok=True):
+    EXTERNAL_LATENCY.observe(seconds, call)
+    if not ok:
+        EXTERNAL_ERRORS.inc(call)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.append((call, seconds, ok))
+
+
+@contextmanager
+def timed(call):
+    """Time the block as ``call``; exceptions are counted and re-raised."""
+    started = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        observe_call(call, time.perf_counter() - started, ok=False)
+        raise
+    observe_call(call, time.perf_counter() - started)
+
+
+def instrument_commits(session_class, call="db_commit"):
+    """Time every commit (flush included) made through sessions of ``session_class``."""
+    from sqlalchemy import event
+
+    @event.listens_for(session_class, "before_commit")
+    def _before_commit(session):
+        session.info["commit_started"] = time.perf_counter()
+
+    @event.listens_for(session_class, "after_commit")
+    def _after_commit(session):
+        started = session.info.pop("commit_started", None)
+        if started is not None:
+            observe_call(call, time.perf_counter() - started)
+
+    @event.listens_for(session_class, "after_rollback")
+    def _after_rollback(session):
+        started = session.info.pop("commit_started", None)
+        if started is not None:
+            observe_call(call, time.perf_counter() - started, ok=False)
+
+
+def install_flask(app, log_requests=False, endpoint="/metrics"):
+    """
+    Record latency/status for every request and serve REGISTRY at ``endpoint``.
+    With ``log_requests`` each request also logs one JSON line to
+    "interior.requests" including the timed calls made while handling it.
+    """
+    from flask import Response, g, request
+
+    if log_requests and not request_log.handlers:
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        request_log.addHandler(handler)
+        request_log.setLevel(logging.INFO)
+        request_log.propagate = False
+
+    @app.before_request
+    def _start_timer():
+        g.metrics_started = time.perf_counter()
+        g.metrics_token = _request_timings.set([])
+
+    @app.after_request
+    def _record(response):
+        started = g.pop("metrics_started", None)
+        if started is None:
+            return response
+        elapsed = time.perf_counter() - started
+        # The rule, not the path, so ids don't explode the label cardinality
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        HTTP_REQUESTS.inc(route, request.method, str(response.status_code))
+        HTTP_LATENCY.observe(elapsed, route, request.method)
+
+        timings = _request_timings.get() or []
+        if log_requests:
+            request_log.info(json.dumps({
+                "method": request.method,
+                "route": route,
+                "path": request.path,
+                "status": response.status_code,
+                "duration_ms": round(elapsed * 1000, 2),
+                "calls": [
+                    {"call": call, "ms": round(seconds * 1000, 2), "ok": ok}
+                    for call, seconds, ok in timings
+                ],
+            }))
+        return response
+
+    @app.teardown_request
+    def _reset(exc):
+        token = g.pop("metrics_token", None)
+        if token is not None:
+            try:
+                _request_timings.reset(token)
+            except ValueError:
+                pass  # set in a different context (e.g. a streamed response)
+
+    @app.route(endpoint, methods=["GET"])
+    def metrics_endpoint():
+        return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
+
+    return app
@@ -0,0 +1,84 @@
+import base64
+from datetime import datetime, timedelta
+
+from sqlalchemy import tuple_
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(created_at, row_id):
+    raw = f"{created_at.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor. Raises ValueError on a malformed cursor."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        created_at, row_id = raw.split("|", 1)
+        return datetime.fromisoformat(created_at), row_id
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def parse_date(value, end_of_day=False):
+    """Accept YYYY-MM-DD or a full ISO timestamp. A bare date used as an upper bound covers that whole day."""
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Invalid date: {value}")
+    if end_of_day and len(value) == 10:
+        parsed += timedelta(days=1)
+    return parsed
+
+
+def parse_limit(args):
+    try:
+        limit = int(args.get("limit", DEFAULT_PAGE_SIZE))
+    except ValueError:
+        raise ValueError("limit must be an integer")
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def apply_filters(query, model, args, equality_filters):
+    """
+    Apply the shared list filters from the query string:
+    exact-match ``equality_filters`` (query param -> column name),
+    ``created_after``/``created_before`` date range on created_at.
+    """
+    for param, column in equality_filters.items():
+        value = args.get(param)
+        if value:
+            query = query.filter(getattr(model, column) == value)
+
+    if args.get("created_after"):
+        query = query.filter(model.created_at >= parse_date(args["created_after"]))
+    if args.get("created_before"):
+        query = query.filter(model.created_at < parse_date(args["created_before"], end_of_day=True))
+    return query
+
+
+def keyset_page(query, model, args):
+    """
+    Return (rows, next_cursor) for one page ordered by (created_at, id) descending.
+
+    Seeks past the cursor instead of using OFFSET, so with the composite
+    (…, created_at, id) indexes each page costs the same however deep it is.
+    """
+    limit = parse_limit(args)
+    cursor = args.get("cursor")
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        query = query.filter(tuple_(model.created_at, model.id) < tuple_(created_at, row_id))
+
+    rows = (
+        query.order_by(model.created_at.desc(), model.id.desc())
+        .limit(limit + 1)
+        .all()
+    )
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+    return rows, next_cursor
@@ -0,0 +1,105 @@
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
+# Pixels are sampled from a small thumbnail; colour proportions barely change
+# below ~200px and k-means cost is linear in the sample size.
+PALETTE_SAMPLE_EDGE = 200
+PALETTE_MAX_SAMPLES = 20000
+
+
+def _load_pixels(image_bytes, sample_edge, max_samples, rng):
+    image = Image.open(BytesIO(image_bytes))
+    if image.format == "JPEG":
+        image.draft("RGB", (sample_edge, sample_edge))
+    return _sample_pixels(image, sample_edge, max_samples, rng)
+
+
+def _sample_pixels(image, sample_edge, max_samples, rng):
+    image = image.convert("RGB")
+    image.thumbnail((sample_edge, sample_edge), Image.Resampling.BILINEAR)
+
+    pixels = np.asarray(image, dtype=np.float32).reshape(-1, 3)
+    if len(pixels) > max_samples:
+        pixels = pixels[rng.choice(len(pixels), max_samples, replace=False)]
+    return pixels
+
+
+def _init_centroids(pixels, k, rng):
+    """k-means++ seeding, vectorised over all pixels per step."""
+    centroids = np.empty((k, 3), dtype=np.float32)
+    centroids[0] = pixels[rng.integers(len(pixels))]
+    closest = ((pixels - centroids[0]) ** 2).sum(axis=1)
+    for i in range(1, k):
+        total = closest.sum()
+        if total == 0:
+            centroids[i:] = centroids[0]
+            break
+        centroids[i] = pixels[rng.choice(len(pixels), p=closest / total)]
+        closest = np.minimum(closest, ((pixels - centroids[i]) ** 2).sum(axis=1))
+    return centroids
+
+
+def _assign(pixels, centroids):
+    # |p - c|^2 = |p|^2 - 2 p.c + |c|^2 ; |p|^2 is constant per row so it is dropped
+    distances = (centroids ** 2).sum(axis=1) - 2.0 * pixels @ centroids.T
+    return distances.argmin(axis=1)
+
+
+def kmeans(pixels, k, iterations=12, seed=0):
+    """Vectorised Lloyd's k-means. Returns (centroids, labels)."""
+    rng = np.random.default_rng(seed)
+    k = min(k, len(pixels))
+    centroids = _init_centroids(pixels, k, rng)
+
+    for _ in range(iterations):
+        labels = _assign(pixels, centroids)
+        counts = np.bincount(labels, minlength=k).astype(np.float32)
+        sums = np.stack([np.bincount(labels, weights=pixels[:, c], minlength=k) for c in range(3)], axis=1)
+        occupied = counts > 0
+        updated = centroids.copy()
+        updated[occupied] = sums[occupied] / counts[occupied, None]
+        if np.allclose(updated, centroids, atol=0.5):
+            centroids = updated
+            break
+        centroids = updated
+
+    return centroids, _assign(pixels, centroids)
+
+
+def extract_palette(image_bytes, color_count=6, sample_edge=PALETTE_SAMPLE_EDGE,
+                    max_samples=PALETTE_MAX_SAMPLES, seed=0):
+    """
+    Return the dominant colours of an image, most common first:
+    ``[{"hex": "#aabbcc", "rgb": [r, g, b], "proportion": 0.31}, ...]``
+    """
+    rng = np.random.default_rng(seed)
+    pixels = _load_pixels(image_bytes, sample_edge, max_samples, rng)
+    return _palette(pixels, color_count, seed)
+
+
+def palette_from_image(image, color_count=6, sample_edge=PALETTE_SAMPLE_EDGE,
+                       max_samples=PALETTE_MAX_SAMPLES, seed=0):
+    """extract_palette() for an already decoded PIL image (which is not modified)."""
+    rng = np.random.default_rng(seed)
+    pixels = _sample_pixels(image, sample_edge, max_samples, rng)
+    return _palette(pixels, color_count, seed)
+
+
+def _palette(pixels, color_count, seed):
+    centroids, labels = kmeans(pixels, color_count, seed=seed)
+
+    counts = np.bincount(labels, minlength=len(centroids))
+    order = np.argsort(counts)[::-1]
+    palette = []
+    for index in order:
+        if counts[index] == 0:
+            continue
+        r, g, b = (int(round(v)) for v in np.clip(centroids[index], 0, 255))
+        palette.append({
+            "hex": f"#{r:02x}{g:02x}{b:02x}",
+            "rgb": [r, g, b],
+            "proportion": round(float(counts[index]) / len(labels), 4),
+        })
+    return palette
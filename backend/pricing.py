@@ -0,0 +1,131 @@
+import json
+import math
+import os
+from functools import lru_cache
+
+# `or`, not a getenv default: an empty PRICING_RATES_PATH= means "use the bundled table"
+PRICING_RATES_PATH = (
+    os.getenv("PRICING_RATES_PATH")
+    or os.path.join(os.path.dirname(os.path.abspath(__file__)), "pricing_rates.json")
+)
+
+
+class PricingError(ValueError):
+    """Raised for a room that cannot be quoted (unknown type/service, bad size...)."""
+
+
+@lru_cache(maxsize=None)
+def load_rate_table(path=PRICING_RATES_PATH):
+    """
+    Load the rate table once per process.
+
+    Besides the raw JSON, the service prices are kept as a NumPy vector with a
+    name -> column lookup so a batch can be priced with one matrix product.
+    """
+    import numpy as np  # deferred so importing the app doesn't load NumPy
+
+    with open(path, encoding="utf-8") as f:
+        rates = json.load(f)
+    service_names = list(rates["services"])
+    rates["_service_index"] = {name: i for i, name in enumerate(service_names)}
+    rates["_service_prices"] = np.array([rates["services"][n] for n in service_names], dtype=np.float64)
+    return rates
+
+
+def _choice(room, field, options, default=None):
+    """A field that must name one of ``options`` (a rate-table section)."""
+    value = room.get(field) or default
+    if not isinstance(value, str) or value not in options:
+        raise PricingError(f"Unknown {field}: {value}")
+    return value
+
+
+def normalize_room(room, rates):
+    """Validate one room from a request body and return it in canonical form."""
+    if not isinstance(room, dict):
+        raise PricingError("Each room must be an object")
+    room_type = _choice(room, "room_type", rates["room_types"])
+
+    try:
+        room_size = float(room.get("room_size"))
+    except (TypeError, ValueError):
+        raise PricingError("room_size must be a number")
+    if not math.isfinite(room_size) or room_size <= 0:
+        raise PricingError("room_size must be a finite number greater than 0")
+
+    size_unit = _choice(room, "size_unit", rates["size_units"], "sqft")
+
+    services = room.get("services") or []
+    if not isinstance(services, list) or not services:
+        raise PricingError("Select at least one service")
+    if not all(isinstance(s, str) for s in services):
+        raise PricingError("services must be a list of service names")
+    unknown = [s for s in services if s not in rates["services"]]
+    if unknown:
+        raise PricingError(f"Unknown services: {', '.join(map(str, unknown))}")
+
+    material_quality = _choice(room, "material_quality", rates["material_quality"], "Basic")
+
+    return {
+        "room_type": room_type,
+        "room_size": room_size,
+        "size_unit": size_unit,
+        "services": list(dict.fromkeys(services)),
+        "material_quality": material_quality,
+    }
+
+
+def quote_rooms(rooms, rates=None):
+    """
+    Price a list of normalized rooms in one vectorised pass.
+
+    (rate/sqft * area in sq ft + sum(service prices)) * quality multiplier,
+    plus GST. This is the frontend calculator's formula, except that sizes
+    given in sq m are converted to sq ft first (the calculator applies the
+    per-sq-ft rate to the number as entered). Returns one price breakdown
+    dict per room.
+    """
+    import numpy as np
+
+    rates = rates or load_rate_table()
+    if not rooms:
+        return []
+
+    service_index = rates["_service_index"]
+    selected = np.zeros((len(rooms), len(service_index)), dtype=np.float64)
+    for row, room in enumerate(rooms):
+        selected[row, [service_index[s] for s in room["services"]]] = 1.0
+
+    area_sqft = np.array([r["room_size"] * rates["size_units"][r["size_unit"]] for r in rooms])
+    rate_per_sqft = np.array([rates["room_types"][r["room_type"]] for r in rooms], dtype=np.float64)
+    multiplier = np.array([rates["material_quality"][r["material_quality"]] for r in rooms], dtype=np.float64)
+
+    base_price = rate_per_sqft * area_sqft
+    services_total = selected @ rates["_service_prices"]
+    subtotal = base_price + services_total
+    adjusted = subtotal * multiplier
+    gst = adjusted * rates["gst_rate"]
+    total = adjusted + gst
+
+    columns = {
+        "base_price": base_price,
+        "services_total": services_total,
+        "subtotal": subtotal,
+        "quality_adjustment": adjusted - subtotal,
+        "gst": gst,
+        "estimated_price": total,
+    }
+    return [
+        {name: round(float(values[i]), 2) for name, values in columns.items()}
+        for i in range(len(rooms))
+    ]
+
+
+def summarize_project(breakdowns, rates=None):
+    """Project-level totals for a batch of room breakdowns."""
+    rates = rates or load_rate_table()
+    keys = ("base_price", "services_total", "subtotal", "quality_adjustment", "gst", "estimated_price")
+    totals = {key: round(sum(b[key] for b in breakdowns), 2) for key in keys}
+    totals["rooms"] = len(breakdowns)
+    totals["currency"] = rates["currency"]
+    return totals
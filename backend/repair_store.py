@@ -0,0 +1,197 @@
+"""
+Repair requests data layer, shared by app.py and the legacy repairs.py entry point.
+
+Both write through RepairStore on one pooled SQLAlchemy engine, so a request
+borrows a warm connection instead of opening the database file, and the insert
+statement is built once (SQLAlchemy caches its compiled form and sqlite3 keeps
+it prepared per pooled connection).
+
+migrate_legacy_repairs() moves the old repairs.db ``repair_requests`` rows into
+the same table. Rows get deterministic ids (uuid5 of the legacy integer id) and
+are inserted with ON CONFLICT DO NOTHING, and the last copied legacy id is
+committed with each batch, so an interrupted run resumes where it stopped and
+re-running the migration never duplicates a row. A created_at the legacy
+app didn't write in its own format is replaced by the migration time and
+the row's legacy id is reported, so one odd row can't stall the migration.
+"""
+import sqlite3
+import time
+import uuid
+from datetime import datetime, timezone
+
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from metrics import timed
+
+LEGACY_MIGRATION_NAME = "repairs.db:repair_requests"
+# Fixed namespace: the same legacy row always maps to the same Repair id
+LEGACY_ID_NAMESPACE = uuid.UUID("0b7c7c1e-5d43-4d0e-9a7f-6f1c2f7d9a11")
+LEGACY_COLUMNS = ("id", "full_name", "contact_number", "address", "product_name", "client_id", "message", "created_at")
+
+
+class RepairStore:
+    def __init__(self, table, engine=None, write_queue=None):
+        self.table = table
+        self.engine = engine
+        self.write_queue = write_queue
+        self._insert = table.insert()
+
+    def bind(self, engine, write_queue=None):
+        """Attach the engine (and optional group-commit writer) once the app has built them."""
+        self.engine = engine
+        self.write_queue = write_queue
+
+    @staticmethod
+    def build(data):
+        """
+        Validate a new repair request (camelCase or snake_case keys) and return
+        its column values. Raises ValueError with the first problem.
+        """
+        # Extract fields - try both camelCase and snake_case
+        full_name = data.get('fullName') or data.get('full_name')
+        contact_number = data.get('contactNumber') or data.get('contact_number')
+        address = data.get('address')
+        product_name = data.get('productName') or data.get('product_name')
+        client_id = data.get('clientId') or data.get('client_id')
+        message = data.get('message', '')
+
+        # Validate required fields
+        if not full_name:
+            raise ValueError('Full name is required')
+        if not contact_number:
+            raise ValueError('Contact number is required')
+        if not address:
+            raise ValueError('Address is required')
+        if not product_name:
+            raise ValueError('Product name is required')
+
+        return {
+            "id": str(uuid.uuid4()),
+            "full_name": full_name,
+            "contact_number": contact_number,
+            "address": address,
+            "product_name": product_name,
+            "client_id": client_id,  # This is optional, can be None
+            "message": message,
+            "status": "pending",
+            "whatsapp_sent": False,
+            "created_at": datetime.utcnow(),
+            "updated_at": None,
+        }
+
+    def create(self, data):
+        """Validate and insert one repair request; returns its column values."""
+        values = self.build(data)
+        if self.write_queue is not None:
+            self.write_queue.insert(self.table, values).result(timeout=30)
+        else:
+            with timed("db_commit"), self.engine.begin() as connection:
+                connection.execute(self._insert, values)
+        return values
+
+
+def legacy_created_at(value):
+    """
+    UTC datetime for a legacy created_at. The legacy app stored
+    datetime.now() (server local time) as "%Y-%m-%d %H:%M:%S"; other ISO 8601
+    forms are accepted too. Returns None for anything else.
+    """
+    if not isinstance(value, str):
+        return None
+    try:
+        local = datetime.fromisoformat(value.strip())
+    except ValueError:
+        return None
+    return local.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def legacy_repair_values(row, migrated_at):
+    """
+    Column values for one legacy repair_requests row (a sqlite3.Row), and
+    whether its created_at was usable. Rows without one (or with an
+    unparseable one) get ``migrated_at``.
+    """
+    created_at = legacy_created_at(row["created_at"])
+    values = {
+        "id": str(uuid.uuid5(LEGACY_ID_NAMESPACE, str(row["id"]))),
+        "full_name": row["full_name"] or "",
+        "contact_number": row["contact_number"] or "",
+        "address": row["address"] or "",
+        "product_name": row["product_name"] or "",
+        "client_id": row["client_id"],
+        "message": row["message"],
+        "status": "pending",
+        "whatsapp_sent": False,
+        "created_at": created_at or migrated_at,
+        "updated_at": None,
+    }
+    return values, created_at is not None or not row["created_at"]
+
+
+def migrate_legacy_repairs(engine, repair_table, checkpoint_table, source_path,
+                           batch_size=500, restart=False, progress=None):
+    """
+    Stream repair_requests from the legacy SQLite file at ``source_path`` into
+    ``repair_table`` in batches of ``batch_size``, one transaction per batch.
+    ``progress(report)`` is called after every batch. Returns the final report;
+    its ``unparsed_dates`` lists the legacy ids whose created_at was replaced.
+    """
+    source = sqlite3.connect(f"file:{source_path}?mode=ro", uri=True)
+    source.row_factory = sqlite3.Row
+    try:
+        with engine.begin() as connection:
+            checkpoint = connection.execute(
+                select(checkpoint_table.c.last_source_id)
+                .where(checkpoint_table.c.name == LEGACY_MIGRATION_NAME)
+            ).scalar()
+        last_id = 0 if restart or checkpoint is None else checkpoint
+
+        remaining = source.execute("SELECT count(*) FROM repair_requests WHERE id > ?", (last_id,)).fetchone()[0]
+        report = {"source": source_path, "resumed_after": last_id, "total": remaining,
+                  "processed": 0, "copied": 0, "skipped": 0, "last_source_id": last_id,
+                  "unparsed_dates": []}
+        insert = sqlite_insert(repair_table).on_conflict_do_nothing(index_elements=["id"])
+        save_checkpoint = sqlite_insert(checkpoint_table)
+        save_checkpoint = save_checkpoint.on_conflict_do_update(
+            index_elements=["name"],
+            set_={"last_source_id": save_checkpoint.excluded.last_source_id,
+                  "rows_copied": checkpoint_table.c.rows_copied + save_checkpoint.excluded.rows_copied,
+                  "updated_at": save_checkpoint.excluded.updated_at},
+        )
+
+        # One cursor read in batches: the legacy table is never loaded whole
+        cursor = source.execute(
+            f"SELECT {', '.join(LEGACY_COLUMNS)} FROM repair_requests WHERE id > ? ORDER BY id", (last_id,))
+        started = time.perf_counter()
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            migrated_at = datetime.utcnow()
+            values = []
+            for row in rows:
+                row_values, date_ok = legacy_repair_values(row, migrated_at)
+                values.append(row_values)
+                if not date_ok:
+                    report["unparsed_dates"].append(row["id"])
+            # The batch and the checkpoint commit together, so a crash never skips or repeats work
+            with engine.begin() as connection:
+                copied = connection.execute(insert, values).rowcount
+                connection.execute(save_checkpoint, {
+                    "name": LEGACY_MIGRATION_NAME,
+                    "last_source_id": rows[-1]["id"],
+                    "rows_copied": copied,
+                    "updated_at": datetime.utcnow(),
+                })
+
+            report["processed"] += len(rows)
+            report["copied"] += copied
+            report["skipped"] += len(rows) - copied
+            report["last_source_id"] = rows[-1]["id"]
+            report["rows_per_second"] = round(report["processed"] / max(time.perf_counter() - started, 1e-9))
+            if progress is not None:
+                progress({**report, "unparsed_dates": list(report["unparsed_dates"])})
+        return report
+    finally:
+        source.close()
@@ -1,37 +1,28 @@
+"""
+Legacy standalone repairs endpoint.
+
+Kept for clients that still post to this app. Requests are stored through the
+shared RepairStore in the main database (interior_design.db, on a pooled
+engine), so they show up in app.py's /api/repairs like any other repair.
+Copy rows written to the old repairs.db with `flask --app app migrate-repairs`.
+"""
 from flask import Flask, request, jsonify
 from flask_cors import CORS
-import sqlite3
-from datetime import datetime
+from sqlalchemy import create_engine
+
+from app import DB_PATH, Repair
+from db_setup import install_sqlite_pragmas, sqlite_engine_options
+from repair_store import RepairStore
 
 app = Flask(__name__)
 CORS(app)
 
-DB_PATH = "repairs.db"
-
-def init_db():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS repair_requests (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            full_name TEXT,
-            contact_number TEXT,
-            address TEXT,
-            product_name TEXT,
-            client_id TEXT,
-            message TEXT,
-            created_at TEXT
-        )
-    """)
-    conn.commit()
-    conn.close()
-
-init_db()
+engine = install_sqlite_pragmas(create_engine(f"sqlite:///{DB_PATH}", **sqlite_engine_options()))
+store = RepairStore(Repair.__table__, engine)
 
 @app.route("/api/repairs", methods=["POST"])
 def repairs():
-    data = request.json
-    print("Received repair request:", data)
+    data = request.get_json() or {}
 
     required_fields = ["fullName", "contactNumber", "address", "productName", "clientId", "message"]
     for field in required_fields:
@@ -40,24 +31,10 @@ def repairs():
             return jsonify({"error": f"Missing field: {field}"}), 400
 
     try:
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-        c.execute("""
-            INSERT INTO repair_requests (full_name, contact_number, address, product_name, client_id, message, created_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        """, (
-            data["fullName"],
-            data["contactNumber"],
-            data["address"],
-            data["productName"],
-            data["clientId"],
-            data["message"],
-            datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        ))
-        conn.commit()
-        conn.close()
-        print("✅ Data inserted successfully!")
-        return jsonify({"status": "success"}), 200
+        repair = store.create(data)
+        # Logged by id only: the body holds the customer's name, phone and address
+        print(f"✅ Repair request {repair['id']} inserted")
+        return jsonify({"status": "success", "id": repair["id"]}), 200
     except Exception as e:
         import traceback
         print("❌ Error inserting data:", e)
@@ -65,4 +42,9 @@ def repairs():
         return jsonify({"status": "error", "message": str(e)}), 500
 
 if __name__ == "__main__":
+    # Same schema setup as the main app (tables, indexes, search triggers)
+    import app as main_app
+
+    with main_app.create_app().app_context():
+        main_app.init_db()
     app.run(debug=False)
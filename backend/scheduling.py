@@ -0,0 +1,163 @@
+import os
+from datetime import datetime, time, timedelta
+
+from sqlalchemy import update
+
+DEFAULT_DURATION_MINUTES = int(os.getenv("APPOINTMENT_DURATION_MINUTES", "60"))
+MAX_DURATION_MINUTES = 8 * 60
+# Free-slot search: bookable hours and days (0 = Monday)
+BUSINESS_HOURS = os.getenv("BUSINESS_HOURS", "09:00-18:00")
+BUSINESS_DAYS = {int(d) for d in os.getenv("BUSINESS_DAYS", "0,1,2,3,4,5").split(",")}
+MAX_AVAILABILITY_DAYS = 31
+
+# Statuses that no longer occupy their slot
+FREE_STATUSES = ("cancelled", "rejected")
+
+TIME_FORMATS = ("%H:%M", "%H:%M:%S", "%I:%M %p", "%I:%M%p", "%I %p")
+
+
+def parse_time(value):
+    if not isinstance(value, (str, type(None))):
+        raise ValueError(f"Invalid time: {value}")
+    value = (value or "").strip().upper()
+    for fmt in TIME_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).time()
+        except ValueError:
+            continue
+    raise ValueError(f"Invalid time: {value}")
+
+
+def parse_slot(date_value, time_value, duration_minutes=None):
+    """
+    Turn the booking form's date ("YYYY-MM-DD") and time ("HH:MM") strings
+    into a (start_at, end_at) pair. Raises ValueError if they can't be parsed
+    (also for values of the wrong JSON type).
+    """
+    try:
+        day = datetime.strptime((date_value or "").strip(), "%Y-%m-%d").date()
+    except (AttributeError, ValueError):
+        raise ValueError(f"Invalid date: {date_value}")
+    try:
+        duration = int(duration_minutes or DEFAULT_DURATION_MINUTES)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid duration: {duration_minutes}")
+    if not 0 < duration <= MAX_DURATION_MINUTES:
+        raise ValueError(f"Duration must be between 1 and {MAX_DURATION_MINUTES} minutes")
+    start_at = datetime.combine(day, parse_time(time_value))
+    return start_at, start_at + timedelta(minutes=duration)
+
+
+def begin_immediate(session):
+    """
+    Take SQLite's write lock now instead of at the first INSERT.
+
+    Check-then-insert inside such a transaction is atomic across threads and
+    processes: a second booking waits (busy_timeout) until the first commits
+    and then sees its row. Must be called before anything else in the
+    transaction writes.
+    """
+    session.connection().exec_driver_sql("BEGIN IMMEDIATE")
+
+
+def overlapping(query, model, start_at, end_at, exclude_id=None):
+    """
+    Filter ``query`` to appointments whose interval overlaps [start_at, end_at).
+
+    The lower bound on start_at (no booking is longer than MAX_DURATION_MINUTES)
+    turns the overlap test into a range scan on the start_at index.
+    """
+    query = query.filter(
+        model.start_at < end_at,
+        model.start_at > start_at - timedelta(minutes=MAX_DURATION_MINUTES),
+        model.end_at > start_at,
+        model.status.notin_(FREE_STATUSES),
+    )
+    if exclude_id is not None:
+        query = query.filter(model.id != exclude_id)
+    return query
+
+
+def find_conflict(model, start_at, end_at, exclude_id=None):
+    return overlapping(model.query, model, start_at, end_at, exclude_id).first()
+
+
+def _business_window(day):
+    opens, closes = (parse_time(part) for part in BUSINESS_HOURS.split("-"))
+    return datetime.combine(day, opens), datetime.combine(day, closes)
+
+
+def free_slots(model, range_start, range_end, slot_minutes=DEFAULT_DURATION_MINUTES):
+    """
+    Free slots of ``slot_minutes`` within business hours between two dates.
+
+    All bookings in the range are fetched with one indexed query (ordered by
+    start_at) and swept once per day. Returns [{"date", "slots": [{"start", "end"}]}].
+    """
+    window_start = datetime.combine(range_start, time.min)
+    window_end = datetime.combine(range_end, time.min) + timedelta(days=1)
+    busy = (
+        overlapping(model.query, model, window_start, window_end)
+        .with_entities(model.start_at, model.end_at)
+        .order_by(model.start_at)
+        .all()
+    )
+
+    slot = timedelta(minutes=slot_minutes)
+    days = []
+    index = 0
+    day = range_start
+    while day <= range_end:
+        if day.weekday() in BUSINESS_DAYS:
+            opens, closes = _business_window(day)
+            # busy is sorted by start_at, so each booking is visited once overall
+            taken = []
+            while index < len(busy) and busy[index].start_at < closes:
+                if busy[index].end_at > opens:
+                    taken.append((max(busy[index].start_at, opens), min(busy[index].end_at, closes)))
+                index += 1
+
+            slots = []
+            cursor = opens
+            for busy_start, busy_end in taken + [(closes, closes)]:
+                while cursor + slot <= busy_start:
+                    slots.append({"start": cursor.isoformat(), "end": (cursor + slot).isoformat()})
+                    cursor += slot
+                cursor = max(cursor, busy_end)
+            days.append({"date": day.isoformat(), "slots": slots})
+        day += timedelta(days=1)
+    return days
+
+
+def backfill_slots(session, model, batch_size=500):
+    """
+    Migration for rows created before start_at/end_at existed: parse the
+    free-form date/time strings. Rows that can't be parsed are left NULL.
+    Returns (migrated, unparseable).
+    """
+    migrated = unparseable = 0
+    last_id = ""
+    while True:
+        rows = (
+            session.query(model.id, model.date, model.time)
+            .filter(model.start_at.is_(None), model.id > last_id)
+            .order_by(model.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not rows:
+            break
+        updates = []
+        for row in rows:
+            try:
+                start_at, end_at = parse_slot(row.date, row.time)
+            except ValueError:
+                unparseable += 1
+                continue
+            updates.append({"id": row.id, "start_at": start_at, "end_at": end_at})
+        if updates:
+            session.execute(update(model), updates)
+        session.commit()
+        migrated += len(updates)
+        last_id = rows[-1].id
+    return migrated, unparseable
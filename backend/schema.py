@@ -0,0 +1,49 @@
+from sqlalchemy import inspect
+
+
+def ensure_columns(db):
+    """
+    Add nullable model columns that an existing table is missing.
+
+    db.create_all() never alters existing tables, so new columns on old
+    models would otherwise be absent from deployed databases. Only nullable
+    columns can be added this way; anything else needs a real migration.
+    Returns the "table.column" names added.
+    """
+    inspector = inspect(db.engine)
+    added = []
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            if not column.nullable:
+                raise RuntimeError(f"Cannot add NOT NULL column {table.name}.{column.name} automatically")
+            column_type = column.type.compile(dialect=db.engine.dialect)
+            with db.engine.begin() as connection:
+                connection.exec_driver_sql(
+                    f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}'
+                )
+            added.append(f"{table.name}.{column.name}")
+    return added
+
+
+def ensure_indexes(db):
+    """
+    Create any index declared on the models that the database is missing.
+
+    db.create_all() only creates indexes together with new tables, so indexes
+    added to existing models would otherwise never reach an existing database.
+    Returns the names of the indexes created.
+    """
+    inspector = inspect(db.engine)
+    created = []
+    for table in db.metadata.sorted_tables:
+        existing = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(bind=db.engine)
+                created.append(index.name)
+    return created
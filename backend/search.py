@@ -0,0 +1,173 @@
+"""
+Full-text search over contacts, repairs and room analyses (SQLite FTS5).
+
+Each entity gets an external-content FTS5 table: the index stores only the
+tokens, the text itself stays in the entity's table and is read back (through
+a view) for snippets. Triggers on the entity table keep the index in sync
+with every INSERT/UPDATE/DELETE, including bulk and Core writes.
+
+The index refers to rows by SQLite rowid. Rowids of tables without an
+INTEGER PRIMARY KEY can be renumbered by VACUUM, so run rebuild() (the
+`rebuild-search` command) after a VACUUM.
+"""
+import html
+import re
+
+from sqlalchemy import text
+
+SNIPPET_TOKENS = 12
+MAX_RESULTS = 100
+MAX_OFFSET = 1000
+
+# Private-use characters mark the highlights so the rest can be HTML-escaped
+_MARK_OPEN, _MARK_CLOSE = "\ue000", "\ue001"
+
+
+class SearchIndex:
+    """One entity's search index: which table, and which text goes into each FTS column."""
+
+    def __init__(self, entity, table, columns, summary_columns, watched_columns=None):
+        self.entity = entity
+        self.table = table
+        # FTS column name -> SQL expression over the entity row
+        self.columns = columns
+        # Entity columns the expressions read (the update trigger watches these)
+        self.watched_columns = ", ".join(watched_columns or columns)
+        # Entity columns returned with every hit
+        self.summary_columns = summary_columns
+        self.fts = f"{table}_fts"
+        self.source = f"{table}_fts_source"
+
+    def _values(self, row_alias):
+        return ", ".join(expr.format(row=row_alias) for expr in self.columns.values())
+
+    def ddl(self):
+        names = ", ".join(self.columns)
+        source_columns = ", ".join(f"{expr.format(row=self.table)} AS {name}" for name, expr in self.columns.items())
+        delete = (f"INSERT INTO {self.fts}({self.fts}, rowid, {names}) "
+                  f"VALUES ('delete', old.rowid, {self._values('old')});")
+        insert = f"INSERT INTO {self.fts}(rowid, {names}) VALUES (new.rowid, {self._values('new')});"
+        return [
+            # The view is what the FTS table reads back for snippets and rebuilds
+            f"CREATE VIEW IF NOT EXISTS {self.source} AS "
+            f"SELECT rowid AS source_rowid, {source_columns} FROM {self.table}",
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.fts} USING fts5("
+            f"{names}, content='{self.source}', content_rowid='source_rowid', "
+            f"tokenize='porter unicode61 remove_diacritics 2')",
+            f"CREATE TRIGGER IF NOT EXISTS {self.table}_fts_ai AFTER INSERT ON {self.table} BEGIN {insert} END",
+            f"CREATE TRIGGER IF NOT EXISTS {self.table}_fts_ad AFTER DELETE ON {self.table} BEGIN {delete} END",
+            # Only edits of indexed columns touch the index (not status changes)
+            f"CREATE TRIGGER IF NOT EXISTS {self.table}_fts_au AFTER UPDATE OF {self.watched_columns} "
+            f"ON {self.table} BEGIN {delete} {insert} END",
+        ]
+
+    def query(self):
+        summary = ", ".join(f"e.{column}" for column in self.summary_columns)
+        return (
+            f"SELECT '{self.entity}' AS entity, e.id AS id, e.created_at AS created_at, {summary}, "
+            f"snippet({self.fts}, -1, '{_MARK_OPEN}', '{_MARK_CLOSE}', '…', {SNIPPET_TOKENS}) AS snippet, "
+            f"{self.fts}.rank AS rank "
+            f"FROM {self.fts} JOIN {self.table} AS e ON e.rowid = {self.fts}.rowid "
+            f"WHERE {self.fts} MATCH :match ORDER BY {self.fts}.rank LIMIT :window"
+        )
+
+
+SEARCH_INDEXES = {
+    index.entity: index
+    for index in (
+        SearchIndex("contacts", "contact", {"message": "{row}.message"}, ["name", "email", "status"]),
+        SearchIndex(
+            "repairs", "repair",
+            {"product_name": "{row}.product_name", "address": "{row}.address", "message": "{row}.message"},
+            ["full_name", "product_name", "status"],
+        ),
+        SearchIndex(
+            "room_analyses", "room_analysis",
+            {"suggestions": "coalesce(json_extract({row}.analysis_data, '$.suggestions'), "
+                            "json_extract({row}.analysis_data, '$.text'))"},
+            ["user_id", "image_path"],
+            watched_columns=["analysis_data"],
+        ),
+    )
+}
+
+
+def ensure_search_schema(engine):
+    """
+    Create the FTS tables, source views and sync triggers that are missing.
+    Returns the entities whose index was just created (and needs a rebuild).
+    """
+    created = []
+    with engine.begin() as connection:
+        for index in SEARCH_INDEXES.values():
+            exists = connection.exec_driver_sql(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (index.fts,)
+            ).first()
+            for statement in index.ddl():
+                connection.exec_driver_sql(statement)
+            if not exists:
+                created.append(index.entity)
+    return created
+
+
+def rebuild(engine, entities=None):
+    """Re-index every row from the entity tables (backfill, or repair after VACUUM)."""
+    with engine.begin() as connection:
+        for entity in entities or SEARCH_INDEXES:
+            fts = SEARCH_INDEXES[entity].fts
+            connection.exec_driver_sql(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+            connection.exec_driver_sql(f"INSERT INTO {fts}({fts}) VALUES ('optimize')")
+
+
+def to_match_query(query):
+    """
+    Turn free text into a safe FTS5 query: every word quoted (so operators and
+    punctuation in user input can't cause syntax errors), all words required,
+    the last one matched as a prefix for search-as-you-type.
+    """
+    words = re.findall(r"\w+", query or "")
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+def highlight(snippet):
+    """HTML-escape a snippet and turn the match markers into <mark> tags."""
+    escaped = html.escape(snippet or "")
+    return escaped.replace(_MARK_OPEN, "<mark>").replace(_MARK_CLOSE, "</mark>")
+
+
+def search(session, query, entities=None, limit=20, offset=0):
+    """
+    Ranked results across entity types. bm25 scores depend on each table's
+    own term statistics, so they are only compared within a table: each index
+    returns at most offset + limit hits in rank order, and the lists are
+    interleaved (every table's best hit, then every table's second, ...).
+    A hit's ``rank`` is its bm25 within its entity (lower = better).
+    Returns (results, next_offset or None).
+    """
+    match = to_match_query(query)
+    if match is None:
+        return [], None
+    entities = list(dict.fromkeys(entities or SEARCH_INDEXES))
+    window = offset + limit + 1
+
+    ranked = []
+    for order, entity in enumerate(entities):
+        result = session.execute(text(SEARCH_INDEXES[entity].query()), {"match": match, "window": window})
+        ranked.extend(((position, order), dict(row._mapping)) for position, row in enumerate(result))
+    ranked.sort(key=lambda item: item[0])
+    rows = [row for _, row in ranked]
+
+    page = rows[offset:offset + limit]
+    results = []
+    for row in page:
+        row["snippet"] = highlight(row["snippet"])
+        if isinstance(row["created_at"], str):
+            row["created_at"] = row["created_at"].replace(" ", "T")
+        row["rank"] = round(row["rank"], 4)
+        results.append(row)
+    next_offset = offset + limit if len(rows) > offset + limit else None
+    return results, next_offset
@@ -0,0 +1,53 @@
+import json
+
+
+def _render(text):
+    from markdown import markdown  # imported on first use to keep app startup light
+
+    return markdown(text)
+
+
+def format_sse(event, data):
+    """Encode one Server-Sent Event; ``data`` is sent as a single JSON line."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+class MarkdownBlockStreamer:
+    """
+    Render streamed markdown one block at a time.
+
+    Text is buffered until a blank line closes a block; only complete blocks
+    are rendered, so a half-received list or heading is never sent. Code
+    fences are kept together even if they contain blank lines.
+    """
+
+    def __init__(self):
+        self._pending = ""
+        self.text = ""
+
+    def _take_complete(self):
+        # Cut at the last blank line that is not inside an open code fence
+        cut, search_from = -1, 0
+        while True:
+            index = self._pending.find("\n\n", search_from)
+            if index == -1:
+                break
+            if self._pending[:index].count("```") % 2 == 0:
+                cut = index
+            search_from = index + 2
+        if cut == -1:
+            return None
+        complete, self._pending = self._pending[:cut], self._pending[cut + 2:]
+        return complete if complete.strip() else None
+
+    def feed(self, chunk):
+        """Add streamed text; return (markdown, html) for the blocks it completed, or None."""
+        self.text += chunk
+        self._pending += chunk
+        complete = self._take_complete()
+        return (complete, _render(complete)) if complete else None
+
+    def flush(self):
+        """Render whatever is left once the stream has ended, or None."""
+        block, self._pending = self._pending, ""
+        return (block, _render(block)) if block.strip() else None